@@ -110,13 +110,16 @@ class DetailedOrganizationSerializer(OrganizationSerializer):
         )
 
         # Retrieve all registered organization features
-        org_features = features.all(feature_type=OrganizationFeature).keys()
+        org_features = [
+            feature_name for feature_name in features.all(feature_type=OrganizationFeature).keys()
+            if feature_name.startswith('organizations:')
+        ]
         feature_list = set()
 
-        for feature_name in org_features:
-            if not feature_name.startswith('organizations:'):
-                continue
-            if features.has(feature_name, obj, actor=user):
+        for feature_name, enabled in six.iteritems(
+            features.has_batch(org_features, [obj], actor=user)[obj]
+        ):
+            if enabled:
                 # Remove the organization scope prefix
                 feature_list.add(feature_name[len('organizations:'):])
 
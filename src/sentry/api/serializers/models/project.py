@@ -91,6 +91,9 @@ class ProjectSerializer(Serializer):
         return result
 
     def get_attrs(self, item_list, user):
+        from sentry import features
+        from sentry.features.base import ProjectFeature
+
         project_ids = [i.id for i in item_list]
         if user.is_authenticated() and item_list:
             bookmarks = set(
@@ -139,9 +142,17 @@ class ProjectSerializer(Serializer):
         for project_id, platform in platforms:
             platforms_by_project[project_id].append(platform)
 
+        # Retrieve all registered project features
+        project_features = [
+            feature_name for feature_name in features.all(feature_type=ProjectFeature).keys()
+            if feature_name.startswith('projects:')
+        ]
+        features_by_project = features.has_batch(project_features, item_list, actor=user)
+
         result = self.get_access_by_project(item_list, user)
         for item in item_list:
             result[item].update({
+                'features': features_by_project[item],
                 'is_bookmarked': item.id in bookmarks,
                 'is_subscribed':
                 bool(user_options.get(
@@ -156,17 +167,9 @@ class ProjectSerializer(Serializer):
         return result
 
     def serialize(self, obj, attrs, user):
-        from sentry import features
-        from sentry.features.base import ProjectFeature
-
-        # Retrieve all registered organization features
-        project_features = features.all(feature_type=ProjectFeature).keys()
         feature_list = set()
-
-        for feature_name in project_features:
-            if not feature_name.startswith('projects:'):
-                continue
-            if features.has(feature_name, obj, actor=user):
+        for feature_name, enabled in six.iteritems(attrs['features']):
+            if enabled:
                 # Remove the project scope prefix
                 feature_list.add(feature_name[len('projects:'):])
 
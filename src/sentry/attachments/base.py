@@ -11,11 +11,21 @@ from __future__ import absolute_import
 import zlib
 
 from sentry.utils import metrics
+from sentry.utils.iterators import chunked
+
+# Attachments are compressed as a stream and stored in chunks of this size,
+# so that neither the raw nor the compressed attachment has to be kept in
+# memory as a whole.
+CHUNK_SIZE = 1024 * 1024  # 1MB
+
+# Number of chunks that are written or read in a single roundtrip.
+CHUNK_BATCH_SIZE = 8
 
 
 class CachedAttachment(object):
-    def __init__(self, name=None, content_type=None, type=None, data=None, load=None):
-        if data is None and load is None:
+    def __init__(self, name=None, content_type=None, type=None, data=None, load=None,
+                 file=None, chunks=None):
+        if data is None and load is None and file is None and chunks is None:
             raise AttributeError('Missing attachment data')
 
         self.name = name
@@ -24,23 +34,56 @@ class CachedAttachment(object):
 
         self._data = data
         self._load = load
+        self._file = file
+        self._chunks = chunks
 
     @classmethod
     def from_upload(cls, file, **kwargs):
         return CachedAttachment(
             name=file.name,
             content_type=file.content_type,
-            data=file.read(),
+            file=file,
             **kwargs
         )
 
     @property
     def data(self):
-        if self._data is None and self._load is not None:
-            self._data = self._load()
+        if self._data is None:
+            if self._load is not None:
+                self._data = self._load()
+            else:
+                self._data = b''.join(self.iter_chunks())
 
         return self._data
 
+    def iter_chunks(self, chunk_size=None):
+        """
+        Yields the contents of the attachment in chunks without loading it
+        into memory, unless it has been loaded already.
+        """
+        chunk_size = chunk_size or CHUNK_SIZE
+        if self._data is None and self._file is not None:
+            self._file.seek(0)
+            while True:
+                chunk = self._file.read(chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+        elif self._data is None and self._chunks is not None:
+            for chunk in self._chunks():
+                yield chunk
+        else:
+            data = self.data
+            for offset in range(0, len(data), chunk_size):
+                yield data[offset:offset + chunk_size]
+
+    def open(self):
+        """
+        Returns a read only file like object over the contents of the
+        attachment.
+        """
+        return AttachmentReader(self.iter_chunks())
+
     def meta(self):
         return {
             'name': self.name,
@@ -49,6 +92,76 @@ class CachedAttachment(object):
         }
 
 
+class AttachmentReader(object):
+    """
+    A minimal file like object reading from an iterator of chunks.
+    """
+
+    def __init__(self, chunks):
+        self._chunks = chunks
+        self._buffer = b''
+
+    def read(self, size=-1):
+        if size < 0:
+            rv = b''.join([self._buffer] + list(self._chunks))
+            self._buffer = b''
+            return rv
+
+        while len(self._buffer) < size:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                break
+            self._buffer += chunk
+
+        rv, self._buffer = self._buffer[:size], self._buffer[size:]
+        return rv
+
+    def close(self):
+        self._chunks = iter(())
+        self._buffer = b''
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        self.close()
+
+
+def compress_chunks(chunks, chunk_size=None):
+    """
+    Compresses a stream of chunks with zlib and yields the compressed stream
+    in chunks of ``chunk_size``.
+    """
+    chunk_size = chunk_size or CHUNK_SIZE
+    compressor = zlib.compressobj()
+    buffer = b''
+    for chunk in chunks:
+        buffer += compressor.compress(chunk)
+        while len(buffer) >= chunk_size:
+            yield buffer[:chunk_size]
+            buffer = buffer[chunk_size:]
+
+    buffer += compressor.flush()
+    while buffer:
+        yield buffer[:chunk_size]
+        buffer = buffer[chunk_size:]
+
+
+def decompress_chunks(chunks):
+    """
+    Decompresses a stream of zlib compressed chunks.
+    """
+    decompressor = zlib.decompressobj()
+    for chunk in chunks:
+        data = decompressor.decompress(chunk)
+        if data:
+            yield data
+
+    data = decompressor.flush()
+    if data:
+        yield data
+
+
 class BaseAttachmentCache(object):
     def __init__(self, inner, appendix=None):
         if appendix is None:
@@ -59,18 +172,43 @@ class BaseAttachmentCache(object):
     def make_key(self, key):
         return u'{}:{}'.format(key, self.appendix)
 
+    def make_chunk_key(self, key, index, chunk):
+        return u'{}:{}:{}'.format(key, index, chunk)
+
     def set(self, key, attachments, timeout=None):
         key = self.make_key(key)
+        meta = []
+
         for index, attachment in enumerate(attachments):
-            compressed = zlib.compress(attachment.data)
-            self.inner.set(u'{}:{}'.format(key, index), compressed, timeout, raw=True)
+            sizes = {'raw': 0, 'compressed': 0, 'chunks': 0}
+
+            def counted(chunks):
+                for chunk in chunks:
+                    sizes['raw'] += len(chunk)
+                    yield chunk
+
+            # The compressed chunks are written in batches as the attachment
+            # is read, so only a few of them are held in memory at a time.
+            compressed = compress_chunks(counted(attachment.iter_chunks()))
+            for batch in chunked(compressed, CHUNK_BATCH_SIZE):
+                self.inner.set_many(dict(
+                    (self.make_chunk_key(key, index, sizes['chunks'] + i), chunk)
+                    for i, chunk in enumerate(batch)
+                ), timeout, raw=True)
+                sizes['chunks'] += len(batch)
+                sizes['compressed'] += sum(len(chunk) for chunk in batch)
 
             metrics_tags = {'type': attachment.type}
             metrics.incr('attachments.received', tags=metrics_tags)
-            metrics.timing('attachments.blob-size.raw', len(attachment.data), tags=metrics_tags)
-            metrics.timing('attachments.blob-size.compressed', len(compressed), tags=metrics_tags)
+            metrics.timing('attachments.blob-size.raw', sizes['raw'], tags=metrics_tags)
+            metrics.timing('attachments.blob-size.compressed',
+                           sizes['compressed'], tags=metrics_tags)
+            metrics.timing('attachments.blob-chunks', sizes['chunks'], tags=metrics_tags)
+
+            attachment_meta = attachment.meta()
+            attachment_meta['chunks'] = sizes['chunks']
+            meta.append(attachment_meta)
 
-        meta = [attachment.meta() for attachment in attachments]
         self.inner.set(key, meta, timeout, raw=False)
 
     def get(self, key):
@@ -78,21 +216,51 @@ class BaseAttachmentCache(object):
         result = self.inner.get(key, raw=False)
         if result is not None:
             result = [
-                CachedAttachment(
-                    load=lambda index=index: zlib.decompress(
-                        self.inner.get(u'{}:{}'.format(key, index), raw=True)),
-                    **attachment
-                )
+                self._make_attachment(key, index, attachment)
                 for index, attachment in enumerate(result)
             ]
         return result
 
+    def _make_attachment(self, key, index, attachment):
+        attachment = dict(attachment)
+        num_chunks = attachment.pop('chunks', None)
+
+        # Attachments stored before chunking was introduced are kept as a
+        # single compressed value.
+        if num_chunks is None:
+            return CachedAttachment(
+                load=lambda: zlib.decompress(
+                    self.inner.get(u'{}:{}'.format(key, index), raw=True)),
+                **attachment
+            )
+
+        def iter_compressed():
+            chunk_keys = [self.make_chunk_key(key, index, i) for i in range(num_chunks)]
+            for batch in chunked(chunk_keys, CHUNK_BATCH_SIZE):
+                values = self.inner.get_many(batch, raw=True)
+                for chunk_key in batch:
+                    if values.get(chunk_key) is None:
+                        raise ValueError('Missing attachment chunk: %r' % chunk_key)
+                    yield values[chunk_key]
+
+        return CachedAttachment(
+            chunks=lambda: decompress_chunks(iter_compressed()),
+            **attachment
+        )
+
     def delete(self, key):
         key = self.make_key(key)
         attachments = self.inner.get(key, raw=False)
         if attachments is None:
             return
 
-        for index in range(0, len(attachments)):
-            self.inner.delete(u'{}:{}'.format(key, index))
+        keys = []
+        for index, attachment in enumerate(attachments):
+            num_chunks = attachment.get('chunks')
+            if num_chunks is None:
+                keys.append(u'{}:{}'.format(key, index))
+            else:
+                keys.extend(self.make_chunk_key(key, index, i) for i in range(num_chunks))
+
+        self.inner.delete_many(keys)
         self.inner.delete(key)
@@ -36,3 +36,14 @@ class BaseCache(local):
 
     def get(self, key, version=None, raw=False):
         raise NotImplementedError
+
+    def set_many(self, mapping, timeout, version=None, raw=False):
+        for key, value in mapping.items():
+            self.set(key, value, timeout, version=version, raw=raw)
+
+    def delete_many(self, keys, version=None):
+        for key in keys:
+            self.delete(key, version=version)
+
+    def get_many(self, keys, version=None, raw=False):
+        return dict((key, self.get(key, version=version, raw=raw)) for key in keys)
@@ -0,0 +1,75 @@
+"""
+sentry.cache.codecs
+~~~~~~~~~~~~~~~~~~~
+
+:copyright: (c) 2010-2018 by the Sentry Team, see AUTHORS for more details.
+:license: BSD, see LICENSE for more details.
+"""
+
+from __future__ import absolute_import
+
+import zlib
+
+import six
+
+from sentry import options
+from sentry.utils import json, metrics
+from sentry.utils.canonical import CANONICAL_TYPES
+from sentry.utils.compat import pickle
+
+# Encoded payloads start with a version byte. Neither JSON documents (which
+# start with ``{``) nor pickles (which start with ``\x80``) can start with
+# one of these, so values that were stored before the codec was used can
+# still be told apart.
+VERSION_ZLIB_JSON = b'\x01'
+
+PICKLE_PROTOCOL_MARKER = b'\x80'
+
+
+class EventPayloadCodec(object):
+    """
+    Encodes event payloads for the processing pipeline as zlib compressed
+    JSON, prefixed with a version byte.
+    """
+
+    def __init__(self, compression_level=1):
+        self.compression_level = compression_level
+
+    def encode(self, data):
+        # Canonical key dictionaries can't be serialized directly, so they
+        # need to be downgraded first.
+        if isinstance(data, CANONICAL_TYPES):
+            data = dict(data.items())
+
+        value = json.dumps(data)
+        if isinstance(value, six.text_type):
+            value = value.encode('utf-8')
+
+        encoded = VERSION_ZLIB_JSON + zlib.compress(value, self.compression_level)
+        metrics.timing('events.payload-size.raw', len(value))
+        metrics.timing('events.payload-size.encoded', len(encoded))
+        return encoded
+
+    def decode(self, value):
+        if value is None:
+            return None
+
+        # Cache backends that serialize values themselves return the
+        # payload as it was stored before the codec was used.
+        if not isinstance(value, six.binary_type):
+            return value
+
+        version = value[:1]
+        if version == VERSION_ZLIB_JSON:
+            return json.loads(zlib.decompress(value[1:]))
+
+        # Payloads are only expected in the codec's format once it is used to
+        # write them, so only then are the remaining legacy payloads counted.
+        if options.get('store.event-payload-codec'):
+            metrics.incr('events.payload-decode.legacy')
+        if version == PICKLE_PROTOCOL_MARKER:
+            return pickle.loads(value)
+        return json.loads(value)
+
+
+event_payload_codec = EventPayloadCodec()
@@ -22,3 +22,13 @@ class DjangoCache(BaseCache):
 
     def get(self, key, version=None, raw=False):
         return cache.get(key, version=version or self.version)
+
+    def set_many(self, mapping, timeout, version=None, raw=False):
+        cache.set_many(mapping, timeout, version=version or self.version)
+
+    def delete_many(self, keys, version=None):
+        cache.delete_many(keys, version=version or self.version)
+
+    def get_many(self, keys, version=None, raw=False):
+        result = cache.get_many(keys, version=version or self.version)
+        return dict((key, result.get(key)) for key in keys)
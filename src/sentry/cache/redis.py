@@ -26,15 +26,29 @@ class CommonRedisCache(BaseCache):
         self.client = client
         BaseCache.__init__(self, **options)
 
-    def set(self, key, value, timeout, version=None, raw=False):
-        key = self.make_key(key, version=version)
+    def _encode(self, key, value, raw):
         v = json.dumps(value) if not raw else value
         if len(v) > self.max_size:
             raise ValueTooLarge('Cache key too large: %r %r' % (key, len(v)))
+        return v
+
+    def _decode(self, result, raw):
+        if result is not None and not raw:
+            result = json.loads(result)
+        return result
+
+    def _set(self, client, key, value, timeout):
         if timeout:
-            self.client.setex(key, int(timeout), v)
+            client.setex(key, int(timeout), value)
         else:
-            self.client.set(key, v)
+            client.set(key, value)
+
+    def get_pipeline(self):
+        return self.client.pipeline(transaction=False)
+
+    def set(self, key, value, timeout, version=None, raw=False):
+        key = self.make_key(key, version=version)
+        self._set(self.client, key, self._encode(key, value, raw), timeout)
 
     def delete(self, key, version=None):
         key = self.make_key(key, version=version)
@@ -42,10 +56,34 @@ class CommonRedisCache(BaseCache):
 
     def get(self, key, version=None, raw=False):
         key = self.make_key(key, version=version)
-        result = self.client.get(key)
-        if result is not None and not raw:
-            result = json.loads(result)
-        return result
+        return self._decode(self.client.get(key), raw)
+
+    def set_many(self, mapping, timeout, version=None, raw=False):
+        items = [
+            (self.make_key(key, version=version), value)
+            for key, value in mapping.items()
+        ]
+        with self.get_pipeline() as pipe:
+            for key, value in items:
+                self._set(pipe, key, self._encode(key, value, raw), timeout)
+            pipe.execute()
+
+    def delete_many(self, keys, version=None):
+        if not keys:
+            return
+        with self.get_pipeline() as pipe:
+            for key in keys:
+                pipe.delete(self.make_key(key, version=version))
+            pipe.execute()
+
+    def get_many(self, keys, version=None, raw=False):
+        with self.get_pipeline() as pipe:
+            for key in keys:
+                pipe.get(self.make_key(key, version=version))
+            results = pipe.execute()
+        return dict(
+            (key, self._decode(result, raw)) for key, result in zip(keys, results)
+        )
 
 
 class RbCache(CommonRedisCache):
@@ -56,6 +94,26 @@ class RbCache(CommonRedisCache):
         client = cluster.get_routing_client()
         CommonRedisCache.__init__(self, client, **options)
 
+    def set_many(self, mapping, timeout, version=None, raw=False):
+        # The routing client does not support pipelines, but mapping
+        # commands are sent to all hosts concurrently.
+        with self.client.map() as client:
+            for key, value in mapping.items():
+                key = self.make_key(key, version=version)
+                self._set(client, key, self._encode(key, value, raw), timeout)
+
+    def delete_many(self, keys, version=None):
+        if not keys:
+            return
+        with self.client.map() as client:
+            for key in keys:
+                client.delete(self.make_key(key, version=version))
+
+    def get_many(self, keys, version=None, raw=False):
+        with self.client.map() as client:
+            promises = [(key, client.get(self.make_key(key, version=version))) for key in keys]
+        return dict((key, self._decode(promise.value, raw)) for key, promise in promises)
+
 
 # Confusing legacy name for RbCache.  We don't actually have a pure redis cache
 RedisCache = RbCache
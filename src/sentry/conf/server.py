@@ -552,6 +552,14 @@ CELERYBEAT_SCHEDULE = {
             'queue': 'options',
         }
     },
+    'flush-event-tags': {
+        'task': 'sentry.tasks.flush_event_tags',
+        'schedule': timedelta(seconds=10),
+        'options': {
+            'expires': 10,
+            'queue': 'events.index_event_tags',
+        }
+    },
     'schedule-digests': {
         'task': 'sentry.tasks.digests.schedule_digests',
         'schedule': timedelta(seconds=30),
@@ -24,16 +24,14 @@ from six import BytesIO
 from time import time
 
 from sentry.attachments import attachment_cache
-from sentry.cache import default_cache
 from sentry.models import ProjectKey
 from sentry.tasks.store import preprocess_event, \
-    preprocess_event_from_reprocessing
+    preprocess_event_from_reprocessing, set_event_payload
 from sentry.utils import json
 from sentry.utils.auth import parse_auth_header
 from sentry.utils.http import origin_from_request
 from sentry.utils.strings import decompress
 from sentry.utils.sdk import configure_scope
-from sentry.utils.canonical import CANONICAL_TYPES
 
 
 _dist_re = re.compile(r'^[a-zA-Z0-9_.-]+$')
@@ -163,13 +161,9 @@ class ClientApiHelper(object):
         if start_time is None:
             start_time = time()
 
-        # we might be passed some sublcasses of dict that fail dumping
-        if isinstance(data, CANONICAL_TYPES):
-            data = dict(data.items())
-
         cache_timeout = 3600
         cache_key = cache_key_for_event(data)
-        default_cache.set(cache_key, data, cache_timeout)
+        set_event_payload(cache_key, data, cache_timeout)
 
         # Attachments will be empty or None if the "event-attachments" feature
         # is turned off. For native crash reports it will still contain the
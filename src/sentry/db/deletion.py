@@ -1,34 +1,83 @@
 from __future__ import absolute_import
 
 import itertools
+import logging
+import time
 from uuid import uuid4
 
 from datetime import timedelta
-from django.db import connections, router
+from django.db import DatabaseError, connections, router, transaction
 from django.utils import timezone
 
-from sentry.utils import db
+from sentry.db.partitions import PartitionManager
+from sentry.utils import db, metrics
+
+logger = logging.getLogger('sentry.cleanup')
+
+# databases that do not report the replication lag
+_replication_lag_unsupported = set()
+
+
+def get_replication_lag(using):
+    """
+    Returns the replay lag in seconds of the most lagging replica of the
+    database, or ``None`` if it is not known.
+    """
+    if using in _replication_lag_unsupported or not db.is_postgres(using):
+        return None
+
+    cursor = connections[using].cursor()
+    try:
+        with transaction.atomic(using=using):
+            cursor.execute('select extract(epoch from max(replay_lag)) from pg_stat_replication')
+    except DatabaseError:
+        # ``replay_lag`` is only available with Postgres 10+
+        logger.warning('cleanup.replication_lag_unsupported', extra={'using': using})
+        _replication_lag_unsupported.add(using)
+        return None
+    row = cursor.fetchone()
+    return row[0] if row else None
 
 
 class BulkDeleteQuery(object):
-    def __init__(self, model, project_id=None, dtfield=None, days=None, order_by=None):
+    def __init__(self, model, project_id=None, dtfield=None, days=None, order_by=None,
+                 max_replication_lag=None):
         self.model = model
         self.project_id = int(project_id) if project_id else None
         self.dtfield = dtfield
         self.days = int(days) if days is not None else None
         self.order_by = order_by
         self.using = router.db_for_write(model)
+        # the maximum replication lag (in seconds) to wait for between chunks
+        self.max_replication_lag = max_replication_lag
+
+    def throttle(self):
+        if self.max_replication_lag is None:
+            return
+
+        while True:
+            lag = get_replication_lag(self.using)
+            if lag is None or lag <= self.max_replication_lag:
+                return
+            logger.info('cleanup.throttled', extra={
+                'model': self.model.__name__,
+                'replication_lag': lag,
+            })
+            metrics.incr('cleanup.throttled', tags={'model': self.model.__name__})
+            time.sleep(min(lag, 10))
 
     def execute_postgres(self, chunk_size=10000):
         quote_name = connections[self.using].ops.quote_name
 
         where = []
         if self.dtfield and self.days is not None:
+            cutoff = timezone.now() - timedelta(days=self.days)
+            if not self.project_id:
+                self.maintain_partitions(cutoff)
             where.append(
                 u"{} < '{}'::timestamptz".format(
                     quote_name(self.dtfield),
-                    (timezone.now() - timedelta(days=self.days)).isoformat(),
-                    self.days,
+                    cutoff.isoformat(),
                 )
             )
         if self.project_id:
@@ -71,12 +120,29 @@ class BulkDeleteQuery(object):
 
         return self._continuous_query(query)
 
+    def maintain_partitions(self, cutoff, days_ahead=7):
+        """
+        If the table is partitioned by day on ``dtfield``, drops the
+        partitions that have expired entirely and creates the partitions for
+        the upcoming days. The remaining expired rows (of the partition that
+        contains the cutoff) are deleted in chunks.
+        """
+        manager = PartitionManager(self.model, self.dtfield)
+        if not manager.is_partitioned():
+            return
+        manager.drop_partitions(cutoff)
+        manager.create_partitions(days=days_ahead)
+
     def _continuous_query(self, query):
+        deleted = 0
         results = True
         cursor = connections[self.using].cursor()
         while results:
+            self.throttle()
             cursor.execute(query)
             results = cursor.rowcount > 0
+            deleted += max(cursor.rowcount, 0)
+        return deleted
 
     def execute_generic(self, chunk_size=100):
         qs = self.get_generic_queryset()
@@ -99,18 +165,26 @@ class BulkDeleteQuery(object):
     def _continuous_generic_query(self, query, chunk_size):
         # XXX: we step through because the deletion collector will pull all
         # relations into memory
+        deleted = 0
         exists = True
         while exists:
+            self.throttle()
             exists = False
             for item in query[:chunk_size].iterator():
                 item.delete()
+                deleted += 1
                 exists = True
+        return deleted
 
     def execute(self, chunk_size=10000):
+        """
+        Deletes the matching rows in chunks of ``chunk_size``, returning the
+        number of deleted rows.
+        """
         if db.is_postgres():
-            self.execute_postgres(chunk_size)
+            return self.execute_postgres(chunk_size)
         else:
-            self.execute_generic(chunk_size)
+            return self.execute_generic(chunk_size)
 
     def iterator(self, chunk_size=100):
         if db.is_postgres():
@@ -0,0 +1,144 @@
+"""
+sentry.db.partitions
+~~~~~~~~~~~~~~~~~~~~
+
+Support for retention bound tables that use native Postgres (10+) range
+partitioning by day.
+
+Tables are not partitioned automatically: converting an existing table
+requires rewriting it (and including the partitioning column in its primary
+key and unique constraints), which has to be planned for every installation.
+Once a table has been partitioned on its date column, partitions named
+``<table>_pYYYYMMDD`` are created ahead of time by ``sentry cleanup`` and
+expired data is removed by dropping whole partitions instead of deleting
+rows.
+
+:copyright: (c) 2010-2018 by the Sentry Team, see AUTHORS for more details.
+:license: BSD, see LICENSE for more details.
+"""
+from __future__ import absolute_import
+
+import logging
+import re
+from datetime import datetime, timedelta
+
+from django.db import connections, router
+from django.utils import timezone
+
+from sentry.utils import db
+
+logger = logging.getLogger('sentry.partitions')
+
+PARTITION_NAME_RE = re.compile(r'^(?P<table>.+)_p(?P<date>\d{8})$')
+
+
+class PartitionManager(object):
+    """
+    Manages the daily partitions of the table of ``model`` that is range
+    partitioned on ``dtfield``.
+    """
+
+    def __init__(self, model, dtfield):
+        self.model = model
+        self.dtfield = dtfield
+        self.table = model._meta.db_table
+        self.using = router.db_for_write(model)
+
+    def get_partition_name(self, date):
+        return u'{}_p{}'.format(self.table, date.strftime('%Y%m%d'))
+
+    def is_partitioned(self):
+        if not db.is_postgres(self.using):
+            return False
+
+        connection = connections[self.using]
+        cursor = connection.cursor()
+        cursor.execute('show server_version_num')
+        if int(cursor.fetchone()[0]) < 100000:
+            return False
+
+        cursor.execute(
+            """
+            select a.attname
+            from pg_partitioned_table p
+            join pg_class c on c.oid = p.partrelid
+            join pg_attribute a on a.attrelid = p.partrelid and a.attnum = p.partattrs[0]
+            where c.relname = %s and p.partstrat = 'r' and p.partnatts = 1
+            """, [self.table]
+        )
+        row = cursor.fetchone()
+        return row is not None and row[0] == self.model._meta.get_field(self.dtfield).column
+
+    def get_partitions(self):
+        """
+        Returns a sorted list of ``(date, name)`` pairs of the daily
+        partitions of the table.
+        """
+        cursor = connections[self.using].cursor()
+        cursor.execute(
+            """
+            select c.relname
+            from pg_inherits i
+            join pg_class c on c.oid = i.inhrelid
+            join pg_class p on p.oid = i.inhparent
+            where p.relname = %s
+            """, [self.table]
+        )
+
+        partitions = []
+        for name, in cursor.fetchall():
+            match = PARTITION_NAME_RE.match(name)
+            if match is None or match.group('table') != self.table:
+                continue
+            date = datetime.strptime(match.group('date'), '%Y%m%d').replace(tzinfo=timezone.utc)
+            partitions.append((date, name))
+        return sorted(partitions)
+
+    def create_partitions(self, days=7, now=None):
+        """
+        Creates the partitions for today and the following ``days`` days if
+        they don't exist yet. Returns the names of the created partitions.
+        """
+        if now is None:
+            now = timezone.now()
+
+        quote_name = connections[self.using].ops.quote_name
+        today = now.replace(hour=0, minute=0, second=0, microsecond=0)
+        existing = set(name for _, name in self.get_partitions())
+
+        created = []
+        cursor = connections[self.using].cursor()
+        for i in range(days + 1):
+            start = today + timedelta(days=i)
+            name = self.get_partition_name(start)
+            if name in existing:
+                continue
+            cursor.execute(
+                u"""
+                create table {partition} partition of {table}
+                for values from (%s) to (%s)
+                """.format(
+                    partition=quote_name(name),
+                    table=quote_name(self.table),
+                ), [start, start + timedelta(days=1)]
+            )
+            logger.info('partition.created', extra={'table': self.table, 'partition': name})
+            created.append(name)
+        return created
+
+    def drop_partitions(self, cutoff):
+        """
+        Drops all partitions that only contain rows older than ``cutoff``.
+        Returns the names of the dropped partitions.
+        """
+        quote_name = connections[self.using].ops.quote_name
+
+        dropped = []
+        cursor = connections[self.using].cursor()
+        for date, name in self.get_partitions():
+            if date + timedelta(days=1) > cutoff:
+                break
+            cursor.execute(u'drop table {}'.format(quote_name(name)))
+            logger.info('partition.dropped', extra={'table': self.table, 'partition': name})
+            dropped.append(name)
+        return dropped
@@ -1,5 +1,6 @@
 from __future__ import absolute_import
 
+import copy
 import functools
 import itertools
 import logging
@@ -54,29 +55,69 @@ def event_to_record(event, rules):
 
 
 def fetch_state(project, records):
-    # This reads a little strange, but remember that records are returned in
-    # reverse chronological order, and we query the database in chronological
-    # order.
-    # NOTE: This doesn't account for any issues that are filtered out later.
-    start = records[-1].datetime
-    end = records[0].datetime
-
-    groups = Group.objects.in_bulk(record.value.event.group_id for record in records)
-    return {
-        'project':
-        project,
-        'groups':
-        groups,
-        'rules':
-        Rule.objects.
-        in_bulk(itertools.chain.from_iterable(record.value.rules for record in records)),
-        'event_counts':
-        tsdb.get_sums(tsdb.models.group, groups.keys(), start, end) if groups else {},
-        'user_counts':
-        tsdb.get_distinct_counts_totals(
-            tsdb.models.users_affected_by_group, groups.keys(), start, end
-        ) if groups else {},
-    }
+    return fetch_states([(project, records)])[0]
+
+
+def fetch_states(digests):
+    """
+    Fetches the state for a sequence of ``(project, records)`` pairs. The
+    groups and rules for all digests are loaded with one query each, and
+    every digest receives its own copies of them (since the state is
+    attached to the instances.)
+    """
+    digests = [(project, records) for project, records in digests]
+
+    groups = Group.objects.in_bulk(
+        set(
+            record.value.event.group_id
+            for _, records in digests for record in records
+        )
+    )
+    rules = Rule.objects.in_bulk(
+        set(
+            itertools.chain.from_iterable(
+                record.value.rules
+                for _, records in digests for record in records
+            )
+        )
+    )
+
+    states = []
+    for project, records in digests:
+        # This reads a little strange, but remember that records are returned in
+        # reverse chronological order, and we query the database in chronological
+        # order.
+        # NOTE: This doesn't account for any issues that are filtered out later.
+        start = records[-1].datetime
+        end = records[0].datetime
+
+        digest_groups = {}
+        digest_rules = {}
+        for record in records:
+            group_id = record.value.event.group_id
+            if group_id in groups and group_id not in digest_groups:
+                digest_groups[group_id] = copy.copy(groups[group_id])
+            for rule_id in record.value.rules:
+                if rule_id in rules and rule_id not in digest_rules:
+                    digest_rules[rule_id] = copy.copy(rules[rule_id])
+
+        states.append({
+            'project':
+            project,
+            'groups':
+            digest_groups,
+            'rules':
+            digest_rules,
+            'event_counts':
+            tsdb.get_sums(tsdb.models.group, digest_groups.keys(), start, end)
+            if digest_groups else {},
+            'user_counts':
+            tsdb.get_distinct_counts_totals(
+                tsdb.models.users_affected_by_group, digest_groups.keys(), start, end
+            ) if digest_groups else {},
+        })
+
+    return states
 
 
 def attach_state(project, groups, rules, event_counts, user_counts):
@@ -251,9 +251,9 @@ def scoreclause_sql(sc, connection):
             sql = 'log(times_seen) * 600 + last_seen::abstime::int'
     elif is_mysql(db):
         if has_values:
-            sql = 'log(times_seen + %d) * 600 + %d' % (sc.times_seen, to_timestamp(sc.last_seen))
+            sql = 'log10(times_seen + %d) * 600 + %d' % (sc.times_seen, to_timestamp(sc.last_seen))
         else:
-            sql = 'log(times_seen) * 600 + unix_timestamp(last_seen)'
+            sql = 'log10(times_seen) * 600 + unix_timestamp(last_seen)'
     else:
         # XXX: if we cant do it atomically let's do it the best we can
         sql = int(sc)
@@ -915,8 +915,8 @@ class EventManager(object):
         # clients did not set this appropriately so far.
         normalize_in_app(data)
 
-        for plugin in plugins.for_project(project, version=None):
-            added_tags = safe_execute(plugin.get_tags, event, _with_transaction=False)
+        for plugin in plugins.for_project(project, version=None, hook='get_tags'):
+            added_tags = plugins.call_hook(plugin, 'get_tags', event, _with_transaction=False)
             if added_tags:
                 # plugins should not override user provided tags
                 for key, value in added_tags:
@@ -1460,6 +1460,7 @@ class EventManager(object):
 
         buffer.incr(Group, update_kwargs, {
             'id': group.id,
+            'project_id': group.project_id,
         }, extra)
 
         return is_regression
@@ -99,4 +99,5 @@ default_manager.add('projects:plugins', ProjectPluginFeature)  # NOQA
 add = default_manager.add
 get = default_manager.get
 has = default_manager.has
+has_batch = default_manager.has_batch
 all = default_manager.all
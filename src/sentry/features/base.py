@@ -7,20 +7,37 @@ class Feature(object):
     def __init__(self, name):
         self.name = name
 
+    def get_cache_key(self):
+        """
+        Returns a key that identifies the feature and its context, which is
+        used to memoize the result of feature checks. Subclasses that add
+        context need to include it in the key.
+        """
+        return (self.name, )
+
 
 class OrganizationFeature(Feature):
     def __init__(self, name, organization):
         Feature.__init__(self, name)
         self.organization = organization
 
+    def get_cache_key(self):
+        return (self.name, 'organization', self.organization.id)
+
 
 class ProjectFeature(Feature):
     def __init__(self, name, project):
         Feature.__init__(self, name)
         self.project = project
 
+    def get_cache_key(self):
+        return (self.name, 'project', self.project.id)
+
 
 class ProjectPluginFeature(ProjectFeature):
     def __init__(self, name, project, plugin):
         ProjectFeature.__init__(self, name, project)
         self.plugin = plugin
+
+    def get_cache_key(self):
+        return (self.name, 'project', self.project.id, self.plugin.slug)
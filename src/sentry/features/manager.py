@@ -2,18 +2,24 @@ from __future__ import absolute_import
 
 __all__ = ['FeatureManager']
 
+from time import time
+
 from django.conf import settings
 
 from sentry.plugins import plugins
-from sentry.utils.safe import safe_execute
 
 from .base import Feature
 from .exceptions import FeatureNotRegistered
 
 
+# The maximum number of results kept in the process level cache.
+MAX_CACHE_SIZE = 10000
+
+
 class FeatureManager(object):
     def __init__(self):
         self._registry = {}
+        self._cache = {}
 
     def all(self, feature_type=Feature):
         """
@@ -69,9 +75,83 @@ class FeatureManager(object):
         """
         actor = kwargs.pop('actor', None)
         feature = self.get(name, *args, **kwargs)
+        return self._memoize(feature, actor, self._iter_handlers)
+
+    def has_batch(self, names, objects, actor=None):
+        """
+        Determine which of the features are enabled for each of the objects
+        (organizations or projects), returning a mapping of object to a
+        mapping of feature name to whether the feature is enabled.
+
+        The feature handlers of the plugins are only looked up once for the
+        whole batch.
+
+        >>> FeatureManager.has_batch(['projects:feature'], projects, actor=request.user)
+        """
+        handlers = []
+
+        def get_handlers():
+            if not handlers:
+                handlers.append(list(self._iter_handlers()))
+            return handlers[0]
 
+        return {
+            obj: {
+                name: self._memoize(self.get(name, obj), actor, get_handlers)
+                for name in names
+            } for obj in objects
+        }
+
+    def _get_request_cache(self):
+        from sentry.app import env
+
+        request = env.request
+        if request is None:
+            return None
+
+        try:
+            return request._feature_cache
+        except AttributeError:
+            cache = request._feature_cache = {}
+            return cache
+
+    def _memoize(self, feature, actor, get_handlers):
+        """
+        Evaluates the feature, reusing the result of the same check during
+        the current request or, when ``features.cache-ttl`` is set, the
+        result of an earlier check in this process.
+        """
+        from sentry import options
+
+        key = (
+            feature.get_cache_key(),
+            type(actor).__name__,
+            getattr(actor, 'id', None),
+        )
+
+        request_cache = self._get_request_cache()
+        if request_cache is not None and key in request_cache:
+            return request_cache[key]
+
+        ttl = options.get('features.cache-ttl')
+        now = time()
+        entry = self._cache.get(key) if ttl else None
+        if entry is not None and entry[0] > now:
+            rv = entry[1]
+        else:
+            rv = self._evaluate(feature, actor, get_handlers())
+            if ttl:
+                if len(self._cache) >= MAX_CACHE_SIZE:
+                    self._cache.clear()
+                self._cache[key] = (now + ttl, rv)
+
+        if request_cache is not None:
+            request_cache[key] = rv
+        return rv
+
+    def _evaluate(self, feature, actor, handlers):
         # Check plugin feature handlers
-        rv = self._get_plugin_value(feature, actor)
+        rv = self._get_plugin_value(feature, actor, handlers)
         if rv is not None:
             return rv
 
@@ -82,11 +162,15 @@ class FeatureManager(object):
         # Features are by default disabled if no plugin or default enables them
         return False
 
-    def _get_plugin_value(self, feature, actor):
-        for plugin in plugins.all(version=2):
-            handlers = safe_execute(plugin.get_feature_hooks, _with_transaction=False)
+    def _iter_handlers(self):
+        for plugin in plugins.all(version=2, hook='get_feature_hooks'):
+            handlers = plugins.call_hook(plugin, 'get_feature_hooks', _with_transaction=False)
             for handler in handlers or ():
-                rv = handler(feature, actor)
-                if rv is not None:
-                    return rv
+                yield handler
+
+    def _get_plugin_value(self, feature, actor, handlers):
+        for handler in handlers:
+            rv = handler(feature, actor)
+            if rv is not None:
+                return rv
         return None
@@ -0,0 +1,136 @@
+"""
+sentry.filestore.cache
+~~~~~~~~~~~~~~~~~~~~~~
+
+A content addressed cache of file blobs on the local disk, shared by all
+processes on a host.
+
+:copyright: (c) 2010-2018 by the Sentry Team, see AUTHORS for more details.
+:license: BSD, see LICENSE for more details.
+"""
+from __future__ import absolute_import
+
+import errno
+import logging
+import os
+import shutil
+import tempfile
+import time
+
+from sentry.utils import metrics
+
+logger = logging.getLogger(__name__)
+
+# Cached blobs are only touched if they have not been used for this long,
+# which is the resolution of the LRU eviction.
+TOUCH_INTERVAL = 60 * 10
+
+
+class BlobCache(object):
+    """
+    Caches blobs by their checksum in ``path``. Whenever a blob is added
+    the total size of the cache is checked (at most every ``sweep_interval``
+    seconds per process) and the least recently used blobs are removed until
+    the cache is below ``max_size`` bytes again.
+    """
+
+    def __init__(self, path, max_size, sweep_interval=60):
+        self.path = path
+        self.max_size = max_size
+        self.sweep_interval = sweep_interval
+        self.last_sweep = 0
+
+    def get_path(self, checksum):
+        return os.path.join(self.path, checksum[:2], checksum)
+
+    def open(self, checksum, fetch):
+        """
+        Opens the cached blob with the given checksum. If it is not cached
+        yet, ``fetch`` is called to retrieve a file object with its contents.
+        """
+        path = self.get_path(checksum)
+        try:
+            f = open(path, 'rb')
+        except IOError as e:
+            if e.errno != errno.ENOENT:
+                raise
+        else:
+            metrics.incr('filestore.blob-cache.hit')
+            self._touch(path)
+            return f
+
+        metrics.incr('filestore.blob-cache.miss')
+        self._store(path, fetch)
+        return open(path, 'rb')
+
+    def _touch(self, path):
+        try:
+            now = time.time()
+            if os.path.getmtime(path) < now - TOUCH_INTERVAL:
+                os.utime(path, (now, now))
+        except OSError:
+            pass
+
+    def _store(self, path, fetch):
+        base = os.path.dirname(path)
+        try:
+            os.makedirs(base)
+        except OSError:
+            pass
+
+        # The blob is written to a temporary file and moved into place, so
+        # that concurrent readers never see a partially written blob.
+        tf = tempfile.NamedTemporaryFile(prefix='._blob-', dir=base, delete=False)
+        try:
+            with fetch() as src:
+                shutil.copyfileobj(src, tf)
+            tf.close()
+            os.rename(tf.name, path)
+        except Exception:
+            tf.close()
+            try:
+                os.remove(tf.name)
+            except OSError:
+                pass
+            raise
+
+        self.maybe_sweep()
+
+    def maybe_sweep(self):
+        now = time.time()
+        if self.last_sweep > now - self.sweep_interval:
+            return
+        self.last_sweep = now
+        try:
+            self.sweep()
+        except Exception:
+            logger.warning('Failed to sweep blob cache', exc_info=True)
+
+    def sweep(self):
+        entries = []
+        total_size = 0
+        for root, _, filenames in os.walk(self.path):
+            for filename in filenames:
+                path = os.path.join(root, filename)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+                total_size += stat.st_size
+
+        if total_size <= self.max_size:
+            return
+
+        # Remove blobs until there is some room again, so that the next
+        # blobs that are added don't immediately cause another eviction.
+        target_size = self.max_size * 0.9
+        for _, size, path in sorted(entries):
+            if total_size <= target_size:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total_size -= size
+            metrics.incr('filestore.blob-cache.evicted')
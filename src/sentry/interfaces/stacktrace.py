@@ -17,6 +17,7 @@ from itertools import islice, chain
 
 from django.conf import settings
 from django.utils.translation import ugettext as _
+from functools32 import lru_cache
 from six.moves.urllib.parse import urlparse
 
 from sentry.app import env
@@ -61,6 +62,21 @@ RECURSION_COMPARISON_FIELDS = [
     'colno',
 ]
 
+# fields that influence the hash components of a single frame (in addition
+# to the effective platform of the frame)
+FRAME_HASH_FIELDS = (
+    'filename',
+    'module',
+    'abs_path',
+    'context_line',
+    'function',
+    'symbol',
+    'lineno',
+)
+
+# number of distinct frames for which we memoize hash components
+FRAME_HASH_CACHE_SIZE = 10000
+
 
 def max_addr(cur, addr):
     if addr is None:
@@ -204,6 +220,19 @@ def remove_module_outliers(module, platform=None):
     return module
 
 
+@lru_cache(maxsize=FRAME_HASH_CACHE_SIZE)
+def get_frame_hash_components(platform, *values):
+    """
+    Returns the hash components for a frame identified by the effective
+    platform and the values of ``FRAME_HASH_FIELDS``.
+
+    The same frames show up in a large number of events, so the result is
+    memoized in a bounded LRU cache.
+    """
+    frame = Frame(**dict(zip(FRAME_HASH_FIELDS, values)))
+    return tuple(frame.compute_hash(platform))
+
+
 def slim_frame_data(frames, frame_allowance=settings.SENTRY_MAX_STACKTRACE_FRAMES):
     """
     Removes various excess metadata from middle frames which go beyond
@@ -426,6 +455,18 @@ class Frame(Interface):
         This is one of the few areas in Sentry that isn't platform-agnostic.
         """
         platform = self.platform or platform
+        values = tuple(self._data.get(field) for field in FRAME_HASH_FIELDS)
+        try:
+            return list(get_frame_hash_components(platform, *values))
+        except TypeError:
+            # unhashable values cannot be memoized
+            return self.compute_hash(platform)
+
+    def compute_hash(self, platform):
+        """
+        Computes the hash components of this frame for the given effective
+        platform.  Use ``get_hash`` instead which memoizes the result.
+        """
         output = []
         # Safari throws [native code] frames in for calls like ``forEach``
         # whereas Chrome ignores these. Let's remove it from the hashing algo
@@ -2,7 +2,6 @@ from __future__ import absolute_import
 
 import six
 
-from symbolic import ProguardMappingView
 from sentry.plugins import Plugin2
 from sentry.stacktraces import StacktraceProcessor
 from sentry.models import ProjectDebugFile, EventError
@@ -40,22 +39,20 @@ class JavaStacktraceProcessor(StacktraceProcessor):
         if not self.available:
             return False
 
-        dif_paths = ProjectDebugFile.difcache.fetch_difs(
-            self.project, self.images, features=['mapping'])
+        views = ProjectDebugFile.difcache.get_proguard_mapping_views(
+            self.project, self.images)
         self.mapping_views = []
 
         for debug_id in self.images:
             error_type = None
 
-            dif_path = dif_paths.get(debug_id)
-            if dif_path is None:
+            view = views.get(debug_id)
+            if view is None:
                 error_type = EventError.PROGUARD_MISSING_MAPPING
+            elif not view.has_line_info:
+                error_type = EventError.PROGUARD_MISSING_LINENO
             else:
-                view = ProguardMappingView.from_path(dif_path)
-                if not view.has_line_info:
-                    error_type = EventError.PROGUARD_MISSING_LINENO
-                else:
-                    self.mapping_views.append(view)
+                self.mapping_views.append(view)
 
             if error_type is None:
                 continue
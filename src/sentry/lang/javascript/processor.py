@@ -9,7 +9,9 @@ import base64
 import six
 import zlib
 
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from django.conf import settings
+from django.db import connections
 from os.path import splitext
 from requests.utils import get_encoding_from_headers
 from six.moves.urllib.parse import urljoin, urlsplit
@@ -24,9 +26,9 @@ except ImportError:
         pass
 
 
-from sentry import http
+from sentry import http, options
 from sentry.interfaces.stacktrace import Stacktrace
-from sentry.models import EventError, ReleaseFile
+from sentry.models import EventError, File, ReleaseFile
 from sentry.utils.cache import cache
 from sentry.utils.files import compress_file
 from sentry.utils.hashlib import md5_text
@@ -199,7 +201,7 @@ def discover_sourcemap(result):
     return sourcemap
 
 
-def fetch_release_file(filename, release, dist=None):
+def fetch_release_file(filename, release, dist=None, manifest=None):
     cache_key = 'releasefile:v1:%s:%s' % (release.id, md5_text(filename).hexdigest(), )
 
     logger.debug('Checking cache for release artifact %r (release_id=%s)', filename, release.id)
@@ -212,48 +214,50 @@ def fetch_release_file(filename, release, dist=None):
         filename_idents = [ReleaseFile.get_ident(f, dist_name) for f in filename_choices]
 
         logger.debug(
-            'Checking database for release artifact %r (release_id=%s)', filename, release.id
+            'Checking manifest for release artifact %r (release_id=%s)', filename, release.id
         )
 
-        possible_files = list(
-            ReleaseFile.objects.filter(
-                release=release,
-                dist=dist,
-                ident__in=filename_idents,
-            ).select_related('file')
-        )
+        # The manifest can be passed in to share it between multiple files.
+        if manifest is None:
+            manifest = ReleaseFile.get_manifest(release, dist)
+
+        # Pick first one that matches in priority order.
+        if manifest is not None:
+            artifact = next((manifest[i] for i in filename_idents if i in manifest), None)
+        else:
+            # The release is too large for a manifest, look up this file only.
+            possible_files = dict(
+                (rf.ident, (rf.file_id, rf.file.checksum, rf.file.headers))
+                for rf in ReleaseFile.objects.filter(
+                    release=release,
+                    dist=dist,
+                    ident__in=filename_idents,
+                ).select_related('file')
+            )
+            artifact = next(
+                (possible_files[i] for i in filename_idents if i in possible_files), None
+            )
 
-        if len(possible_files) == 0:
+        if artifact is None:
             logger.debug(
-                'Release artifact %r not found in database (release_id=%s)', filename, release.id
+                'Release artifact %r not found (release_id=%s)', filename, release.id
             )
             cache.set(cache_key, -1, 60)
             return None
-        elif len(possible_files) == 1:
-            releasefile = possible_files[0]
-        else:
-            # Pick first one that matches in priority order.
-            # This is O(N*M) but there are only ever at most 4 things here
-            # so not really worth optimizing.
-            releasefile = next((
-                rf
-                for ident in filename_idents
-                for rf in possible_files
-                if rf.ident == ident
-            ))
 
+        file_id, _, file_headers = artifact
         logger.debug(
-            'Found release artifact %r (id=%s, release_id=%s)', filename, releasefile.id, release.id
+            'Found release artifact %r (file_id=%s, release_id=%s)', filename, file_id, release.id
         )
         try:
             with metrics.timer('sourcemaps.release_file_read'):
-                with releasefile.file.getfile() as fp:
+                with File.objects.get(id=file_id).getfile() as fp:
                     z_body, body = compress_file(fp)
         except Exception:
             logger.error('sourcemap.compress_read_failed', exc_info=sys.exc_info())
             result = None
         else:
-            headers = {k.lower(): v for k, v in releasefile.file.headers.items()}
+            headers = {k.lower(): v for k, v in file_headers.items()}
             encoding = get_encoding_from_headers(headers)
             result = http.UrlResult(filename, headers, body, 200, encoding)
             cache.set(cache_key, (headers, z_body, 200, encoding), 3600)
@@ -276,7 +280,8 @@ def fetch_release_file(filename, release, dist=None):
     return result
 
 
-def fetch_file(url, project=None, release=None, dist=None, allow_scraping=True):
+def fetch_file(url, project=None, release=None, dist=None, allow_scraping=True,
+               manifest=None):
     """
     Pull down a URL, returning a UrlResult object.
 
@@ -293,7 +298,7 @@ def fetch_file(url, project=None, release=None, dist=None, allow_scraping=True):
         )
     if release:
         with metrics.timer('sourcemaps.release_file'):
-            result = fetch_release_file(url, release, dist)
+            result = fetch_release_file(url, release, dist, manifest)
     else:
         result = None
 
@@ -403,7 +408,8 @@ def get_max_age(headers):
     return min(max_age, CACHE_CONTROL_MAX)
 
 
-def fetch_sourcemap(url, project=None, release=None, dist=None, allow_scraping=True):
+def fetch_sourcemap(url, project=None, release=None, dist=None, allow_scraping=True,
+                    manifest=None):
     if is_data_uri(url):
         try:
             body = base64.b64decode(
@@ -416,7 +422,8 @@ def fetch_sourcemap(url, project=None, release=None, dist=None, allow_scraping=T
             })
     else:
         result = fetch_file(
-            url, project=project, release=release, dist=dist, allow_scraping=allow_scraping
+            url, project=project, release=release, dist=dist, allow_scraping=allow_scraping,
+            manifest=manifest,
         )
         body = result.body
     try:
@@ -429,6 +436,16 @@ def fetch_sourcemap(url, project=None, release=None, dist=None, allow_scraping=T
         })
 
 
+def _in_thread(func, *args):
+    # Database connections are opened per thread and would otherwise be
+    # leaked by the threads of the fetch pool.
+    try:
+        return func(*args)
+    finally:
+        for connection in connections.all():
+            connection.close()
+
+
 def is_data_uri(url):
     return url[:BASE64_PREAMBLE_LENGTH] == BASE64_SOURCEMAP_PREAMBLE
 
@@ -487,6 +504,7 @@ class JavaScriptStacktraceProcessor(StacktraceProcessor):
         self.sourcemaps = SourceMapCache()
         self.release = None
         self.dist = None
+        self.release_manifest = None
 
     def get_stacktraces(self, data):
         exceptions = get_path(data, 'exception', 'values', filter=True, default=())
@@ -516,6 +534,8 @@ class JavaScriptStacktraceProcessor(StacktraceProcessor):
         self.release = self.get_release(create=True)
         if self.data.get('dist') and self.release:
             self.dist = self.release.get_dist(self.data['dist'])
+        if self.release:
+            self.release_manifest = ReleaseFile.get_manifest(self.release, self.dist)
 
         self.populate_source_cache(frames)
         return True
@@ -758,57 +778,100 @@ class JavaScriptStacktraceProcessor(StacktraceProcessor):
         return self.cache.get(filename)
 
     def cache_source(self, filename):
-        sourcemaps = self.sourcemaps
-        cache = self.cache
+        if self.check_fetch_limit(filename):
+            self._cache_source(filename)
+
+    def _cache_source(self, filename):
+        sourcemap_url = self.add_source(filename, *self.fetch_source(filename))
+        if sourcemap_url is not None:
+            self.add_sourcemap([filename], sourcemap_url, *self.fetch_sourcemap(sourcemap_url))
 
+    def check_fetch_limit(self, filename):
         self.fetch_count += 1
 
         if self.fetch_count > self.max_fetches:
-            cache.add_error(filename, {
+            self.cache.add_error(filename, {
                 'type': EventError.JS_TOO_MANY_REMOTE_SOURCES,
             })
-            return
+            return False
 
+        return True
+
+    def fetch_source(self, filename):
+        """
+        Fetches the source of a minified file. Returns a tuple of the result
+        and an error. This does not modify the processor and is safe to call
+        from other threads.
+        """
         # TODO: respect cache-control/max-age headers to some extent
         logger.debug('Fetching remote source %r', filename)
         try:
-            result = fetch_file(
+            return fetch_file(
                 filename,
                 project=self.project,
                 release=self.release,
                 dist=self.dist,
-                allow_scraping=self.allow_scraping
-            )
+                allow_scraping=self.allow_scraping,
+                manifest=self.release_manifest,
+            ), None
         except http.BadSource as exc:
-            cache.add_error(filename, exc.data)
-            return
+            return None, exc.data
+
+    def fetch_sourcemap(self, sourcemap_url):
+        """
+        Fetches and parses a sourcemap. Returns a tuple of the sourcemap view
+        and an error. This does not modify the processor and is safe to call
+        from other threads.
+        """
+        try:
+            return fetch_sourcemap(
+                sourcemap_url,
+                project=self.project,
+                release=self.release,
+                dist=self.dist,
+                allow_scraping=self.allow_scraping,
+                manifest=self.release_manifest,
+            ), None
+        except http.BadSource as exc:
+            return None, exc.data
+
+    def add_source(self, filename, result, error):
+        """
+        Adds a fetched minified file to the source cache. Returns the URL of
+        its sourcemap if it still needs to be fetched.
+        """
+        sourcemaps = self.sourcemaps
+        cache = self.cache
+
+        if error is not None:
+            cache.add_error(filename, error)
+            return None
 
         cache.add(filename, result.body, result.encoding)
         cache.alias(result.url, filename)
 
         sourcemap_url = discover_sourcemap(result)
         if not sourcemap_url:
-            return
+            return None
 
         logger.debug('Found sourcemap %r for minified script %r', sourcemap_url[:256], result.url)
         sourcemaps.link(filename, sourcemap_url)
         if sourcemap_url in sourcemaps:
-            return
+            return None
 
-        # pull down sourcemap
-        try:
-            sourcemap_view = fetch_sourcemap(
-                sourcemap_url,
-                project=self.project,
-                release=self.release,
-                dist=self.dist,
-                allow_scraping=self.allow_scraping,
-            )
-        except http.BadSource as exc:
-            cache.add_error(filename, exc.data)
+        return sourcemap_url
+
+    def add_sourcemap(self, filenames, sourcemap_url, sourcemap_view, error):
+        """
+        Adds a fetched sourcemap referenced by the given minified files to
+        the sourcemap cache.
+        """
+        if error is not None:
+            for filename in filenames:
+                self.cache.add_error(filename, error)
             return
 
-        sourcemaps.add(sourcemap_url, sourcemap_view)
+        self.sourcemaps.add(sourcemap_url, sourcemap_view)
 
         # cache any inlined sources
         for src_id, source_name in sourcemap_view.iter_sources():
@@ -841,10 +904,43 @@ class JavaScriptStacktraceProcessor(StacktraceProcessor):
                 continue
             pending_file_list.add(f['abs_path'])
 
-        for idx, filename in enumerate(pending_file_list):
-            self.cache_source(
-                filename=filename,
-            )
+        pending_file_list = [f for f in pending_file_list if self.check_fetch_limit(f)]
+        concurrency = min(options.get('sourcemaps.fetch-concurrency'), len(pending_file_list))
+
+        if concurrency <= 1:
+            for filename in pending_file_list:
+                self._cache_source(filename)
+            return
+
+        # All minified files are fetched concurrently and every sourcemap is
+        # fetched as soon as it has been discovered. The caches are only
+        # modified from this thread as the fetches complete.
+        with ThreadPoolExecutor(max_workers=concurrency) as exe:
+            futures = {}
+            for filename in pending_file_list:
+                futures[exe.submit(_in_thread, self.fetch_source, filename)] = (filename, None)
+
+            # Minified files that share a sourcemap wait for a single fetch.
+            waiting = {}
+            while futures:
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in done:
+                    filename, sourcemap_url = futures.pop(future)
+                    if sourcemap_url is not None:
+                        self.add_sourcemap(waiting.pop(sourcemap_url), sourcemap_url,
+                                           *future.result())
+                        continue
+
+                    sourcemap_url = self.add_source(filename, *future.result())
+                    if sourcemap_url is None:
+                        continue
+                    if sourcemap_url in waiting:
+                        waiting[sourcemap_url].append(filename)
+                        continue
+
+                    waiting[sourcemap_url] = [filename]
+                    future = exe.submit(_in_thread, self.fetch_sourcemap, sourcemap_url)
+                    futures[future] = (filename, sourcemap_url)
 
     def close(self):
         StacktraceProcessor.close(self)
@@ -256,7 +256,7 @@ def reprocess_minidump_with_cfi(data):
     cfi_map = FrameInfoMap.new()
     for debug_id, cficache in six.iteritems(cficaches):
         cfi_map.add(debug_id, cficache)
-    state = process_minidump(minidump.data, cfi=cfi_map)
+    state = process_minidump(minidump, cfi=cfi_map)
 
     # Merge existing stack traces with new ones from the minidump
     for minidump_thread in state.threads():
@@ -1,8 +1,11 @@
 from __future__ import absolute_import
 
+import tempfile
+
 from django.core.files.uploadedfile import InMemoryUploadedFile, TemporaryUploadedFile
 from symbolic import arch_from_breakpad, ProcessState, id_from_breakpad
 
+from sentry.attachments.base import CachedAttachment
 from sentry.utils.safe import get_path
 
 # Attachment type used for minidump files
@@ -26,6 +29,14 @@ def process_minidump(minidump, cfi=None):
         return ProcessState.from_minidump_buffer(minidump.read(), cfi)
     elif isinstance(minidump, TemporaryUploadedFile):
         return ProcessState.from_minidump(minidump.temporary_file_path(), cfi)
+    elif isinstance(minidump, CachedAttachment):
+        # Cached attachments are streamed to disk chunk by chunk, so that the
+        # minidump never has to be held in memory as a whole.
+        with tempfile.NamedTemporaryFile(suffix='.dmp') as tf:
+            for chunk in minidump.iter_chunks():
+                tf.write(chunk)
+            tf.flush()
+            return ProcessState.from_minidump(tf.name, cfi)
     else:
         return ProcessState.from_minidump_buffer(minidump, cfi)
 
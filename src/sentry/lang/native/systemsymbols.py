@@ -1,49 +1,180 @@
 from __future__ import absolute_import
 
 import logging
+import threading
+import time
 
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
 from requests.exceptions import RequestException
 
 from sentry import options
 from sentry.net.http import Session
 from sentry.lang.native.utils import sdk_info_to_sdk_id
+from sentry.utils import metrics
+from sentry.utils.cache import cache
+from sentry.utils.hashlib import md5_text
 
-MAX_ATTEMPTS = 3
+# Number of symbols that are looked up in a single request, and the number
+# of requests sent concurrently for larger lookups
+LOOKUP_CHUNK_SIZE = 100
+LOOKUP_CONCURRENCY = 4
+
+# System symbols never change for a given image and address, so matches are
+# cached for a long time. Misses are cached shorter, since the symbol server
+# may learn about new SDKs.
+CACHE_TTL = 60 * 60 * 24
+NEGATIVE_CACHE_TTL = 60 * 60
+NOT_FOUND = -1
+
+# After a failed request the symbol server is not contacted again for an
+# exponentially growing period of time.
+BACKOFF_INITIAL = 5
+BACKOFF_MAX = 60 * 5
 
 logger = logging.getLogger(__name__)
 
 
+class SystemSymbolClient(object):
+    """
+    A client for the system symbol server that keeps a pool of connections
+    open and caches results.
+
+    Requests are never retried. Instead, the circuit breaker skips the
+    symbol server until the backoff of the last failure has passed.
+    """
+
+    def __init__(self):
+        self._session = None
+        self._lock = threading.Lock()
+        self.failures = 0
+        self.retry_at = 0
+
+    @property
+    def session(self):
+        if self._session is None:
+            with self._lock:
+                if self._session is None:
+                    session = Session()
+                    adapter = HTTPAdapter(pool_maxsize=LOOKUP_CONCURRENCY)
+                    session.mount('http://', adapter)
+                    session.mount('https://', adapter)
+                    self._session = session
+        return self._session
+
+    def is_available(self):
+        return time.time() >= self.retry_at
+
+    def mark_success(self):
+        if self.failures:
+            with self._lock:
+                self.failures = 0
+                self.retry_at = 0
+
+    def mark_failure(self):
+        with self._lock:
+            self.failures += 1
+            backoff = min(BACKOFF_MAX, BACKOFF_INITIAL * 2 ** (self.failures - 1))
+            self.retry_at = time.time() + backoff
+
+    def _get_cache_key(self, sdk_id, cpu_name, symbol):
+        return 'symbolserver:v1:%s' % md5_text(
+            sdk_id, cpu_name, symbol['object_uuid'], symbol['addr'],
+        ).hexdigest()
+
+    def _lookup_chunk(self, url, sdk_id, cpu_name, symbols):
+        rv = self.session.post(url, json={
+            'sdk_id': sdk_id,
+            'cpu_name': cpu_name,
+            'symbols': symbols,
+        })
+        # If the symbols server does not know about the SDK at all it will
+        # report a 404 here. In that case just assume that we did not find a
+        # match.
+        if rv.status_code == 404:
+            return [None] * len(symbols)
+        rv.raise_for_status()
+        return rv.json()['symbols']
+
+    def lookup(self, symbols, sdk_info=None, cpu_name=None):
+        """Looks up the given symbols in the cache and the symbol server.
+        Returns a list of matches in the same order, which contains `None`
+        for symbols that could not be resolved.
+        """
+        sdk_id = sdk_info_to_sdk_id(sdk_info)
+        keys = [self._get_cache_key(sdk_id, cpu_name, symbol) for symbol in symbols]
+        cached = cache.get_many(keys)
+
+        rv = [None] * len(symbols)
+        missing = []
+        for index, key in enumerate(keys):
+            result = cached.get(key)
+            if result is None:
+                missing.append(index)
+            elif result != NOT_FOUND:
+                rv[index] = result
+
+        metrics.incr('symbolserver.cache.hit', amount=len(symbols) - len(missing))
+        metrics.incr('symbolserver.cache.miss', amount=len(missing))
+        if not missing:
+            return rv
+
+        if not self.is_available():
+            metrics.incr('symbolserver.circuit-open')
+            return rv
+
+        url = '%s/lookup' % options.get('symbolserver.options')['url'].rstrip('/')
+        chunks = [
+            missing[i:i + LOOKUP_CHUNK_SIZE]
+            for i in range(0, len(missing), LOOKUP_CHUNK_SIZE)
+        ]
+
+        def lookup_chunk(chunk):
+            try:
+                return self._lookup_chunk(url, sdk_id, cpu_name, [symbols[i] for i in chunk])
+            except (IOError, RequestException, ValueError):
+                logger.error('Failed to contact system symbol server', exc_info=True)
+                return None
+
+        with metrics.timer('symbolserver.lookup'):
+            if len(chunks) == 1:
+                results = [lookup_chunk(chunks[0])]
+            else:
+                with ThreadPoolExecutor(max_workers=LOOKUP_CONCURRENCY) as exe:
+                    results = list(exe.map(lookup_chunk, chunks))
+
+        if any(result is None for result in results):
+            self.mark_failure()
+        else:
+            self.mark_success()
+
+        to_cache = {}
+        negative_to_cache = {}
+        for chunk, result in zip(chunks, results):
+            if result is None:
+                continue
+            for index, match in zip(chunk, result):
+                if match is None:
+                    negative_to_cache[keys[index]] = NOT_FOUND
+                else:
+                    to_cache[keys[index]] = rv[index] = match
+
+        if to_cache:
+            cache.set_many(to_cache, CACHE_TTL)
+        if negative_to_cache:
+            cache.set_many(negative_to_cache, NEGATIVE_CACHE_TTL)
+
+        return rv
+
+
+system_symbol_client = SystemSymbolClient()
+
+
 def lookup_system_symbols(symbols, sdk_info=None, cpu_name=None):
     """Looks for system symbols in the configured system server if
-    enabled.  If this failes or the server is disabled, `None` is
-    returned.
+    enabled.  If the server is disabled, `None` is returned.
     """
     if not options.get('symbolserver.enabled'):
         return
 
-    url = '%s/lookup' % options.get('symbolserver.options')['url'].rstrip('/')
-    sess = Session()
-    symbol_query = {
-        'sdk_id': sdk_info_to_sdk_id(sdk_info),
-        'cpu_name': cpu_name,
-        'symbols': symbols,
-    }
-
-    attempts = 0
-
-    with sess:
-        while 1:
-            try:
-                rv = sess.post(url, json=symbol_query)
-                # If the symbols server does not know about the SDK at all
-                # it will report a 404 here.  In that case just assume
-                # that we did not find a match and do not retry.
-                if rv.status_code == 404:
-                    return None
-                rv.raise_for_status()
-                return rv.json()['symbols']
-            except (IOError, RequestException):
-                attempts += 1
-                if attempts > MAX_ATTEMPTS:
-                    logger.error('Failed to contact system symbol server', exc_info=True)
-                    return
+    return system_symbol_client.lookup(symbols, sdk_info, cpu_name)
@@ -0,0 +1,175 @@
+from __future__ import absolute_import
+
+__all__ = ['AggregatingMetricsBackend']
+
+import atexit
+import logging
+import os
+
+from collections import defaultdict
+from contextlib import contextmanager
+from threading import Event, Lock, Thread
+
+import six
+
+from sentry.utils.imports import import_string
+
+from .base import MetricsBackend
+
+logger = logging.getLogger('sentry.errors')
+
+
+class MetricsBuffer(object):
+    """
+    Metrics accumulated by an ``AggregatingMetricsBackend``, shared between
+    all threads of the process that created it.
+    """
+
+    def __init__(self):
+        self.pid = os.getpid()
+        self.lock = Lock()
+        self.closed = Event()
+        self.counters = defaultdict(int)
+        self.timings = defaultdict(list)
+        self.size = 0
+
+    def incr(self, metric, amount):
+        with self.lock:
+            if metric not in self.counters:
+                self.size += 1
+            self.counters[metric] += amount
+            return self.size
+
+    def timing(self, metric, value, sample_rate):
+        with self.lock:
+            self.timings[metric].append((value, sample_rate))
+            self.size += 1
+            return self.size
+
+    def take(self):
+        with self.lock:
+            counters, self.counters = self.counters, defaultdict(int)
+            timings, self.timings = self.timings, defaultdict(list)
+            self.size = 0
+        return counters, timings
+
+
+# Backends are local to each thread, so the buffers they share are kept
+# here by the id of the backend. Forked processes inherit these without the
+# threads flushing them, so they are replaced in every new process.
+_buffers = {}
+_buffers_lock = Lock()
+_buffers_pid = os.getpid()
+
+
+def _reset_after_fork():
+    global _buffers, _buffers_lock, _buffers_pid
+    if _buffers_pid != os.getpid():
+        # The lock may have been held by another thread of the parent when
+        # it forked, so it can't be used here.
+        _buffers, _buffers_lock, _buffers_pid = {}, Lock(), os.getpid()
+
+
+class AggregatingMetricsBackend(MetricsBackend):
+    """
+    Wraps another metrics backend, accumulating metrics in memory and only
+    passing them on every ``flush_interval`` milliseconds.
+
+    Counters are summed per key, instance and tags, so that they are sent
+    once per flush regardless of how often they were incremented. Timings
+    are kept as they are, but are sent together in as few packets as the
+    wrapped backend supports.
+
+    The buffers are shared by all threads of a process. They are flushed by
+    a background thread every interval, when the process exits, and by the
+    metric that fills them up to ``max_buffer_size`` values. A process that
+    was forked after the backend was created starts its own buffer and
+    background thread with the first metric it records. Processes that exit
+    without running ``atexit`` handlers (such as prefork Celery workers)
+    lose the metrics of their last interval.
+
+    >>> SENTRY_METRICS_BACKEND = 'sentry.metrics.aggregating.AggregatingMetricsBackend'
+    >>> SENTRY_METRICS_OPTIONS = {
+    >>>     'backend': 'sentry.metrics.statsd.StatsdMetricsBackend',
+    >>>     'options': {'host': 'localhost', 'port': 8125},
+    >>> }
+    """
+
+    def __init__(self, backend, options=None, flush_interval=1000, max_buffer_size=1000,
+                 **kwargs):
+        self.backend = import_string(backend)(**(options or {}))
+        self.flush_interval = flush_interval / 1000.0
+        self.max_buffer_size = max_buffer_size
+        super(AggregatingMetricsBackend, self).__init__(**kwargs)
+        self._setup_buffer()
+
+    def _setup_buffer(self):
+        # This is called once for every thread using the backend, but only
+        # the first call of every process sets up the buffer.
+        _reset_after_fork()
+        with _buffers_lock:
+            self.buffer = _buffers.get(id(self))
+            if self.buffer is None:
+                self.buffer = _buffers[id(self)] = MetricsBuffer()
+                self._start()
+
+    def _get_buffer(self):
+        if self.buffer.pid != os.getpid():
+            self._setup_buffer()
+        return self.buffer
+
+    def _start(self):
+        closed = self.buffer.closed
+
+        def worker():
+            while not closed.wait(self.flush_interval):
+                self.flush()
+
+        t = Thread(target=worker)
+        t.setDaemon(True)
+        t.start()
+
+        atexit.register(self.close)
+
+    def close(self):
+        self._get_buffer().closed.set()
+        self.flush()
+
+    def _make_key(self, key, instance, tags):
+        return (key, instance, tuple(sorted(tags.items())) if tags else None)
+
+    def incr(self, key, instance=None, tags=None, amount=1, sample_rate=1):
+        # Every increment is counted, since aggregating them makes sampling
+        # unnecessary.
+        size = self._get_buffer().incr(self._make_key(key, instance, tags), amount)
+        if size >= self.max_buffer_size:
+            self.flush()
+
+    def timing(self, key, value, instance=None, tags=None, sample_rate=1):
+        size = self._get_buffer().timing(
+            self._make_key(key, instance, tags), value, sample_rate)
+        if size >= self.max_buffer_size:
+            self.flush()
+
+    def flush(self):
+        counters, timings = self._get_buffer().take()
+        if not counters and not timings:
+            return
+
+        try:
+            with self.batch():
+                for (key, instance, tags), amount in six.iteritems(counters):
+                    self.backend.incr(key, instance, dict(tags) if tags else None, amount)
+
+                for (key, instance, tags), values in six.iteritems(timings):
+                    for value, sample_rate in values:
+                        self.backend.timing(
+                            key, value, instance, dict(tags) if tags else None, sample_rate
+                        )
+        except Exception:
+            logger.exception('Unable to flush backend metrics')
+
+    @contextmanager
+    def batch(self):
+        with self.backend.batch():
+            yield
@@ -2,6 +2,7 @@ from __future__ import absolute_import
 
 __all__ = ['MetricsBackend']
 
+from contextlib import contextmanager
 from django.conf import settings
 from random import random
 from threading import local
@@ -26,3 +27,11 @@ class MetricsBackend(local):
 
     def timing(self, key, value, instance=None, tags=None, sample_rate=1):
         raise NotImplementedError
+
+    @contextmanager
+    def batch(self):
+        """
+        Metrics recorded within this context may be sent together, if the
+        backend supports it.
+        """
+        yield
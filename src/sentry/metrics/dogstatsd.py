@@ -2,7 +2,10 @@ from __future__ import absolute_import
 
 __all__ = ['DogStatsdMetricsBackend']
 
-from datadog import initialize, statsd
+from contextlib import contextmanager
+
+from datadog import initialize
+from datadog.dogstatsd import DogStatsd
 
 from .base import MetricsBackend
 
@@ -12,6 +15,12 @@ class DogStatsdMetricsBackend(MetricsBackend):
         # TODO(dcramer): it'd be nice if the initialize call wasn't a global
         self.tags = kwargs.pop('tags', None)
         initialize(**kwargs)
+        # Backends are local to each thread, so every thread gets its own
+        # client rather than sharing the buffer of the global one.
+        self.client = DogStatsd(
+            host=kwargs.get('statsd_host', 'localhost'),
+            port=kwargs.get('statsd_port', 8125),
+        )
         super(DogStatsdMetricsBackend, self).__init__(prefix=prefix)
 
     def incr(self, key, instance=None, tags=None, amount=1, sample_rate=1):
@@ -23,7 +32,7 @@ class DogStatsdMetricsBackend(MetricsBackend):
             tags['instance'] = instance
         if tags:
             tags = [u'{}:{}'.format(*i) for i in tags.items()]
-        statsd.increment(
+        self.client.increment(
             self._get_key(key),
             amount,
             sample_rate=sample_rate,
@@ -39,9 +48,19 @@ class DogStatsdMetricsBackend(MetricsBackend):
             tags['instance'] = instance
         if tags:
             tags = [u'{}:{}'.format(*i) for i in tags.items()]
-        statsd.timing(
+        self.client.timing(
             self._get_key(key),
             value,
             sample_rate=sample_rate,
             tags=tags,
         )
+
+    @contextmanager
+    def batch(self):
+        # Metrics are buffered and sent in as few packets as possible when
+        # the buffer is closed.
+        self.client.open_buffer()
+        try:
+            yield
+        finally:
+            self.client.close_buffer()
@@ -4,6 +4,8 @@ __all__ = ['StatsdMetricsBackend']
 
 import statsd
 
+from contextlib import contextmanager
+
 from .base import MetricsBackend
 
 
@@ -22,3 +24,15 @@ class StatsdMetricsBackend(MetricsBackend):
 
     def timing(self, key, value, instance=None, tags=None, sample_rate=1):
         self.client.timing(self._full_key(self._get_key(key)), value, sample_rate)
+
+    @contextmanager
+    def batch(self):
+        # The pipeline sends all of the metrics in as few packets as possible
+        # when it is exited.
+        client = self.client
+        with client.pipeline() as pipeline:
+            self.client = pipeline
+            try:
+                yield
+            finally:
+                self.client = client
@@ -18,7 +18,10 @@ import shutil
 import hashlib
 import logging
 import tempfile
+import threading
 
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from jsonfield import JSONField
 from django.db import models, transaction, IntegrityError
 from django.db.models.fields.related import OneToOneRel
@@ -26,7 +29,7 @@ from django.db.models.fields.related import OneToOneRel
 from symbolic import FatObject, SymbolicError, ObjectErrorUnsupportedObject, \
     SYMCACHE_LATEST_VERSION, SymCache, SymCacheErrorMissingDebugInfo, \
     SymCacheErrorMissingDebugSection, CfiCache, CfiErrorMissingDebugInfo, \
-    CFICACHE_LATEST_VERSION
+    CFICACHE_LATEST_VERSION, ProguardMappingView
 
 from sentry import options
 from sentry.cache import default_cache
@@ -51,6 +54,9 @@ ONE_DAY_AND_A_HALF = int(ONE_DAY * 1.5)
 # 10 minutes is assumed to be a reasonable value here.
 CONVERSION_ERROR_TTL = 60 * 10
 
+# Number of cache files that are downloaded concurrently
+CACHEFILE_DOWNLOAD_CONCURRENCY = 4
+
 DIF_MIMETYPES = dict((v, k) for k, v in KNOWN_DIF_TYPES.items())
 
 _proguard_file_re = re.compile(r'/proguard/(?:mapping-)?(.*?)\.txt$')
@@ -543,8 +549,10 @@ def create_files_from_dif_zip(fileobj, project, update_caches=True):
         # events start coming in.
         if update_caches:
             from sentry.tasks.symcache_update import symcache_update
+            warm_proguard = options.get('dsym.proguard-warmup')
             ids_to_update = [six.text_type(dif.debug_id) for dif in rv
-                             if dif.supports_caches]
+                             if dif.supports_caches or
+                             (warm_proguard and dif.dif_type == 'proguard')]
             if ids_to_update:
                 symcache_update.delay(project_id=project.id,
                                       debug_ids=ids_to_update)
@@ -558,6 +566,15 @@ def create_files_from_dif_zip(fileobj, project, update_caches=True):
 
 
 class DIFCache(object):
+    def __init__(self):
+        # Memory mapped cache files that are kept open in this process, keyed
+        # by ``(cache file id, version, class name)`` in LRU order. ProGuard
+        # mapping views share this pool, keyed by ``(debug id, checksum,
+        # class name)``.
+        self._open_cachefiles = OrderedDict()
+        self._open_cachefiles_size = 0
+        self._open_cachefiles_lock = threading.Lock()
+
     @property
     def cache_path(self):
         return options.get('dsym.cache-path')
@@ -573,6 +590,12 @@ class DIFCache(object):
         self._get_caches_impl(project, debug_ids, ProjectSymCacheFile)
         self._get_caches_impl(project, debug_ids, ProjectCfiCacheFile)
 
+        # ProGuard mappings are not converted, but they can be placed in the
+        # file system cache ahead of time. They are not opened here, as this
+        # process does not handle events.
+        if options.get('dsym.proguard-warmup'):
+            self.fetch_difs(project, debug_ids, features=['mapping'])
+
     def get_symcaches(self, project, debug_ids, on_dif_referenced=None,
                       with_conversion_errors=False):
         """Loads symcaches for the given debug IDs from the file system cache or
@@ -619,17 +642,49 @@ class DIFCache(object):
 
         rv = {}
         for debug_id, dif in six.iteritems(difs):
-            dif_path = os.path.join(self.get_project_path(project), debug_id)
-            try:
-                os.stat(dif_path)
-            except OSError as e:
-                if e.errno != errno.ENOENT:
-                    raise
-                dif.file.save_to(dif_path)
-            rv[debug_id] = dif_path
+            rv[debug_id] = self._fetch_dif(project, debug_id, dif)
 
         return rv
 
+    def get_proguard_mapping_views(self, project, debug_ids):
+        """Opens ProGuard mapping views for the given debug IDs.
+
+        Parsed views are kept open in this process as long as the mapping
+        file has not been replaced, so that they are only loaded once.
+        """
+        debug_ids = [six.text_type(debug_id).lower() for debug_id in debug_ids]
+        difs = ProjectDebugFile.objects.find_by_debug_ids(project, debug_ids, ['mapping'])
+        cls_name = ProguardMappingView.__name__.lower()
+
+        rv = {}
+        for debug_id, dif in six.iteritems(difs):
+            key = (debug_id, dif.file.checksum, cls_name)
+            view = self._get_open_cachefile(key)
+            if view is not None:
+                metrics.incr('proguard.mapping-views.hit')
+            else:
+                metrics.incr('proguard.mapping-views.miss')
+                dif_path = self._fetch_dif(project, debug_id, dif)
+                view = self._open_cachefile(key, dif_path, ProguardMappingView)
+            rv[debug_id] = view
+
+        return rv
+
+    def _fetch_dif(self, project, debug_id, dif):
+        # The checksum is part of the file name, so that a replaced debug file
+        # is never read from a stale copy.
+        dif_path = os.path.join(
+            self.get_project_path(project),
+            '%s_%s' % (debug_id, dif.file.checksum),
+        )
+        try:
+            os.stat(dif_path)
+        except OSError as e:
+            if e.errno != errno.ENOENT:
+                raise
+            dif.file.save_to(dif_path)
+        return dif_path
+
     def _generate_caches_impl(self, dif, filepath):
         _, _, error = self._update_cachefile(dif, filepath, ProjectSymCacheFile)
         if error is not None:
@@ -787,11 +842,82 @@ class DIFCache(object):
         # another time, simply use the in-memory cache for now:
         return None, cache, None
 
+    def _get_open_cachefile(self, key):
+        with self._open_cachefiles_lock:
+            entry = self._open_cachefiles.pop(key, None)
+            if entry is None:
+                return None
+            self._open_cachefiles[key] = entry
+
+        cache, size, path, touched = entry
+
+        # Bump the timestamp of the file from time to time so that it is not
+        # removed by `clear_old_entries` while it is in use.
+        now = int(time.time())
+        if touched < now - ONE_DAY:
+            try:
+                os.utime(path, (now, now))
+            except OSError:
+                pass
+            with self._open_cachefiles_lock:
+                if key in self._open_cachefiles:
+                    self._open_cachefiles[key] = (cache, size, path, now)
+
+        return cache
+
+    def _open_cachefile(self, key, path, cls):
+        cache = cls.from_path(path)
+
+        max_size = options.get('dsym.cache-pool-size')
+        if not max_size:
+            return cache
+
+        size = os.path.getsize(path)
+        if size > max_size:
+            return cache
+
+        with self._open_cachefiles_lock:
+            previous = self._open_cachefiles.pop(key, None)
+            if previous is not None:
+                self._open_cachefiles_size -= previous[1]
+
+            self._open_cachefiles[key] = (cache, size, path, int(time.time()))
+            self._open_cachefiles_size += size
+
+            while self._open_cachefiles_size > max_size:
+                _, (_, evicted_size, _, _) = self._open_cachefiles.popitem(last=False)
+                self._open_cachefiles_size -= evicted_size
+
+        return cache
+
+    def _download_cachefiles(self, downloads):
+        # The blob indexes are loaded upfront, so that only the blob storage
+        # is accessed from the download threads.
+        downloads = [
+            (model.cache_file, list(model.cache_file.get_blob_indexes()), path)
+            for model, path in downloads
+        ]
+
+        if len(downloads) == 1:
+            cache_file, blob_indexes, cache_path = downloads[0]
+            cache_file.save_to(cache_path, indexes=blob_indexes)
+            return
+
+        with ThreadPoolExecutor(max_workers=CACHEFILE_DOWNLOAD_CONCURRENCY) as exe:
+            futures = [
+                exe.submit(cache_file.save_to, cache_path, indexes=blob_indexes)
+                for cache_file, blob_indexes, cache_path in downloads
+            ]
+
+        for future in futures:
+            future.result()
+
     def _load_cachefiles_via_fs(self, project, cachefiles, cls):
         rv = {}
         base = self.get_project_path(project)
         cls_name = cls.__name__.lower()
 
+        missing = []
         for debug_id, model, cache in cachefiles:
             # If we're given a cache instance, use that over accessing the file
             # system or potentially even blob storage.
@@ -801,6 +927,13 @@ class DIFCache(object):
             elif model is None:
                 raise RuntimeError('missing %s file to load from fs' % cls_name)
 
+            # Reuse the cache file if it is still open in this process.
+            key = (model.id, model.version, cls_name)
+            cache = self._get_open_cachefile(key)
+            if cache is not None:
+                rv[debug_id] = cache
+                continue
+
             # Try to locate a cached instance from the file system and bump the
             # timestamp to indicate it is still being used. Otherwise, download
             # from the blob store and place it in the cache folder.
@@ -811,13 +944,20 @@ class DIFCache(object):
             except OSError as e:
                 if e.errno != errno.ENOENT:
                     raise
-                model.cache_file.save_to(cachefile_path)
+                missing.append((debug_id, key, model, cachefile_path))
+                continue
             else:
                 now = int(time.time())
                 if stat.st_ctime < now - ONE_DAY:
                     os.utime(cachefile_path, (now, now))
 
-            rv[debug_id] = cls.from_path(cachefile_path)
+            rv[debug_id] = self._open_cachefile(key, cachefile_path, cls)
+
+        if missing:
+            self._download_cachefiles([(model, path) for _, _, model, path in missing])
+            for debug_id, key, _, cachefile_path in missing:
+                rv[debug_id] = self._open_cachefile(key, cachefile_path, cls)
+
         return rv
 
     def clear_old_entries(self):
@@ -13,6 +13,7 @@ import six
 import mmap
 import tempfile
 
+from collections import deque
 from hashlib import sha1
 from uuid import uuid4
 from threading import Semaphore
@@ -96,6 +97,25 @@ def _locked_blob(checksum, logger=nooplogger):
     logger.info('_locked_blob.end', extra={'checksum': checksum})
 
 
+def _iter_blob_contents(blobs, concurrency=MULTI_BLOB_UPLOAD_CONCURRENCY):
+    """
+    Yields the contents of the given blobs in order while fetching up to
+    `concurrency` blobs ahead from the storage.
+    """
+    def _read_blob(blob):
+        with blob.getfile() as f:
+            return f.read()
+
+    with ThreadPoolExecutor(max_workers=concurrency) as exe:
+        pending = deque()
+        for blob in blobs:
+            pending.append(exe.submit(_read_blob, blob))
+            if len(pending) >= concurrency:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
 class AssembleChecksumMismatch(Exception):
     pass
 
@@ -114,6 +134,24 @@ def get_storage():
     return storage(**options)
 
 
+_blob_caches = {}
+
+
+def get_blob_cache():
+    from sentry import options
+    path = options.get('filestore.cache-path')
+    if not path:
+        return None
+    max_size = options.get('filestore.cache-size')
+
+    try:
+        return _blob_caches[path, max_size]
+    except KeyError:
+        from sentry.filestore.cache import BlobCache
+        cache = _blob_caches[path, max_size] = BlobCache(path, max_size)
+        return cache
+
+
 class FileBlob(Model):
     __core__ = False
 
@@ -144,33 +182,35 @@ class FileBlob(Model):
             else:
                 files_with_checksums.append((fileobj, None))
 
-        checksums_seen = set()
         blobs_created = []
         blobs_to_save = []
         locks = set()
         semaphore = Semaphore(value=MULTI_BLOB_UPLOAD_CONCURRENCY)
 
         def _upload_and_pend_chunk(fileobj, size, checksum, lock):
-            logger.info(
-                'FileBlob.from_files._upload_and_pend_chunk.start',
-                extra={
-                    'checksum': checksum,
-                    'size': size,
-                }
-            )
-            blob = cls(size=size, checksum=checksum)
-            blob.path = cls.generate_unique_path()
-            storage = get_storage()
-            storage.save(blob.path, fileobj)
-            blobs_to_save.append((blob, lock))
-            metrics.timing('filestore.blob-size', size, tags={'function': 'from_files'})
-            logger.info(
-                'FileBlob.from_files._upload_and_pend_chunk.end',
-                extra={
-                    'checksum': checksum,
-                    'path': blob.path,
-                }
-            )
+            try:
+                logger.info(
+                    'FileBlob.from_files._upload_and_pend_chunk.start',
+                    extra={
+                        'checksum': checksum,
+                        'size': size,
+                    }
+                )
+                blob = cls(size=size, checksum=checksum)
+                blob.path = cls.generate_unique_path()
+                storage = get_storage()
+                storage.save(blob.path, fileobj)
+                blobs_to_save.append((blob, lock))
+                metrics.timing('filestore.blob-size', size, tags={'function': 'from_files'})
+                logger.info(
+                    'FileBlob.from_files._upload_and_pend_chunk.end',
+                    extra={
+                        'checksum': checksum,
+                        'path': blob.path,
+                    }
+                )
+            finally:
+                semaphore.release()
 
         def _ensure_blob_owned(blob):
             if organization is None:
@@ -200,27 +240,43 @@ class FileBlob(Model):
                 _save_blob(blob)
                 lock.__exit__(None, None, None)
                 locks.discard(lock)
-                semaphore.release()
 
+        # Before we go and do something with the files we calculate the
+        # checksums and compare them against the references.  This also
+        # deduplicates duplicates uploaded in the same request.  This is
+        # necessary because we acquire multiple locks in one go which would
+        # let us deadlock otherwise.
+        files_to_upload = []
+        checksums_seen = set()
+        for fileobj, reference_checksum in files_with_checksums:
+            size, checksum = _get_size_and_checksum(fileobj)
+            if reference_checksum is not None and checksum != reference_checksum:
+                raise IOError('Checksum mismatch')
+            if checksum in checksums_seen:
+                continue
+            checksums_seen.add(checksum)
+            files_to_upload.append((fileobj, size, checksum))
+
+        # Blobs that already exist are looked up in a single query and don't
+        # need to be locked.  Blobs that are created concurrently are still
+        # detected when acquiring the lock below.
+        existing_blobs = {
+            blob.checksum: blob for blob in
+            cls.objects.filter(checksum__in=checksums_seen)
+        }
+
+        futures = []
         try:
             with ThreadPoolExecutor(max_workers=MULTI_BLOB_UPLOAD_CONCURRENCY) as exe:
-                for fileobj, reference_checksum in files_with_checksums:
-                    logger.info(
-                        'FileBlob.from_files.executor_start', extra={
-                            'checksum': reference_checksum})
+                for fileobj, size, checksum in files_to_upload:
+                    logger.info('FileBlob.from_files.executor_start', extra={'checksum': checksum})
                     _flush_blobs()
 
-                    # Before we go and do something with the files we calculate
-                    # the checksums and compare it against the reference.  This
-                    # also deduplicates duplicates uploaded in the same request.
-                    # This is necessary because we acquire multiple locks in one
-                    # go which would let us deadlock otherwise.
-                    size, checksum = _get_size_and_checksum(fileobj)
-                    if reference_checksum is not None and checksum != reference_checksum:
-                        raise IOError('Checksum mismatch')
-                    if checksum in checksums_seen:
+                    existing = existing_blobs.get(checksum)
+                    if existing is not None:
+                        blobs_created.append(existing)
+                        _ensure_blob_owned(existing)
                         continue
-                    checksums_seen.add(checksum)
 
                     # Check if we need to lock the blob.  If we get a result back
                     # here it means the blob already exists.
@@ -243,8 +299,12 @@ class FileBlob(Model):
                     # `_flush_blobs` call will take all those uploaded
                     # blobs and associate them with the database.
                     semaphore.acquire()
-                    exe.submit(_upload_and_pend_chunk(fileobj, size, checksum, lock))
-                    logger.info('FileBlob.from_files.end', extra={'checksum': reference_checksum})
+                    futures.append(exe.submit(_upload_and_pend_chunk, fileobj, size, checksum, lock))
+                    logger.info('FileBlob.from_files.end', extra={'checksum': checksum})
+
+            # Raise the first error that happened during an upload
+            for future in futures:
+                future.result()
 
             _flush_blobs()
         finally:
@@ -326,7 +386,10 @@ class FileBlob(Model):
         assert self.path
 
         storage = get_storage()
-        return storage.open(self.path)
+        cache = get_blob_cache()
+        if cache is None:
+            return storage.open(self.path)
+        return FileObj(cache.open(self.checksum, lambda: storage.open(self.path)))
 
 
 class File(Model):
@@ -351,12 +414,15 @@ class File(Model):
         app_label = 'sentry'
         db_table = 'sentry_file'
 
+    def get_blob_indexes(self):
+        return FileBlobIndex.objects.filter(
+            file=self,
+        ).select_related('blob').order_by('offset')
+
     def _get_chunked_blob(self, mode=None, prefetch=False,
-                          prefetch_to=None, delete=True):
+                          prefetch_to=None, delete=True, indexes=None):
         return ChunkedFileBlobIndexWrapper(
-            FileBlobIndex.objects.filter(
-                file=self,
-            ).select_related('blob').order_by('offset'),
+            self.get_blob_indexes() if indexes is None else indexes,
             mode=mode,
             prefetch=prefetch,
             prefetch_to=prefetch_to,
@@ -379,10 +445,13 @@ class File(Model):
             return impl.detach_tempfile()
         return FileObj(impl, self.name)
 
-    def save_to(self, path):
+    def save_to(self, path, indexes=None):
         """Fetches the file and emplaces it at a certain location.  The
         write is done atomically to a tempfile first and then moved over.
         If the directory does not exist it is created.
+
+        The blob indexes of the file can be passed as `indexes` if they
+        have been loaded already, in which case the database is not queried.
         """
         path = os.path.abspath(path)
         base = os.path.dirname(path)
@@ -395,7 +464,8 @@ class File(Model):
         try:
             f = self._get_chunked_blob(prefetch=True,
                                        prefetch_to=base,
-                                       delete=False).detach_tempfile()
+                                       delete=False,
+                                       indexes=indexes).detach_tempfile()
             os.rename(f.name, path)
             f.close()
             f = None
@@ -441,12 +511,17 @@ class File(Model):
             self.save()
         return results
 
-    def assemble_from_file_blob_ids(self, file_blob_ids, checksum, commit=True):
+    def assemble_from_file_blob_ids(self, file_blob_ids, checksum, commit=True,
+                                    as_tempfile=True):
         """
         This creates a file, from file blobs and returns a temp file with the
         contents.
+
+        The blobs are fetched concurrently and streamed in order into the
+        checksum calculation.  If `as_tempfile` is disabled the contents are
+        only verified and `None` is returned instead of a temp file.
         """
-        tf = tempfile.NamedTemporaryFile()
+        tf = tempfile.NamedTemporaryFile() if as_tempfile else None
         with transaction.atomic():
             file_blobs = FileBlob.objects.filter(id__in=file_blob_ids).all()
             # Make sure the blobs are sorted with the order provided
@@ -454,16 +529,20 @@ class File(Model):
 
             new_checksum = sha1(b'')
             offset = 0
+            indexes = []
             for blob in file_blobs:
-                FileBlobIndex.objects.create(
+                indexes.append(FileBlobIndex(
                     file=self,
                     blob=blob,
                     offset=offset,
-                )
-                for chunk in blob.getfile().chunks():
-                    new_checksum.update(chunk)
-                    tf.write(chunk)
+                ))
                 offset += blob.size
+            FileBlobIndex.objects.bulk_create(indexes)
+
+            for chunk in _iter_blob_contents(file_blobs):
+                new_checksum.update(chunk)
+                if tf is not None:
+                    tf.write(chunk)
 
             self.size = offset
             self.checksum = new_checksum.hexdigest()
@@ -474,8 +553,9 @@ class File(Model):
         metrics.timing('filestore.file-size', offset)
         if commit:
             self.save()
-        tf.flush()
-        tf.seek(0)
+        if tf is not None:
+            tf.flush()
+            tf.seek(0)
         return tf
 
 
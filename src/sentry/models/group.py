@@ -27,6 +27,7 @@ from sentry.db.models import (
     BaseManager, BoundedBigIntegerField, BoundedIntegerField, BoundedPositiveIntegerField,
     FlexibleForeignKey, GzippedDictField, Model, sane_repr
 )
+from sentry.utils.dates import to_timestamp
 from sentry.utils.http import absolute_uri
 from sentry.utils.numbers import base32_decode, base32_encode
 from sentry.utils.strings import strip, truncatechars
@@ -236,7 +237,10 @@ class Group(Model):
         verbose_name_plural = _('grouped messages')
         verbose_name = _('grouped message')
         permissions = (("can_view", "Can view"), )
-        index_together = (('project', 'first_release'), )
+        index_together = (
+            ('project', 'first_release'),
+            ('project', 'status', 'score'),
+        )
         unique_together = (('project', 'short_id'), )
 
     __repr__ = sane_repr('project_id')
@@ -434,4 +438,7 @@ class Group(Model):
 
     @classmethod
     def calculate_score(cls, times_seen, last_seen):
-        return math.log(float(times_seen or 1)) * 600 + float(last_seen.strftime('%s'))
+        # This needs to match ``scoreclause_sql`` (which is used when the
+        # score is updated by the database) for the priority index to be
+        # consistent.
+        return math.log10(float(times_seen or 1)) * 600 + int(to_timestamp(last_seen))
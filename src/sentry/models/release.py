@@ -215,6 +215,11 @@ class Release(Model):
 
             Group.objects.filter(first_release=release).update(first_release=to_release)
 
+            # Artifacts were moved without sending signals, so the cached
+            # manifests of both releases are invalidated here.
+            ReleaseFile.bump_manifest_version(to_release.id)
+            ReleaseFile.bump_manifest_version(release.id)
+
             release.delete()
 
     @property
@@ -8,12 +8,27 @@ sentry.models.releasefile
 
 from __future__ import absolute_import
 
+from uuid import uuid4
+
 from django.db import models
+from django.db.models.signals import post_delete, post_save
+from six.moves import cPickle as pickle
 from six.moves.urllib.parse import urlsplit, urlunsplit
 
 from sentry.db.models import BoundedPositiveIntegerField, FlexibleForeignKey, Model, sane_repr
+from sentry.utils.cache import cache
 from sentry.utils.hashlib import sha1_text
 
+# Manifests are keyed by a per-release version that is bumped whenever an
+# artifact changes, this only bounds how long unused manifests are kept.
+MANIFEST_CACHE_TTL = 3600
+
+# Releases with more artifacts than this, or whose manifest would not fit into
+# a single cache value, are not cached and artifacts are looked up per file.
+MANIFEST_MAX_ARTIFACTS = 5000
+MANIFEST_MAX_SIZE = 900 * 1024
+MANIFEST_TOO_LARGE = -1
+
 
 class ReleaseFile(Model):
     r"""
@@ -62,6 +77,61 @@ class ReleaseFile(Model):
             return sha1_text(name + '\x00\x00' + dist).hexdigest()
         return sha1_text(name).hexdigest()
 
+    @classmethod
+    def _get_manifest_version_key(cls, release_id):
+        return 'releasefile:manifest-version:%s' % (release_id, )
+
+    @classmethod
+    def _get_manifest_version(cls, release_id):
+        version_key = cls._get_manifest_version_key(release_id)
+        version = cache.get(version_key)
+        if version is None:
+            version = uuid4().hex
+            if not cache.add(version_key, version, MANIFEST_CACHE_TTL):
+                version = cache.get(version_key) or version
+        return version
+
+    @classmethod
+    def bump_manifest_version(cls, release_id):
+        cache.set(cls._get_manifest_version_key(release_id), uuid4().hex, MANIFEST_CACHE_TTL)
+
+    @classmethod
+    def get_manifest(cls, release, dist=None):
+        """Returns the artifacts of a release and distribution as a dict of
+        ``(file id, checksum, headers)`` tuples keyed by their ident, or
+        `None` if the release has too many artifacts to keep a manifest.
+
+        The manifest is built with a single query and cached under the
+        current artifact version of the release. Changing an artifact bumps
+        the version, so a manifest built concurrently with a change is never
+        read again.
+        """
+        dist_id = dist and dist.id or None
+        cache_key = 'releasefile:manifest:v2:%s:%s:%s' % (
+            release.id, dist_id or '', cls._get_manifest_version(release.id),
+        )
+        manifest = cache.get(cache_key)
+        if manifest == MANIFEST_TOO_LARGE:
+            return None
+        if manifest is not None:
+            return manifest
+
+        artifacts = list(
+            cls.objects.filter(
+                release=release,
+                dist=dist_id,
+            ).select_related('file')[:MANIFEST_MAX_ARTIFACTS + 1]
+        )
+        manifest = dict(
+            (rf.ident, (rf.file_id, rf.file.checksum, rf.file.headers)) for rf in artifacts
+        )
+        if len(artifacts) > MANIFEST_MAX_ARTIFACTS or \
+                len(pickle.dumps(manifest, pickle.HIGHEST_PROTOCOL)) > MANIFEST_MAX_SIZE:
+            cache.set(cache_key, MANIFEST_TOO_LARGE, MANIFEST_CACHE_TTL)
+            return None
+        cache.set(cache_key, manifest, MANIFEST_CACHE_TTL)
+        return manifest
+
     @classmethod
     def normalize(cls, url):
         """Transforms a full absolute url into 2 or 4 generalized options
@@ -83,3 +153,11 @@ class ReleaseFile(Model):
         if query:
             urls.append('~' + urlunsplit(uri_relative_without_query))
         return urls
+
+
+def clear_manifest(instance, **kwargs):
+    ReleaseFile.bump_manifest_version(instance.release_id)
+
+
+post_save.connect(clear_manifest, sender=ReleaseFile, weak=False)
+post_delete.connect(clear_manifest, sender=ReleaseFile, weak=False)
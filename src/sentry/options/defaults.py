@@ -59,6 +59,17 @@ register('redis.options', type=Dict, flags=FLAG_NOSTORE)
 
 # symbolizer specifics
 register('dsym.cache-path', type=String, default='/tmp/sentry-dsym-cache')
+# Total size in bytes of the symcaches and cficaches kept open per process
+register('dsym.cache-pool-size', default=256 * 1024 * 1024)
+# Download uploaded ProGuard mappings into the file system cache of the
+# symcache update worker, so that event workers sharing that cache don't
+# have to fetch them
+register('dsym.proguard-warmup', default=False)
+
+# Digests
+# Number of ready digests that are delivered by a single task (1 delivers
+# every digest by its own task.)
+register('digests.delivery-batch-size', default=1)
 
 # Mail
 register('mail.backend', default='smtp', flags=FLAG_NOSTORE)
@@ -100,6 +111,13 @@ register('beacon.anonymous', type=Bool, flags=FLAG_REQUIRED)
 # Filestore
 register('filestore.backend', default='filesystem', flags=FLAG_NOSTORE)
 register('filestore.options', default={'location': '/tmp/sentry-files'}, flags=FLAG_NOSTORE)
+# Local cache of file blobs (disabled if no path is set)
+register('filestore.cache-path', default='', flags=FLAG_NOSTORE)
+register('filestore.cache-size', default=1024 * 1024 * 1024, flags=FLAG_NOSTORE)
+
+# Number of minified files and sourcemaps that are fetched concurrently when
+# processing a JavaScript event (1 fetches them one after another).
+register('sourcemaps.fetch-concurrency', default=1)
 
 # Symbol server
 register('symbolserver.enabled', default=False, flags=FLAG_ALLOW_EMPTY | FLAG_PRIORITIZE_DISK)
@@ -115,8 +133,15 @@ register('analytics.options', default={}, flags=FLAG_NOSTORE)
 
 register('cloudflare.secret-key', default='')
 
+# The number of seconds the results of feature checks are cached for in
+# every process, in addition to the cache for the current request.
+register('features.cache-ttl', default=0)
+
 # Tagstore
 register('tagstore.multi-sampling', default=0.0)
+# The number of events whose tags are buffered and written together. When
+# this is 1, the tags of every event are written by their own task.
+register('tagstore.index-batch-size', default=1)
 
 # Slack Integration
 register('slack.client-id', flags=FLAG_PRIORITIZE_DISK)
@@ -140,6 +165,8 @@ register('snuba.use_group_id_column', default=True)
 register('snuba.search.pre-snuba-candidates-optimizer', type=Bool, default=False)
 register('snuba.search.pre-snuba-candidates-percentage', default=0.2)
 register('snuba.search.project-group-count-cache-time', default=24 * 60 * 60)
+register('snuba.search.pre-snuba-candidates-planner', type=Bool, default=False)
+register('snuba.search.project-group-stats-cache-time', default=60 * 60)
 register('snuba.search.min-pre-snuba-candidates', default=500)
 register('snuba.search.max-pre-snuba-candidates', default=5000)
 register('snuba.search.chunk-growth-rate', default=1.5)
@@ -156,3 +183,9 @@ register('eventstream.kafka.send-post_process-task', type=Bool, default=True)
 # Ingest refactor
 register('store.process-in-kafka', type=Bool, default=False)
 register('store.kafka-sample-rate', default=0.0)
+# Save events in the worker that preprocessed or processed them instead of
+# storing them in the cache and handing them to ``save_event``.
+register('store.fused-pipeline', type=Bool, default=False)
+# Store event payloads in the processing cache as compressed JSON. Payloads
+# stored without it can always be read.
+register('store.event-payload-codec', type=Bool, default=False)
@@ -11,10 +11,28 @@ __all__ = ('PluginManager', )
 
 import logging
 
+from sentry.utils import metrics
 from sentry.utils.managers import InstanceManager
 from sentry.utils.safe import safe_execute
 
 
+def implements_hook(plugin, name):
+    """
+    Returns whether the plugin overrides the hook ``name`` instead of
+    inheriting the default implementation of the plugin interface.
+    """
+    from sentry.plugins.base.v1 import IPlugin
+    from sentry.plugins.base.v2 import IPlugin2
+
+    if name in plugin.__dict__:
+        return True
+
+    for cls in type(plugin).__mro__:
+        if name in cls.__dict__:
+            return cls not in (IPlugin, IPlugin2)
+    return False
+
+
 class PluginManager(InstanceManager):
     def __iter__(self):
         return iter(self.all())
@@ -22,8 +40,51 @@ class PluginManager(InstanceManager):
     def __len__(self):
         return sum(1 for i in self.all())
 
-    def all(self, version=1):
-        for plugin in sorted(super(PluginManager, self).all(), key=lambda x: x.get_title()):
+    def add(self, class_path):
+        self.hooks = {}
+        super(PluginManager, self).add(class_path)
+
+    def remove(self, class_path):
+        self.hooks = {}
+        super(PluginManager, self).remove(class_path)
+
+    def update(self, class_list):
+        self.hooks = {}
+        super(PluginManager, self).update(class_list)
+
+    def get_hook_implementations(self, name):
+        """
+        Returns all plugins (regardless of their version or whether they
+        are enabled) that implement the hook ``name``, ordered by title.
+
+        The result is computed once and reused until the registered plugins
+        change, so that the plugins that don't implement a hook don't need
+        to be called for every event.
+        """
+        implementations = self.hooks.get(name)
+        if implementations is None:
+            implementations = self.hooks[name] = [
+                plugin for plugin in
+                sorted(super(PluginManager, self).all(), key=lambda x: x.get_title())
+                if implements_hook(plugin, name)
+            ]
+        return implementations
+
+    def call_hook(self, plugin, name, *args, **kwargs):
+        """
+        Calls the hook ``name`` of the plugin using ``safe_execute`` and
+        records how long it took.
+        """
+        with metrics.timer('plugins.hook', tags={'hook': name, 'plugin': plugin.slug}):
+            return safe_execute(getattr(plugin, name), *args, **kwargs)
+
+    def all(self, version=1, hook=None):
+        if hook is not None:
+            candidates = self.get_hook_implementations(hook)
+        else:
+            candidates = sorted(super(PluginManager, self).all(), key=lambda x: x.get_title())
+
+        for plugin in candidates:
             if not plugin.is_enabled():
                 continue
             if version is not None and plugin.__version__ != version:
@@ -43,8 +104,8 @@ class PluginManager(InstanceManager):
                 return True
         return False
 
-    def for_project(self, project, version=1):
-        for plugin in self.all(version=version):
+    def for_project(self, project, version=1, hook=None):
+        for plugin in self.all(version=version, hook=hook):
             if not safe_execute(plugin.is_enabled, project, _with_transaction=False):
                 continue
             yield plugin
@@ -10,10 +10,12 @@ from __future__ import absolute_import
 import functools
 import six
 
+from threading import Lock
 from time import time
 
 from sentry.exceptions import InvalidConfiguration
 from sentry.quotas.base import NotRateLimited, Quota, RateLimited
+from sentry.utils import metrics
 from sentry.utils.redis import get_cluster_from_options, load_script
 
 is_rate_limited = load_script('quotas/is_rate_limited.lua')
@@ -34,16 +36,38 @@ class BasicRedisQuota(object):
         self.enforce = enforce
 
 
+class QuotaLease(object):
+    __slots__ = ['keys', 'args', 'accepted', 'capacity']
+
+    def __init__(self, keys, args, capacity):
+        # the counter keys and arguments of the quotas covered by the lease
+        self.keys = keys
+        self.args = args
+        # number of items accepted locally that have not been counted yet
+        self.accepted = 0
+        # maximum number of items that may be accepted locally
+        self.capacity = capacity
+
+
 class RedisQuota(Quota):
     #: The ``grace`` period allows accomodating for clock drift in TTL
     #: calculation since the clock on the Redis instance used to store quota
     #: metrics may not be in sync with the computer running this code.
     grace = 60
 
-    def __init__(self, **options):
+    def __init__(self, local_headroom=0, **options):
         self.cluster, options = get_cluster_from_options('SENTRY_QUOTA_OPTIONS', options)
         super(RedisQuota, self).__init__(**options)
         self.namespace = 'quota'
+        #: The fraction of the remaining capacity of a quota that may be
+        #: accepted by this process without consulting Redis. Items accepted
+        #: locally are added to the counters with the next check that goes to
+        #: Redis. As every process may accept up to this fraction of the
+        #: remaining capacity, quotas can only be exceeded if this is larger
+        #: than ``1 / number of processes``. ``0`` disables local leases.
+        self.local_headroom = local_headroom
+        self.__leases = {}
+        self.__leases_lock = Lock()
 
     def validate(self):
         try:
@@ -165,6 +189,59 @@ class RedisQuota(Quota):
         """Return the timestamp when the next rate limit period begins for an interval."""
         return (((timestamp - shift) // interval) + 1) * interval + shift
 
+    def __check_with_lease(self, client, project, quotas, keys, args):
+        """
+        Checks the quotas using the local lease for them if it still has
+        capacity left, returning ``None`` if the item was accepted locally.
+        Otherwise the quotas are checked in Redis (adding the items accepted
+        locally since the last check) and the lease is renewed based on the
+        remaining capacity.
+        """
+        lease_key = (project.organization_id, ) + tuple(quota.key for quota in quotas)
+        with self.__leases_lock:
+            lease = self.__leases.pop(lease_key, None)
+            if lease is not None and lease.keys == keys and lease.accepted < lease.capacity:
+                lease.accepted += 1
+                self.__leases[lease_key] = lease
+                return None
+
+        accepted = 0
+        if lease is not None and lease.accepted:
+            if lease.keys == keys:
+                accepted = lease.accepted
+            else:
+                # The window of (at least) one of the quotas ended since
+                # the lease was acquired. The items accepted locally still
+                # need to be counted in the window they were accepted in.
+                with client.pipeline(transaction=False) as pipe:
+                    for i in range(0, len(lease.keys), 2):
+                        pipe.incrby(lease.keys[i], lease.accepted)
+                        pipe.expireat(lease.keys[i], lease.args[i + 1])
+                    pipe.execute()
+            metrics.timing('quotas.redis.lease.accepted', lease.accepted)
+
+        try:
+            results = is_rate_limited(client, keys, args + [accepted])
+        except Exception:
+            if accepted:
+                # Keep the items accepted locally around so that they are
+                # counted with the next check.
+                with self.__leases_lock:
+                    self.__leases.setdefault(lease_key, lease)
+            raise
+        rejections, usages = results[:len(quotas)], results[len(quotas):]
+
+        if not any(rejections):
+            capacity = min(
+                int((quota.limit - usage) * self.local_headroom)
+                for quota, usage in zip(quotas, usages)
+            )
+            if capacity > 0:
+                with self.__leases_lock:
+                    self.__leases[lease_key] = QuotaLease(keys, args, capacity)
+
+        return rejections
+
     def is_rate_limited(self, project, key=None, timestamp=None):
         if timestamp is None:
             timestamp = time()
@@ -186,7 +263,12 @@ class RedisQuota(Quota):
             args.extend((quota.limit, int(expiry)))
 
         client = self.cluster.get_local_client_for_key(six.text_type(project.organization_id))
-        rejections = is_rate_limited(client, keys, args)
+        if self.local_headroom:
+            rejections = self.__check_with_lease(client, project, quotas, keys, args)
+            if rejections is None:
+                return NotRateLimited()
+        else:
+            rejections = is_rate_limited(client, keys, args)
         if any(rejections):
             enforce = False
             worst_case = (0, None)
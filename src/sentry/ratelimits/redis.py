@@ -2,19 +2,39 @@ from __future__ import absolute_import
 
 import six
 
+from threading import Lock
 from time import time
 
 from sentry.exceptions import InvalidConfiguration
 from sentry.ratelimits.base import RateLimiter
+from sentry.utils import metrics
 from sentry.utils.hashlib import md5_text
 from sentry.utils.redis import get_cluster_from_options
 
 
+class RateLimitLease(object):
+    __slots__ = ['key', 'accepted', 'capacity']
+
+    def __init__(self, key, capacity):
+        # the counter key of the window covered by the lease
+        self.key = key
+        # number of requests accepted locally that have not been counted yet
+        self.accepted = 0
+        # maximum number of requests that may be accepted locally
+        self.capacity = capacity
+
+
 class RedisRateLimiter(RateLimiter):
     window = 60
 
-    def __init__(self, **options):
+    def __init__(self, local_headroom=0, **options):
         self.cluster, options = get_cluster_from_options('SENTRY_RATELIMITER_OPTIONS', options)
+        #: The fraction of the remaining limit that may be accepted by this
+        #: process without consulting Redis, as for ``RedisQuota``. ``0``
+        #: disables local leases.
+        self.local_headroom = local_headroom
+        self.__leases = {}
+        self.__leases_lock = Lock()
 
     def validate(self):
         try:
@@ -35,8 +55,41 @@ class RedisRateLimiter(RateLimiter):
         else:
             key = 'rl:%s:%s' % (key_hex, bucket)
 
-        with self.cluster.map() as client:
-            result = client.incr(key)
-            client.expire(key, window)
+        accepted = 0
+        if self.local_headroom:
+            lease_key = (key_hex, project and project.id, window)
+            with self.__leases_lock:
+                lease = self.__leases.pop(lease_key, None)
+                if lease is not None and lease.key == key and lease.accepted < lease.capacity:
+                    lease.accepted += 1
+                    self.__leases[lease_key] = lease
+                    return False
+
+            # Requests accepted locally in a window that has ended since no
+            # longer count towards any limit.
+            if lease is not None and lease.key == key:
+                accepted = lease.accepted
+                metrics.timing('ratelimits.redis.lease.accepted', accepted)
+
+        try:
+            # The increment and expiry are sent to the same host in a single
+            # round trip.
+            with self.cluster.map() as client:
+                result = client.incr(key, accepted + 1)
+                client.expire(key, window)
+            count = result.value
+        except Exception:
+            if accepted:
+                # Keep the requests accepted locally around so that they are
+                # counted with the next check.
+                with self.__leases_lock:
+                    self.__leases.setdefault(lease_key, lease)
+            raise
+
+        if self.local_headroom and count < limit:
+            capacity = int((limit - count) * self.local_headroom)
+            if capacity > 0:
+                with self.__leases_lock:
+                    self.__leases[lease_key] = RateLimitLease(key, capacity)
 
-        return result.value > limit
+        return count > limit
@@ -44,8 +44,43 @@ def get_project(value):
 # and child proc
 _STOP_WORKER = '91650ec271ae4b3e8a67cdc909d80f8c'
 
+# Markers for tasks that are not chunks of rows to delete.
+_BULK_DELETE = 'f1e6a4e0d3a0482e9bbbc1a1b0c3f5d2'
+_NODESTORE_CLEANUP = '5c0e0b2c0e7d4f0f9d1c3a6f2b8e4d71'
 
-def multiprocess_worker(task_queue):
+
+def bulk_delete(model, chunk_size, silent, **kwargs):
+    import time
+    from sentry.db.deletion import BulkDeleteQuery
+    from sentry.utils import metrics
+
+    start = time.time()
+    deleted = BulkDeleteQuery(model=model, **kwargs).execute(chunk_size=chunk_size)
+    duration = time.time() - start
+
+    metrics.timing('cleanup.deleted', deleted, tags={'model': model.__name__})
+    if not silent:
+        click.echo(
+            u'>> Removed {deleted} {model} rows in {duration:.1f}s ({rate:.1f} rows/s)'.format(
+                deleted=deleted,
+                model=model.__name__,
+                duration=duration,
+                rate=deleted / duration if duration else 0,
+            )
+        )
+
+
+def nodestore_cleanup(cutoff):
+    from sentry.app import nodestore
+
+    try:
+        nodestore.cleanup(cutoff)
+    except NotImplementedError:
+        click.echo(
+            "NodeStore backend does not support cleanup operation", err=True)
+
+
+def multiprocess_worker(task_queue, errors):
     # Configure within each Process
     import logging
     from sentry.utils.imports import import_string
@@ -84,22 +119,33 @@ def multiprocess_worker(task_queue):
 
             configured = True
 
-        model, chunk = j
-        model = import_string(model)
-
         try:
-            task = deletions.get(
-                model=model,
-                query={'id__in': chunk},
-                skip_models=skip_models,
-                transaction_id=uuid4().hex,
-            )
+            if j[0] == _BULK_DELETE:
+                kwargs = dict(j[1])
+                kwargs['model'] = import_string(kwargs['model'])
+                bulk_delete(**kwargs)
+            elif j[0] == _NODESTORE_CLEANUP:
+                nodestore_cleanup(j[1])
+            else:
+                model, chunk = j
+                model = import_string(model)
+
+                task = deletions.get(
+                    model=model,
+                    query={'id__in': chunk},
+                    skip_models=skip_models,
+                    transaction_id=uuid4().hex,
+                )
 
-            while True:
-                if not task.chunk():
-                    break
+                while True:
+                    if not task.chunk():
+                        break
         except Exception as e:
             logger.exception(e)
+            # Report the failure to the main process, so that cleanup does
+            # not exit successfully.
+            with errors.get_lock():
+                errors.value += 1
         finally:
             task_queue.task_done()
 
@@ -117,6 +163,12 @@ def multiprocess_worker(task_queue):
 @click.option(
     '--silent', '-q', default=False, is_flag=True, help='Run quietly. No output on success.'
 )
+@click.option(
+    '--max-replication-lag',
+    type=float,
+    default=None,
+    help='Pause bulk deletions while replicas lag behind by more than this many seconds.'
+)
 @click.option('--model', '-m', multiple=True)
 @click.option('--router', '-r', default=None, help='Database router')
 @click.option(
@@ -127,7 +179,7 @@ def multiprocess_worker(task_queue):
     help='Send the duration of this command to internal metrics.'
 )
 @log_options()
-def cleanup(days, project, concurrency, silent, model, router, timed):
+def cleanup(days, project, concurrency, max_replication_lag, silent, model, router, timed):
     """Delete a portion of trailing data based on creation date.
 
     All data that is older than `--days` will be deleted.  The default for
@@ -135,6 +187,9 @@ def cleanup(days, project, concurrency, silent, model, router, timed):
     but if you have a specific project you want to limit this to this can be
     done with the `--project` flag which accepts a project ID or a string
     with the form `org/project` where both are slugs.
+
+    Independent models are cleaned up concurrently when `--concurrency` is
+    larger than one.
     """
     if concurrency < 1:
         click.echo('Error: Minimum concurrency is 1', err=True)
@@ -142,12 +197,14 @@ def cleanup(days, project, concurrency, silent, model, router, timed):
 
     # Make sure we fork off multiprocessing pool
     # before we import or configure the app
-    from multiprocessing import Process, JoinableQueue as Queue
+    from multiprocessing import Process, JoinableQueue as Queue, Value
 
     pool = []
     task_queue = Queue(1000)
+    # the number of tasks that failed in the worker processes
+    errors = Value('i', 0)
     for _ in xrange(concurrency):
-        p = Process(target=multiprocess_worker, args=(task_queue,))
+        p = Process(target=multiprocess_worker, args=(task_queue, errors))
         p.daemon = True
         p.start()
         pool.append(p)
@@ -156,7 +213,6 @@ def cleanup(days, project, concurrency, silent, model, router, timed):
     configure()
 
     from django.db import router as db_router
-    from sentry.app import nodestore
     from sentry.db.deletion import BulkDeleteQuery
     from sentry import models
 
@@ -233,11 +289,7 @@ def cleanup(days, project, concurrency, silent, model, router, timed):
             click.echo("Removing old NodeStore values")
 
         cutoff = timezone.now() - timedelta(days=days)
-        try:
-            nodestore.cleanup(cutoff)
-        except NotImplementedError:
-            click.echo(
-                "NodeStore backend does not support cleanup operation", err=True)
+        task_queue.put((_NODESTORE_CLEANUP, cutoff))
 
     for bqd in BULK_QUERY_DELETES:
         if len(bqd) == 4:
@@ -258,13 +310,18 @@ def cleanup(days, project, concurrency, silent, model, router, timed):
             if not silent:
                 click.echo('>> Skipping %s' % model.__name__)
         else:
-            BulkDeleteQuery(
-                model=model,
-                dtfield=dtfield,
-                days=days,
-                project_id=project_id,
-                order_by=order_by,
-            ).execute(chunk_size=chunk_size)
+            # Bulk deletions are independent of each other and of the
+            # deletions below, so they are run by the worker processes.
+            task_queue.put((_BULK_DELETE, {
+                'model': '.'.join((model.__module__, model.__name__)),
+                'dtfield': dtfield,
+                'days': days,
+                'project_id': project_id,
+                'order_by': order_by,
+                'chunk_size': chunk_size,
+                'max_replication_lag': max_replication_lag,
+                'silent': silent,
+            }))
 
     for model, dtfield, order_by in DELETES:
         if not silent:
@@ -295,6 +352,9 @@ def cleanup(days, project, concurrency, silent, model, router, timed):
 
             task_queue.join()
 
+    # Wait for all deletions to complete before cleaning up files.
+    task_queue.join()
+
     # Clean up FileBlob instances which are no longer used and aren't super
     # recent (as there could be a race between blob creation and reference)
     if not silent:
@@ -318,6 +378,10 @@ def cleanup(days, project, concurrency, silent, model, router, timed):
         metrics.timing('cleanup.duration', duration, instance=router)
         click.echo("Clean up took %s second(s)." % duration)
 
+    if errors.value:
+        click.echo(u'Error: {} cleanup task(s) failed'.format(errors.value), err=True)
+        raise click.Abort()
+
 
 def cleanup_unused_files(quiet=False):
     """
@@ -71,6 +71,33 @@ def fix_group_counters():
     )
 
 
+def fix_group_scores(batch_size=10000):
+    from sentry.models import Group
+    from sentry.utils.db import is_mysql, is_postgres
+    from django.db import connection
+    click.echo('Correcting Group.score')
+
+    # This needs to match ``Group.calculate_score`` and ``scoreclause_sql``.
+    if is_postgres():
+        score = 'log(GREATEST(times_seen, 1)) * 600 + last_seen::abstime::int'
+    elif is_mysql():
+        score = 'log10(GREATEST(times_seen, 1)) * 600 + unix_timestamp(last_seen)'
+    else:
+        click.echo(' - skipping, not supported by this database')
+        return
+
+    cursor = connection.cursor()
+    max_id = Group.objects.order_by('-id').values_list('id', flat=True).first() or 0
+    for start in range(0, max_id, batch_size):
+        with transaction.atomic():
+            cursor.execute(
+                u"""
+                UPDATE sentry_groupedmessage SET score = {}
+                WHERE id > %s AND id <= %s
+            """.format(score), [start, start + batch_size]
+            )
+
+
 @click.command()
 @click.option(
     '--with-docs/--without-docs',
@@ -78,14 +105,21 @@ def fix_group_counters():
     help='Synchronize and repair embedded documentation. This '
     'is disabled by default.'
 )
+@click.option(
+    '--with-scores/--without-scores',
+    default=False,
+    help='Recalculate the priority score of all groups. This is '
+    'disabled by default.'
+)
 @configuration
-def repair(with_docs):
+def repair(with_docs, with_scores):
     """Attempt to repair any invalid data.
 
     This by default will correct some common issues like projects missing
     DSNs or counters desynchronizing.  Optionally it can also synchronize
     the current client documentation from the Sentry documentation server
-    (--with-docs).
+    (--with-docs) and recalculate the priority score of all groups in
+    batches (--with-scores).
     """
 
     if with_docs:
@@ -93,3 +127,6 @@ def repair(with_docs):
 
     create_missing_dsns()
     fix_group_counters()
+
+    if with_scores:
+        fix_group_scores()
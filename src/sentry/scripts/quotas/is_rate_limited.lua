@@ -17,25 +17,53 @@
 -- quotas are unaffected. The result is a Lua table/array (Redis multi bulk
 -- reply) that specifies whether or not the item was *rejected* based on the
 -- provided limit.
-assert(#KEYS == #ARGV, "incorrect number of keys and arguments provided")
+--
+-- An optional final ``ARGV`` value specifies a number of items that have
+-- already been accepted without consulting the counters (for example, by a
+-- local lease.) Those items are added to all counters regardless of the
+-- outcome of the check, and are taken into account when checking the limits.
+-- When this value is provided, the result additionally contains the current
+-- value of each quota (after subtracting refunds) following the rejections,
+-- i.e. ``{rejected_1, ..., rejected_n, usage_1, ..., usage_n}``.
+assert(#KEYS == #ARGV or #KEYS + 1 == #ARGV, "incorrect number of keys and arguments provided")
 assert(#KEYS % 2 == 0, "there must be an even number of keys")
 
+local accepted = 0
+if #ARGV > #KEYS then
+    accepted = tonumber(ARGV[#ARGV])
+end
+
 local results = {}
+local usages = {}
 local failed = false
 for i=1, #KEYS, 2 do
     local limit = tonumber(ARGV[i])
-    local rejected = (redis.call('GET', KEYS[i]) or 0) - (redis.call('GET', KEYS[i + 1]) or 0) + 1 > limit
+    local usage = (redis.call('GET', KEYS[i]) or 0) - (redis.call('GET', KEYS[i + 1]) or 0) + accepted
+    local rejected = usage + 1 > limit
     if rejected then
         failed = true
     end
     results[(i + 1) / 2] = rejected
+    usages[(i + 1) / 2] = usage
 end
 
+local increment = accepted
 if not failed then
+    increment = increment + 1
+end
+
+if increment > 0 then
     for i=1, #KEYS, 2 do
-        redis.call('INCR', KEYS[i])
+        redis.call('INCRBY', KEYS[i], increment)
         redis.call('EXPIREAT', KEYS[i], ARGV[i + 1])
     end
 end
 
+if #ARGV > #KEYS then
+    local n = #results
+    for i=1, n do
+        results[n + i] = usages[i] + increment - accepted
+    end
+end
+
 return results
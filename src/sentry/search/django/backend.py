@@ -9,15 +9,19 @@ sentry.search.django.backend
 from __future__ import absolute_import
 
 import functools
+import logging
 from datetime import timedelta
 
 from django.db import router
 from django.db.models import Q
+from django.db.models.signals import post_save
+from django.dispatch import receiver
 from django.utils import timezone
 
 from sentry import quotas, tagstore
 from sentry.api.paginator import DateTimePaginator, Paginator, SequencePaginator
 from sentry.search.base import ANY, SearchBackend
+from sentry.search.django.cache import StreamResultCache
 from sentry.search.django.constants import (
     MSSQL_ENGINES, MSSQL_SORT_CLAUSES, MYSQL_SORT_CLAUSES, ORACLE_SORT_CLAUSES, SORT_CLAUSES,
     SQLITE_SORT_CLAUSES
@@ -25,6 +29,11 @@ from sentry.search.django.constants import (
 from sentry.utils.dates import to_timestamp
 from sentry.utils.db import get_db_engine
 
+logger = logging.getLogger('sentry.search.django')
+
+# The maximum number of groups considered by environment scoped queries.
+MAX_ENVIRONMENT_CANDIDATES = 10000
+
 
 class QuerySetBuilder(object):
     """\
@@ -208,6 +217,46 @@ def get_latest_release(projects, environments):
 
 
 class DjangoSearchBackend(SearchBackend):
+    def __init__(self, stream_cache=None, **options):
+        # ``stream_cache`` options (such as ``cluster`` and ``ttl``) enable
+        # the ``StreamResultCache``, which is disabled by default.
+        if stream_cache is not None:
+            self.stream_cache = StreamResultCache(**stream_cache)
+        else:
+            self.stream_cache = None
+        super(DjangoSearchBackend, self).__init__(**options)
+
+    def setup(self):
+        if self.stream_cache is not None:
+            self.setup_receivers()
+
+    def setup_receivers(self):
+        from sentry.models import Group
+        from sentry.signals import buffer_incr_complete
+
+        def record_changes(project_id, group_ids):
+            try:
+                self.stream_cache.record_changes(project_id, group_ids)
+            except Exception:
+                logger.warning('Failed to record group changes', exc_info=True)
+
+        @receiver(post_save, sender=Group, weak=False,
+                  dispatch_uid='sentry.search.django.record_group_change')
+        def record_group_change(instance, **kwargs):
+            record_changes(instance.project_id, [instance.id])
+
+        @buffer_incr_complete.connect(
+            sender=Group, weak=False,
+            dispatch_uid='sentry.search.django.record_buffered_group_change',
+        )
+        def record_buffered_group_change(filters, **kwargs):
+            # The event manager includes the project in the filters of
+            # buffered group updates, so that no query is needed here.
+            group_id = filters.get('pk', filters.get('id'))
+            project_id = filters.get('project_id')
+            if group_id is not None and project_id is not None:
+                record_changes(project_id, [group_id])
+
     def query(self, projects, tags=None, environments=None, sort_by='date', limit=100,
               cursor=None, count_hits=False, paginator_options=None, **parameters):
 
@@ -444,56 +493,81 @@ class DjangoSearchBackend(SearchBackend):
 
             get_sort_expression, sort_value_to_cursor_value = environment_sort_strategies[sort_by]
 
-            group_tag_value_queryset = tagstore.get_group_tag_value_qs(
-                project_id=project.id,
-                group_id=set(group_queryset.values_list('id', flat=True)[:10000]),
-                environment_id=environment.id,
-                key='environment',
-                value=environment.name,
-            )
+            def get_candidates(group_ids=None):
+                if group_ids is None:
+                    queryset = group_queryset
+                else:
+                    queryset = group_queryset.filter(id__in=group_ids)
 
-            if retention_window_start is not None:
-                group_tag_value_queryset = group_tag_value_queryset.filter(
-                    last_seen__gte=retention_window_start
+                group_tag_value_queryset = tagstore.get_group_tag_value_qs(
+                    project_id=project.id,
+                    group_id=set(
+                        queryset.values_list('id', flat=True)[:MAX_ENVIRONMENT_CANDIDATES]
+                    ),
+                    environment_id=environment.id,
+                    key='environment',
+                    value=environment.name,
                 )
 
-            candidates = dict(
-                QuerySetBuilder({
-                    'age_from': ScalarCondition('first_seen', 'gt'),
-                    'age_to': ScalarCondition('first_seen', 'lt'),
-                    'last_seen_from': ScalarCondition('last_seen', 'gt'),
-                    'last_seen_to': ScalarCondition('last_seen', 'lt'),
-                    'times_seen': CallbackCondition(
-                        lambda queryset, times_seen: queryset.filter(times_seen=times_seen),
-                    ),
-                    'times_seen_lower': ScalarCondition('times_seen', 'gt'),
-                    'times_seen_upper': ScalarCondition('times_seen', 'lt'),
-                }).build(
-                    group_tag_value_queryset,
-                    parameters,
-                ).extra(
-                    select={
-                        'sort_value': get_sort_expression(group_tag_value_queryset.model),
-                    },
-                ).values_list('group_id', 'sort_value')
-            )
+                if retention_window_start is not None:
+                    group_tag_value_queryset = group_tag_value_queryset.filter(
+                        last_seen__gte=retention_window_start
+                    )
 
-            if tags:
-                # TODO: `get_group_ids_for_search_filter` should be able to
-                # utilize the retention window start parameter for additional
-                # optimizations.
-                matches = tagstore.get_group_ids_for_search_filter(
-                    project_id=project.id,
-                    environment_id=environment.id,
-                    tags=tags,
-                    candidates=candidates.keys(),
-                    limit=len(candidates),
+                candidates = dict(
+                    QuerySetBuilder({
+                        'age_from': ScalarCondition('first_seen', 'gt'),
+                        'age_to': ScalarCondition('first_seen', 'lt'),
+                        'last_seen_from': ScalarCondition('last_seen', 'gt'),
+                        'last_seen_to': ScalarCondition('last_seen', 'lt'),
+                        'times_seen': CallbackCondition(
+                            lambda queryset, times_seen: queryset.filter(times_seen=times_seen),
+                        ),
+                        'times_seen_lower': ScalarCondition('times_seen', 'gt'),
+                        'times_seen_upper': ScalarCondition('times_seen', 'lt'),
+                    }).build(
+                        group_tag_value_queryset,
+                        parameters,
+                    ).extra(
+                        select={
+                            'sort_value': get_sort_expression(group_tag_value_queryset.model),
+                        },
+                    ).values_list('group_id', 'sort_value')
+                )
+
+                if tags and candidates:
+                    # TODO: `get_group_ids_for_search_filter` should be able to
+                    # utilize the retention window start parameter for additional
+                    # optimizations.
+                    matches = tagstore.get_group_ids_for_search_filter(
+                        project_id=project.id,
+                        environment_id=environment.id,
+                        tags=tags,
+                        candidates=candidates.keys(),
+                        limit=len(candidates),
+                    )
+                    for key in set(candidates) - set(matches or []):
+                        del candidates[key]
+
+                return [
+                    (sort_value_to_cursor_value(score), id) for (id, score) in candidates.items()
+                ]
+
+            # Only environment scoped queries are cached, as they are the only
+            # ones that compute all of their candidates up front. The others
+            # are paginated by the database, which only reads a single page.
+            if self.stream_cache is not None and self.stream_cache.is_cacheable(parameters):
+                candidates = self.stream_cache.get_candidates(
+                    self.stream_cache.get_key(projects, environments, sort_by, tags, parameters),
+                    [project.id],
+                    get_candidates,
+                    max_candidates=MAX_ENVIRONMENT_CANDIDATES,
                 )
-                for key in set(candidates) - set(matches or []):
-                    del candidates[key]
+            else:
+                candidates = get_candidates()
 
             result = SequencePaginator(
-                [(sort_value_to_cursor_value(score), id) for (id, score) in candidates.items()],
+                candidates,
                 reverse=True,
                 **paginator_options
             ).get_result(limit, cursor, count_hits=count_hits)
@@ -0,0 +1,172 @@
+"""
+sentry.search.django.cache
+~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+:copyright: (c) 2010-2014 by the Sentry Team, see AUTHORS for more details.
+:license: BSD, see LICENSE for more details.
+"""
+
+from __future__ import absolute_import
+
+import logging
+from datetime import datetime
+from time import time
+
+import six
+from django.db import models
+
+from sentry.search.base import ANY
+from sentry.utils import json, metrics
+from sentry.utils.dates import to_timestamp
+from sentry.utils.hashlib import md5_text
+from sentry.utils.redis import get_cluster_from_options
+
+logger = logging.getLogger('sentry.search.django')
+
+# Parameters that filter on data other than the group row itself (or that
+# are computed from bounded event samples.) Changes to that data are not
+# tracked, so queries using them are never cached.
+UNCACHEABLE_PARAMETERS = frozenset([
+    'assigned_to',
+    'bookmarked_by',
+    'date_from',
+    'date_to',
+    'subscribed_by',
+    'unassigned',
+])
+
+
+def serialize_value(value):
+    if value is ANY:
+        return '__any__'
+    elif isinstance(value, models.Model):
+        return u'{}:{}'.format(type(value).__name__, value.pk)
+    elif isinstance(value, datetime):
+        return to_timestamp(value)
+    raise TypeError(u'Unable to serialize {!r}'.format(value))
+
+
+class StreamResultCache(object):
+    """\
+    Materializes the ordered ``(sort value, group id)`` candidates of stream
+    queries so that paginating through or refreshing the same query does not
+    need to recompute the whole result.
+
+    Whenever a group changes, its id is recorded in a per project change log
+    (a sorted set scored by the time of the change.) When a cached result is
+    read, only the groups that changed since the result was computed are
+    evaluated again and merged into the cached result.
+
+    Cached results expire ``ttl`` seconds after they have been computed from
+    scratch, which bounds how long changes that are not tracked (such as bulk
+    updates that do not send signals, or groups leaving the retention window)
+    can go unnoticed.
+    """
+
+    def __init__(self, ttl=300, **options):
+        self.cluster, options = get_cluster_from_options('SENTRY_SEARCH_OPTIONS', options)
+        self.ttl = ttl
+
+    def __get_result_key(self, key):
+        return u's:r:{}'.format(key)
+
+    def __get_changes_key(self, project_id):
+        return u's:c:{}'.format(project_id)
+
+    def is_cacheable(self, parameters):
+        return not UNCACHEABLE_PARAMETERS.intersection(parameters)
+
+    def get_key(self, projects, environments, sort_by, tags, parameters):
+        return md5_text(
+            json.dumps(
+                [
+                    sorted(project.id for project in projects),
+                    sorted(environment.id for environment in environments)
+                    if environments is not None else None,
+                    sort_by,
+                    sorted(tags.items()),
+                    sorted(parameters.items()),
+                ],
+                default=serialize_value,
+            )
+        ).hexdigest()
+
+    def record_changes(self, project_id, group_ids, timestamp=None):
+        if timestamp is None:
+            timestamp = time()
+
+        key = self.__get_changes_key(project_id)
+        with self.cluster.get_local_client_for_key(key).pipeline(transaction=False) as pipeline:
+            pipeline.zadd(key, **{six.text_type(group_id): timestamp for group_id in group_ids})
+            # Cached results are never older than the TTL, so older changes
+            # are no longer relevant.
+            pipeline.zremrangebyscore(key, '-inf', timestamp - self.ttl)
+            pipeline.expire(key, self.ttl)
+            pipeline.execute()
+
+    def get_changes(self, project_ids, since):
+        changes = set()
+        for project_id in project_ids:
+            key = self.__get_changes_key(project_id)
+            changes.update(
+                int(group_id) for group_id in
+                self.cluster.get_local_client_for_key(key).zrangebyscore(key, since, '+inf')
+            )
+        return changes
+
+    def get_candidates(self, key, project_ids, evaluate, max_candidates=None):
+        """\
+        Returns the cached candidates for the query identified by ``key``,
+        bringing them up to date first.
+
+        ``evaluate`` is called with a sequence of group ids to compute the
+        candidates for just those groups, or with ``None`` to compute the
+        complete result. It must return a list of ``(sort value, group id)``
+        pairs. If merging changed groups into the cached result exceeds
+        ``max_candidates``, only the candidates sorting highest are kept.
+        """
+        result_key = self.__get_result_key(key)
+        client = self.cluster.get_local_client_for_key(result_key)
+
+        # Changes are read using the time from before the candidates are
+        # evaluated, so changes happening concurrently are picked up by the
+        # next read.
+        now = time()
+
+        try:
+            entry = client.get(result_key)
+        except Exception:
+            logger.warning('Failed to read stream result cache', exc_info=True)
+            return evaluate(None)
+
+        if entry is None:
+            metrics.incr('search.django.stream-cache.miss')
+            candidates = evaluate(None)
+            entry = {
+                'created': now,
+                'timestamp': now,
+            }
+        else:
+            metrics.incr('search.django.stream-cache.hit')
+            entry = json.loads(entry)
+            candidates = [tuple(candidate) for candidate in entry['candidates']]
+
+            changes = self.get_changes(project_ids, entry['timestamp'])
+            metrics.timing('search.django.stream-cache.changes', len(changes))
+            if changes:
+                candidates = [
+                    candidate for candidate in candidates if candidate[1] not in changes
+                ] + list(evaluate(sorted(changes)))
+                if max_candidates is not None and len(candidates) > max_candidates:
+                    candidates = sorted(candidates, reverse=True)[:max_candidates]
+            entry['timestamp'] = now
+
+        ttl = int(self.ttl - (now - entry['created']))
+        if ttl > 0:
+            entry['candidates'] = candidates
+            try:
+                client.setex(result_key, ttl, json.dumps(entry))
+            except Exception:
+                logger.warning('Failed to write stream result cache', exc_info=True)
+
+        return candidates
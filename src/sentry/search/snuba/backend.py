@@ -7,12 +7,13 @@ import pytz
 import time
 from datetime import timedelta, datetime
 
+from django.db.models import Count
 from django.utils import timezone
 
 from sentry import options
 from sentry.api.paginator import DateTimePaginator, SequencePaginator, Paginator
 from sentry.event_manager import ALLOWED_FUTURE_DELTA
-from sentry.models import Release, Group, GroupEnvironment
+from sentry.models import Release, Group, GroupAssignee, GroupEnvironment
 from sentry.search.django import backend as ds
 from sentry.utils import snuba, metrics
 from sentry.utils.cache import cache
@@ -126,13 +127,125 @@ class ScalarCondition(Condition):
         )
 
 
+# Parameters that are applied in Postgres but for which
+# ``estimate_project_candidates`` can't give a lower bound. This includes the
+# user scoped filters, as only project wide totals are known for them.
+UNESTIMATED_PARAMETERS = frozenset([
+    'active_at_from',
+    'active_at_to',
+    'assigned_to',
+    'bookmarked_by',
+    'first_release',
+    'query',
+    'subscribed_by',
+])
+
+
+def get_project_group_stats(project_ids):
+    """\
+    Returns the statistics used to estimate the selectivity of Postgres
+    filters for each of the given projects.
+    """
+    stats = {
+        project_id: {
+            'status': {},
+            'assigned': 0,
+        } for project_id in project_ids
+    }
+
+    for project_id, status, count in Group.objects.filter(
+        project_id__in=project_ids,
+    ).values_list('project_id', 'status').annotate(count=Count('id')):
+        stats[project_id]['status'][status] = count
+
+    for project_id, count in GroupAssignee.objects.filter(
+        project_id__in=project_ids,
+    ).values_list('project_id').annotate(count=Count('id')):
+        stats[project_id]['assigned'] = count
+
+    return stats
+
+
+def estimate_project_candidates(stats, parameters):
+    """\
+    Returns a lower bound of the number of groups matching the Postgres
+    filters for a single project. Parameters in ``UNESTIMATED_PARAMETERS``
+    are not taken into account.
+    """
+    total = sum(stats['status'].values())
+    if 'status' in parameters:
+        estimate = stats['status'].get(parameters['status'], 0)
+    else:
+        estimate = total
+
+    if 'unassigned' in parameters:
+        # at least this many of the groups with the status must also match
+        # the assignment, even if all of the others do not
+        if parameters['unassigned']:
+            estimate -= stats['assigned']
+        else:
+            estimate -= total - stats['assigned']
+
+    return max(estimate, 0)
+
+
 class SnubaSearchBackend(ds.DjangoSearchBackend):
     def _get_project_count_cache_key(self, project_id):
         return 'snuba.search:project.group.count:%s' % project_id
 
+    def _get_project_stats_cache_key(self, project_id):
+        return 'snuba.search:project.group.stats:%s' % project_id
+
     def _get_project_id_from_key(self, key):
         return int(key.split(':')[2])
 
+    def _get_project_stats(self, projects):
+        keys = [self._get_project_stats_cache_key(p.id) for p in projects]
+
+        stats_by_projects = {
+            self._get_project_id_from_key(key): stats for key, stats in cache.get_many(keys).items()
+        }
+
+        missed_projects = {p.id for p in projects} - set(stats_by_projects.keys())
+        if missed_projects:
+            missing_stats = get_project_group_stats(list(missed_projects))
+
+            cache.set_many({
+                self._get_project_stats_cache_key(project_id): stats
+                for project_id, stats in missing_stats.items()
+            }, options.get('snuba.search.project-group-stats-cache-time'))
+
+            stats_by_projects.update(missing_stats)
+
+        return stats_by_projects
+
+    def _should_prefilter(self, projects, environments, num_candidates, **parameters):
+        """\
+        Decides up front whether candidate ids should be selected from
+        Postgres and passed down to Snuba (the "Postgres first" plan) or
+        whether Snuba should do all of the filtering and sorting it can, with
+        the results then being post-filtered in Postgres ("Snuba first").
+
+        The Postgres query is skipped if there are certainly more than
+        ``num_candidates`` candidates, as its results would be discarded
+        anyway. If any filter of unknown selectivity is present, the Postgres
+        query is always attempted.
+        """
+        if not options.get('snuba.search.pre-snuba-candidates-planner'):
+            return True
+
+        if environments or UNESTIMATED_PARAMETERS.intersection(parameters):
+            return True
+
+        stats_by_projects = self._get_project_stats(projects)
+        estimate = sum(
+            estimate_project_candidates(stats, parameters)
+            for stats in stats_by_projects.values()
+        )
+        metrics.timing('snuba.search.estimated_candidates', estimate)
+
+        return estimate <= num_candidates
+
     def _query(self, projects, retention_window_start, group_queryset, tags, environments,
                sort_by, limit, cursor, count_hits, paginator_options, **parameters):
 
@@ -305,6 +418,15 @@ class SnubaSearchBackend(ds.DjangoSearchBackend):
         # pre-filter query
         candidate_ids = None
         if num_candidates and limit <= num_candidates:
+            prefilter = self._should_prefilter(
+                projects, environments, num_candidates, **parameters
+            )
+            if not prefilter:
+                metrics.incr('snuba.search.planner.skip_prefilter')
+        else:
+            prefilter = False
+
+        if prefilter:
             candidate_ids = list(
                 group_queryset.values_list('id', flat=True)[:num_candidates + 1]
             )
@@ -10,7 +10,7 @@ from collections import namedtuple
 from sentry.models import Project, Release
 from sentry.utils.cache import cache
 from sentry.utils.hashlib import hash_values
-from sentry.utils.safe import get_path, safe_execute
+from sentry.utils.safe import get_path
 
 
 logger = logging.getLogger(__name__)
@@ -217,9 +217,10 @@ def should_process_for_stacktraces(data):
     platforms = set()
     for info in infos:
         platforms.update(info.platforms or ())
-    for plugin in plugins.all(version=2):
-        processors = safe_execute(
-            plugin.get_stacktrace_processors,
+    for plugin in plugins.all(version=2, hook='get_stacktrace_processors'):
+        processors = plugins.call_hook(
+            plugin,
+            'get_stacktrace_processors',
             data=data,
             stacktrace_infos=infos,
             platforms=platforms,
@@ -238,10 +239,11 @@ def get_processors_for_stacktraces(data, infos):
         platforms.update(info.platforms or ())
 
     processors = []
-    for plugin in plugins.all(version=2):
+    for plugin in plugins.all(version=2, hook='get_stacktrace_processors'):
         processors.extend(
-            safe_execute(
-                plugin.get_stacktrace_processors,
+            plugins.call_hook(
+                plugin,
+                'get_stacktrace_processors',
                 data=data,
                 stacktrace_infos=infos,
                 platforms=platforms,
@@ -23,7 +23,7 @@ from six.moves import reduce
 from sentry import buffer
 from sentry.tagstore import TagKeyStatus
 from sentry.tagstore.base import TagStorage, TOP_VALUES_DEFAULT_LIMIT
-from sentry.utils import db
+from sentry.utils import db, metrics
 
 from . import models
 from sentry.tagstore.types import TagKey, TagValue, GroupTagKey, GroupTagValue
@@ -61,6 +61,10 @@ transformers = {
 
 AGGREGATE_ENVIRONMENT_ID = 0
 
+# Whether the database behind each connection alias supports copying event
+# tags, as determined by ``V2TagStorage.__supports_copy``.
+_supports_copy = {}
+
 
 class V2TagStorage(TagStorage):
     """\
@@ -420,6 +424,142 @@ class V2TagStorage(TagStorage):
                 exc_info=True
             )
 
+    def create_event_tags_bulk(self, events):
+        # Tag keys and values are resolved once for all of the events, since
+        # events of the same project usually share most of them.
+        keys = defaultdict(set)
+        for event in events:
+            assert event['environment_id'] is not None
+            keys[(event['project_id'], event['environment_id'])].update(
+                key for key, _ in event['tags'])
+
+        tagkeys = {}
+        for (project_id, environment_id), project_keys in six.iteritems(keys):
+            for key, tagkey in six.iteritems(
+                self.get_or_create_tag_keys_bulk(project_id, environment_id, list(project_keys))
+            ):
+                tagkeys[(project_id, environment_id, key)] = tagkey
+
+        values = defaultdict(set)
+        for event in events:
+            values[event['project_id']].update(
+                (tagkeys[(event['project_id'], event['environment_id'], key)], value)
+                for key, value in event['tags']
+            )
+
+        tagvalues = {}
+        for project_id, project_values in six.iteritems(values):
+            for (tagkey, value), tagvalue in six.iteritems(
+                self.get_or_create_tag_values_bulk(project_id, list(project_values))
+            ):
+                tagvalues[(tagkey.id, value)] = tagvalue
+
+        now = timezone.now()
+        rows = set()
+        for event in events:
+            for key, value in event['tags']:
+                tagkey = tagkeys[(event['project_id'], event['environment_id'], key)]
+                rows.add((
+                    event['project_id'],
+                    event['group_id'],
+                    event['event_id'],
+                    tagkey.id,
+                    tagvalues[(tagkey.id, value)].id,
+                    event.get('date_added') or now,
+                ))
+
+        using = router.db_for_write(models.EventTag)
+        if self.__supports_copy(using):
+            self.__copy_event_tags(using, rows)
+        else:
+            rows_by_event = defaultdict(list)
+            for row in rows:
+                rows_by_event[row[:3]].append(row)
+
+            for (project_id, group_id, event_id), event_rows in six.iteritems(rows_by_event):
+                try:
+                    with transaction.atomic(using=using):
+                        models.EventTag.objects.bulk_create([
+                            models.EventTag(
+                                project_id=project_id,
+                                group_id=group_id,
+                                event_id=event_id,
+                                key_id=key_id,
+                                value_id=value_id,
+                                date_added=date_added,
+                            )
+                            for _, _, _, key_id, value_id, date_added in event_rows
+                        ])
+                except IntegrityError:
+                    logger.error(
+                        'tagstore.create_event_tags.integrity_error',
+                        extra={
+                            'project_id': project_id,
+                            'group_id': group_id,
+                            'event_id': event_id,
+                        },
+                        exc_info=True
+                    )
+
+        metrics.timing('tagstore.create_event_tags_bulk.rows', len(rows))
+
+    def __supports_copy(self, using):
+        if using not in _supports_copy:
+            # ``INSERT ... ON CONFLICT`` requires Postgres 9.5.
+            if db.is_postgres(using):
+                cursor = connections[using].cursor()
+                cursor.execute('show server_version_num')
+                _supports_copy[using] = int(cursor.fetchone()[0]) >= 90500
+            else:
+                _supports_copy[using] = False
+        return _supports_copy[using]
+
+    def __copy_event_tags(self, using, rows):
+        connection = connections[using]
+        quote_name = connection.ops.quote_name
+        table = models.EventTag._meta.db_table
+        staging = u'{}_staging'.format(table)
+        columns = ('project_id', 'group_id', 'event_id', 'key_id', 'value_id', 'date_added')
+
+        data = six.BytesIO()
+        for row in rows:
+            data.write(
+                u'\t'.join(
+                    [six.text_type(value) for value in row[:-1]] + [row[-1].isoformat()]
+                ).encode('utf-8') + b'\n'
+            )
+        data.seek(0)
+
+        # The rows are copied into a staging table first, so that rows that
+        # already exist (for example, because a batch is retried) can be
+        # skipped instead of failing the whole batch.
+        with transaction.atomic(using=using):
+            cursor = connection.cursor()
+            cursor.execute(
+                u"""
+                create temporary table {staging} (
+                    project_id bigint not null,
+                    group_id bigint not null,
+                    event_id bigint not null,
+                    key_id bigint not null,
+                    value_id bigint not null,
+                    date_added timestamp with time zone not null
+                ) on commit drop
+                """.format(staging=quote_name(staging))
+            )
+            cursor.copy_from(data, staging, columns=columns)
+            cursor.execute(
+                u"""
+                insert into {table} ({columns})
+                select {columns} from {staging}
+                on conflict do nothing
+                """.format(
+                    table=quote_name(table),
+                    staging=quote_name(staging),
+                    columns=u', '.join(columns),
+                )
+            )
+
     def get_tag_key(self, project_id, environment_id, key, status=TagKeyStatus.VISIBLE):
         from sentry.tagstore.exceptions import TagKeyNotFound
 
@@ -1,12 +1,17 @@
 from __future__ import absolute_import
 
 import logging
+import sys
 import time
 
+import six
+
+from sentry import options
 from sentry.digests import get_option_key
 from sentry.digests.backends.base import InvalidState
 from sentry.digests.notifications import (
     build_digest,
+    fetch_states,
     split_key,
 )
 from sentry.models import (
@@ -15,9 +20,15 @@ from sentry.models import (
 )
 from sentry.tasks.base import instrumented_task
 from sentry.utils import snuba
+from sentry.utils.iterators import chunked
 
 logger = logging.getLogger(__name__)
 
+# Every timeline of a batch keeps its delivery lock (which expires after 30
+# seconds) until all of the digests of the batch have been built, so batches
+# are kept small enough to finish well within that time.
+MAX_DELIVERY_BATCH_SIZE = 20
+
 
 @instrumented_task(name='sentry.tasks.digests.schedule_digests', queue='digests.scheduling')
 def schedule_digests():
@@ -36,8 +47,20 @@ def schedule_digests():
     timeout = 300
     digests.maintenance(deadline - timeout)
 
-    for entry in digests.schedule(deadline):
-        deliver_digest.delay(entry.key, entry.timestamp)
+    batch_size = min(options.get('digests.delivery-batch-size'), MAX_DELIVERY_BATCH_SIZE)
+    if batch_size <= 1:
+        for entry in digests.schedule(deadline):
+            deliver_digest.delay(entry.key, entry.timestamp)
+        return
+
+    # Deliver the digests of the same project in the same batch where
+    # possible, since they share most of their state.
+    keys = sorted(
+        (entry.key for entry in digests.schedule(deadline)),
+        key=lambda key: key.rsplit(':', 1)[-1],
+    )
+    for batch in chunked(keys, batch_size):
+        deliver_digests.delay(batch)
 
 
 @instrumented_task(name='sentry.tasks.digests.deliver_digest', queue='digests.delivery')
@@ -65,3 +88,91 @@ def deliver_digest(key, schedule_timestamp=None):
 
         if digest:
             plugin.notify_digest(project, digest)
+
+
+@instrumented_task(name='sentry.tasks.digests.deliver_digests', queue='digests.delivery')
+def deliver_digests(keys):
+    """
+    Delivers the digests for many timelines at once, loading the state
+    needed to build all of them together.
+    """
+    from sentry import digests
+    from sentry.plugins import plugins
+
+    projects = Project.objects.in_bulk(
+        set(int(key.rsplit(':', 1)[-1]) for key in keys)
+    )
+
+    # The timelines stay open until their digest has been built, so that a
+    # failure rolls them back to be retried instead of deleting the records.
+    pending = []
+    try:
+        with snuba.options_override({'consistent': True}):
+            for key in keys:
+                plugin_slug, _, project_id = key.split(':', 2)
+                project = projects.get(int(project_id))
+                if project is None:
+                    logger.info('Cannot deliver digest %r as the project does not exist', key)
+                    digests.delete(key)
+                    continue
+
+                plugin = plugins.get(plugin_slug)
+                minimum_delay = ProjectOption.objects.get_value(
+                    project, get_option_key(plugin.get_conf_key(), 'minimum_delay')
+                )
+
+                timeline = digests.digest(key, minimum_delay=minimum_delay)
+                try:
+                    records = list(timeline.__enter__())
+                except InvalidState as error:
+                    logger.info('Skipped digest delivery: %s', error, exc_info=True)
+                    continue
+
+                # All records may have expired, which leaves nothing to build.
+                if not records:
+                    _close_timeline(timeline)
+                    continue
+
+                pending.append((plugin, project, records, timeline))
+
+            states = fetch_states((project, records) for _, project, records, _ in pending)
+    except Exception:
+        exc_info = sys.exc_info()
+        for _, _, _, timeline in pending:
+            _close_timeline(timeline, exc_info)
+        six.reraise(*exc_info)
+
+    # All timelines are closed before any digest is sent, so that the
+    # delivery locks are not held while notifications are sent.
+    ready = []
+    for (plugin, project, records, timeline), state in zip(pending, states):
+        try:
+            digest = build_digest(project, records, state=state)
+        except Exception:
+            _close_timeline(timeline, sys.exc_info())
+            logger.exception('Failed to build digest for %s to project %s', plugin.slug, project.id)
+            continue
+
+        if _close_timeline(timeline) and digest:
+            ready.append((plugin, project, digest))
+
+    for plugin, project, digest in ready:
+        try:
+            plugin.notify_digest(project, digest)
+        except Exception:
+            logger.exception(
+                'Failed to deliver digest for %s to project %s', plugin.slug, project.id)
+
+
+def _close_timeline(timeline, exc_info=(None, None, None)):
+    """
+    Closes a timeline opened by ``deliver_digests``. If ``exc_info`` is
+    given, the timeline is rolled back. Returns whether the timeline was
+    closed successfully.
+    """
+    try:
+        timeline.__exit__(*exc_info)
+    except Exception:
+        logger.exception('Failed to close digest timeline')
+        return False
+    return exc_info[0] is None
@@ -36,6 +36,7 @@ def merge_groups(
     recursed=False, eventstream_state=None, **kwargs
 ):
     # TODO(mattrobenolt): Write tests for all of this
+    from sentry.event_manager import ScoreClause
     from sentry.models import (
         Activity,
         Group,
@@ -194,6 +195,9 @@ def merge_groups(
             except DataError:
                 pass
 
+            # the priority score is derived from the counters above
+            new_group.update(score=ScoreClause(group=new_group))
+
     if from_object_ids:
         # This task is recursed until `from_object_ids` is empty and all
         # "from" groups have merged into the `to_group_id`.
@@ -235,7 +239,87 @@ def _get_event_environment(event, project, cache):
     return cache[environment_name]
 
 
+def _get_conflicting_ids(model, objects, new_group, group_field):
+    """
+    Returns the ids of the objects that can't be moved to ``new_group``
+    because it already has an object that is unique for the same values.
+    """
+    group_attname = model._meta.get_field(group_field).attname
+
+    constraints = [fields for fields in model._meta.unique_together if group_field in fields]
+    if model._meta.get_field(group_field).unique:
+        constraints.append((group_field, ))
+
+    conflicting_ids = set()
+    for fields in constraints:
+        attnames = [
+            model._meta.get_field(field).attname for field in fields if field != group_field
+        ]
+        if not attnames:
+            if model.objects.filter(**{group_attname: new_group.id}).exists():
+                return set(obj.id for obj in objects)
+            continue
+
+        existing = set(
+            model.objects.filter(**{
+                group_attname: new_group.id,
+                '{}__in'.format(attnames[0]): set(getattr(obj, attnames[0]) for obj in objects),
+            }).values_list(*attnames)
+        )
+        if not existing:
+            continue
+
+        for obj in objects:
+            if tuple(getattr(obj, attname) for attname in attnames) in existing:
+                conflicting_ids.add(obj.id)
+
+    return conflicting_ids
+
+
+def _get_group_value(group_field, group):
+    return group if group_field == 'group' else group.id
+
+
+def _merge_object(model, project_qs, obj, new_group, group_field, logger=None,
+                  transaction_id=None):
+    try:
+        with transaction.atomic(using=router.db_for_write(model)):
+            project_qs.filter(id=obj.id).update(
+                **{group_field: _get_group_value(group_field, new_group)}
+            )
+    except IntegrityError:
+        _delete_object(model, obj, new_group, logger=logger, transaction_id=transaction_id)
+
+
+def _delete_object(model, obj, new_group, logger=None, transaction_id=None):
+    # Before deleting, we want to merge in counts
+    if hasattr(model, 'merge_counts'):
+        obj.merge_counts(new_group)
+
+    obj_id = obj.id
+    obj.delete()
+
+    if logger is not None:
+        delete_logger.debug(
+            'object.delete.executed',
+            extra={
+                'object_id': obj_id,
+                'transaction_id': transaction_id,
+                'model': model.__name__,
+            }
+        )
+
+
 def merge_objects(models, group, new_group, limit=1000, logger=None, transaction_id=None):
+    """
+    Moves up to ``limit`` objects of the first model in ``models`` that still
+    has objects associated with ``group`` to ``new_group``, returning whether
+    any objects were found.
+
+    Objects that don't conflict with an object of ``new_group`` are moved in
+    a single update per batch. Conflicting objects have their counts merged
+    into the existing object and are deleted instead.
+    """
     has_more = False
     for model in models:
         all_fields = model._meta.get_all_field_names()
@@ -251,44 +335,44 @@ def merge_objects(models, group, new_group, limit=1000, logger=None, transaction
 
         has_group = 'group' in all_fields
         if has_group:
+            group_field = 'group'
             queryset = project_qs.filter(group=group)
         else:
+            group_field = 'group_id'
             queryset = project_qs.filter(group_id=group.id)
 
+        objects = []
         for obj in queryset[:limit]:
             # HACK(mattrobenolt): The Event table can't actually be filtered
             # on the database for unknown reasons, so filtering out in Python
             if has_project and model.__name__ == 'Event' and obj.project_id != group.project_id:
                 continue
-            try:
-                with transaction.atomic(using=router.db_for_write(model)):
-                    if has_group:
-                        project_qs.filter(id=obj.id).update(group=new_group)
-                    else:
-                        project_qs.filter(id=obj.id).update(group_id=new_group.id)
-            except IntegrityError:
-                delete = True
-            else:
-                delete = False
-
-            if delete:
-                # Before deleting, we want to merge in counts
-                if hasattr(model, 'merge_counts'):
-                    obj.merge_counts(new_group)
-
-                obj_id = obj.id
-                obj.delete()
-
-                if logger is not None:
-                    delete_logger.debug(
-                        'object.delete.executed',
-                        extra={
-                            'object_id': obj_id,
-                            'transaction_id': transaction_id,
-                            'model': model.__name__,
-                        }
-                    )
             has_more = True
+            objects.append(obj)
+
+        if objects:
+            conflicting_ids = _get_conflicting_ids(model, objects, new_group, group_field)
+            moved = [obj for obj in objects if obj.id not in conflicting_ids]
+            if moved:
+                try:
+                    with transaction.atomic(using=router.db_for_write(model)):
+                        project_qs.filter(
+                            id__in=[obj.id for obj in moved],
+                        ).update(**{group_field: _get_group_value(group_field, new_group)})
+                except IntegrityError:
+                    # A conflicting object was created after checking for
+                    # conflicts, fall back to moving the objects one by one.
+                    for obj in moved:
+                        _merge_object(
+                            model, project_qs, obj, new_group, group_field,
+                            logger=logger, transaction_id=transaction_id,
+                        )
+
+            for obj in objects:
+                if obj.id in conflicting_ids:
+                    _delete_object(
+                        model, obj, new_group, logger=logger, transaction_id=transaction_id,
+                    )
 
         if has_more:
             return True
@@ -13,19 +13,22 @@ import time
 
 from django.conf import settings
 
-from sentry import features
+from sentry import features, options
 from sentry.utils import snuba
 from sentry.utils.cache import cache
 from sentry.plugins import plugins
 from sentry.signals import event_processed
 from sentry.tasks.base import instrumented_task
-from sentry.utils import metrics
-from sentry.utils.redis import redis_clusters
+from sentry.utils import json, metrics
+from sentry.utils.dates import to_datetime, to_timestamp
+from sentry.utils.redis import clusters, redis_clusters
 from sentry.utils.safe import safe_execute
 from sentry.utils.sdk import configure_scope
 
 logger = logging.getLogger('sentry')
 
+EVENT_TAGS_BUFFER_KEY = 'tagstore:event-tags'
+
 
 def _get_service_hooks(project_id):
     from sentry.models import ServiceHook
@@ -214,6 +217,21 @@ def index_event_tags(organization_id, project_id, event_id, tags,
         }
     )
 
+    batch_size = options.get('tagstore.index-batch-size')
+    if batch_size > 1:
+        buffer_event_tags(
+            {
+                'project_id': project_id,
+                'group_id': group_id,
+                'environment_id': environment_id,
+                'event_id': event_id,
+                'tags': tags,
+                'date_added': to_timestamp(date_added) if date_added is not None else None,
+            },
+            batch_size,
+        )
+        return
+
     tagstore.create_event_tags(
         project_id=project_id,
         group_id=group_id,
@@ -222,3 +240,72 @@ def index_event_tags(organization_id, project_id, event_id, tags,
         tags=tags,
         **create_event_tags_kwargs
     )
+
+
+def buffer_event_tags(event, batch_size):
+    """
+    Adds the tags of an event to the buffer of event tags, and schedules the
+    buffer to be written once it holds a full batch. Partial batches are
+    written periodically by ``flush_event_tags``.
+    """
+    client = clusters.get('default').get_local_client_for_key(EVENT_TAGS_BUFFER_KEY)
+    if client.rpush(EVENT_TAGS_BUFFER_KEY, json.dumps(event)) % batch_size == 0:
+        flush_event_tags.delay()
+
+
+@instrumented_task(
+    name='sentry.tasks.flush_event_tags',
+    queue='events.index_event_tags',
+    default_retry_delay=60 * 5,
+    max_retries=None,
+)
+def flush_event_tags(**kwargs):
+    from sentry import tagstore
+
+    # This runs periodically on every installation, but there is nothing to
+    # flush unless event tags are buffered. Tags that are still buffered when
+    # buffering is turned off are flushed once it is turned on again.
+    batch_size = options.get('tagstore.index-batch-size')
+    if batch_size <= 1:
+        return
+
+    client = clusters.get('default').get_local_client_for_key(EVENT_TAGS_BUFFER_KEY)
+
+    while True:
+        with client.pipeline() as pipeline:
+            pipeline.lrange(EVENT_TAGS_BUFFER_KEY, 0, batch_size - 1)
+            pipeline.ltrim(EVENT_TAGS_BUFFER_KEY, batch_size, -1)
+            values, _ = pipeline.execute()
+
+        if not values:
+            return
+
+        events = []
+        for value in values:
+            event = json.loads(value)
+            event['tags'] = [tuple(tag) for tag in event['tags']]
+            if event['date_added'] is not None:
+                event['date_added'] = to_datetime(event['date_added'])
+            events.append(event)
+
+        try:
+            tagstore.create_event_tags_bulk(events)
+        except Exception:
+            # Write the events one by one so that a single bad event does not
+            # prevent the rest of the batch from being written. Events that
+            # still fail are dropped.
+            logger.warning('tagstore.flush_event_tags.batch_failed', exc_info=True)
+            for event in events:
+                try:
+                    tagstore.create_event_tags_bulk([event])
+                except Exception:
+                    logger.exception('tagstore.flush_event_tags.event_failed', extra={
+                        'project_id': event['project_id'],
+                        'event_id': event['event_id'],
+                    })
+                    metrics.incr('tagstore.flush_event_tags.dropped')
+
+        metrics.timing('tagstore.flush_event_tags.batch_size', len(events))
+
+        if len(values) < batch_size:
+            return
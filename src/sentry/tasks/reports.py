@@ -8,7 +8,7 @@ import math
 import operator
 import zlib
 from calendar import Calendar
-from collections import OrderedDict, namedtuple
+from collections import OrderedDict, defaultdict, namedtuple
 from datetime import datetime, timedelta
 
 import pytz
@@ -16,12 +16,13 @@ from django.utils import dateformat, timezone
 
 from sentry.app import tsdb
 from sentry.models import (
-    Activity, GroupStatus, Organization, OrganizationStatus, Project, Team, User, UserOption
+    Activity, Group, GroupStatus, Organization, OrganizationStatus, Project, Team, User, UserOption
 )
 from sentry.tasks.base import instrumented_task
 from sentry.utils import json, redis
 from sentry.utils.dates import floor_to_utc_day, to_datetime, to_timestamp
 from sentry.utils.email import MessageBuilder
+from sentry.utils.iterators import chunked
 from sentry.utils.math import mean
 from six.moves import reduce
 
@@ -154,49 +155,55 @@ def merge_series(target, other, function=operator.add):
     return results
 
 
-def prepare_project_series(start__stop, project, rollup=60 * 60 * 24):
+def prepare_project_series(start__stop, projects, rollup=60 * 60 * 24):
     start, stop = start__stop
     resolution, series = tsdb.get_optimal_rollup_series(start, stop, rollup)
     assert resolution == rollup, 'resolution does not match requested value'
     clean = functools.partial(clean_series, start, stop, rollup)
-    return merge_series(
-        reduce(
-            merge_series,
-            map(
-                clean,
-                tsdb.get_range(
-                    tsdb.models.group,
-                    list(
-                        project.group_set.filter(
-                            status=GroupStatus.RESOLVED,
-                            resolved_at__gte=start,
-                            resolved_at__lt=stop,
-                        ).values_list('id', flat=True),
-                    ),
-                    start,
-                    stop,
-                    rollup=rollup,
-                ).values(),
-            ),
-            clean([(timestamp, 0) for timestamp in series]),
-        ),
-        clean(
-            tsdb.get_range(
-                tsdb.models.project,
-                [project.id],
-                start,
-                stop,
-                rollup=rollup,
-            )[project.id],
-        ),
-        lambda resolved, total: (
-            resolved,
-            total - resolved,  # unresolved
-        ),
+
+    resolved_group_ids = defaultdict(list)
+    for project_id, group_id in Group.objects.filter(
+        project__in=projects,
+        status=GroupStatus.RESOLVED,
+        resolved_at__gte=start,
+        resolved_at__lt=stop,
+    ).values_list('project_id', 'id'):
+        resolved_group_ids[project_id].append(group_id)
+
+    group_series = tsdb.get_range(
+        tsdb.models.group,
+        list(itertools.chain.from_iterable(resolved_group_ids.values())),
+        start,
+        stop,
+        rollup=rollup,
+    )
+
+    project_series = tsdb.get_range(
+        tsdb.models.project,
+        [project.id for project in projects],
+        start,
+        stop,
+        rollup=rollup,
     )
 
+    empty = clean([(timestamp, 0) for timestamp in series])
+    return {
+        project.id: merge_series(
+            reduce(
+                merge_series,
+                [clean(group_series[id]) for id in resolved_group_ids[project.id]],
+                empty,
+            ),
+            clean(project_series[project.id]),
+            lambda resolved, total: (
+                resolved,
+                total - resolved,  # unresolved
+            ),
+        ) for project in projects
+    }
+
 
-def prepare_project_aggregates(ignore__stop, project):
+def prepare_project_aggregates(ignore__stop, projects):
     # TODO: This needs to return ``None`` for periods that don't have any data
     # (because the project is not old enough) and possibly extrapolate for
     # periods that only have partial periods.
@@ -205,35 +212,43 @@ def prepare_project_aggregates(ignore__stop, project):
     period = timedelta(days=7)
     start = stop - (period * segments)
 
-    def get_aggregate_value(start, stop):
+    project_ids = [project.id for project in projects]
+
+    def get_aggregate_values(start, stop):
         return tsdb.get_sums(
             tsdb.models.project,
-            (project.id, ),
+            project_ids,
             start,
             stop,
             rollup=60 * 60 * 24,
-        )[project.id]
+        )
 
-    return [
-        get_aggregate_value(
+    aggregates = [
+        get_aggregate_values(
             start + (period * i),
             start + (period * (i + 1) - timedelta(seconds=1)),
         ) for i in range(segments)
     ]
 
+    return {
+        project_id: [values[project_id] for values in aggregates] for project_id in project_ids
+    }
+
 
-def prepare_project_issue_summaries(interval, project):
+def prepare_project_issue_summaries(interval, projects):
     start, stop = interval
 
-    queryset = project.group_set.exclude(status=GroupStatus.IGNORED)
+    queryset = Group.objects.filter(
+        project__in=projects,
+    ).exclude(status=GroupStatus.IGNORED)
 
     # Fetch all new issues.
-    new_issue_ids = set(
-        queryset.filter(
-            first_seen__gte=start,
-            first_seen__lt=stop,
-        ).values_list('id', flat=True)
-    )
+    new_issue_ids = defaultdict(set)
+    for project_id, group_id in queryset.filter(
+        first_seen__gte=start,
+        first_seen__lt=stop,
+    ).values_list('project_id', 'id'):
+        new_issue_ids[project_id].add(group_id)
 
     # Fetch all regressions. This is a little weird, since there's no way to
     # tell *when* a group regressed using the Group model. Instead, we query
@@ -242,66 +257,76 @@ def prepare_project_issue_summaries(interval, project):
     # past week. (In theory, the activity table *could* be used to answer this
     # query without the subselect, but there's no suitable indexes to make it's
     # performance predictable.)
-    reopened_issue_ids = set(
-        Activity.objects.filter(
-            group__in=queryset.filter(
-                last_seen__gte=start,
-                last_seen__lt=stop,
-                resolved_at__isnull=False,  # signals this has *ever* been resolved
-            ),
-            type__in=(Activity.SET_REGRESSION, Activity.SET_UNRESOLVED, ),
-            datetime__gte=start,
-            datetime__lt=stop,
-        ).distinct().values_list('group_id', flat=True)
-    )
+    reopened_issue_ids = defaultdict(set)
+    for project_id, group_id in Activity.objects.filter(
+        group__in=queryset.filter(
+            last_seen__gte=start,
+            last_seen__lt=stop,
+            resolved_at__isnull=False,  # signals this has *ever* been resolved
+        ),
+        type__in=(Activity.SET_REGRESSION, Activity.SET_UNRESOLVED, ),
+        datetime__gte=start,
+        datetime__lt=stop,
+    ).distinct().values_list('project_id', 'group_id'):
+        reopened_issue_ids[project_id].add(group_id)
 
     rollup = 60 * 60 * 24
 
     event_counts = tsdb.get_sums(
         tsdb.models.group,
-        new_issue_ids | reopened_issue_ids,
+        set(itertools.chain(
+            itertools.chain.from_iterable(new_issue_ids.values()),
+            itertools.chain.from_iterable(reopened_issue_ids.values()),
+        )),
         start,
         stop,
         rollup=rollup,
     )
 
-    new_issue_count = sum(event_counts[id] for id in new_issue_ids)
-    reopened_issue_count = sum(event_counts[id] for id in reopened_issue_ids)
-    existing_issue_count = max(
-        tsdb.get_sums(
-            tsdb.models.project,
-            [project.id],
-            start,
-            stop,
-            rollup=rollup,
-        )[project.id] - new_issue_count - reopened_issue_count,
-        0,
+    project_counts = tsdb.get_sums(
+        tsdb.models.project,
+        [project.id for project in projects],
+        start,
+        stop,
+        rollup=rollup,
     )
 
-    return [
-        new_issue_count,
-        reopened_issue_count,
-        existing_issue_count,
-    ]
+    results = {}
+    for project in projects:
+        new_issue_count = sum(event_counts[id] for id in new_issue_ids[project.id])
+        reopened_issue_count = sum(event_counts[id] for id in reopened_issue_ids[project.id])
+        existing_issue_count = max(
+            project_counts[project.id] - new_issue_count - reopened_issue_count,
+            0,
+        )
+        results[project.id] = [
+            new_issue_count,
+            reopened_issue_count,
+            existing_issue_count,
+        ]
+
+    return results
 
 
-def prepare_project_usage_summary(start__stop, project):
+def prepare_project_usage_summary(start__stop, projects):
     start, stop = start__stop
-    return (
+    project_ids = [project.id for project in projects]
+    blacklisted, rejected = [
         tsdb.get_sums(
-            tsdb.models.project_total_blacklisted,
-            [project.id],
+            model,
+            project_ids,
             start,
             stop,
             rollup=60 * 60 * 24,
-        )[project.id], tsdb.get_sums(
+        ) for model in (
+            tsdb.models.project_total_blacklisted,
             tsdb.models.project_total_rejected,
-            [project.id],
-            start,
-            stop,
-            rollup=60 * 60 * 24,
-        )[project.id],
-    )
+        )
+    ]
+    return {
+        project_id: (blacklisted[project_id], rejected[project_id], )
+        for project_id in project_ids
+    }
 
 
 def get_calendar_range(ignore__stop_time, months):
@@ -351,34 +376,39 @@ def clean_calendar_data(project, series, start, stop, rollup, timestamp=None):
     )
 
 
-def prepare_project_calendar_series(interval, project):
+def prepare_project_calendar_series(interval, projects):
     start, stop = get_calendar_query_range(interval, 3)
 
     rollup = 60 * 60 * 24
     series = tsdb.get_range(
         tsdb.models.project,
-        [project.id],
+        [project.id for project in projects],
         start,
         stop,
         rollup=rollup,
-    )[project.id]
-
-    return clean_calendar_data(
-        project,
-        series,
-        start,
-        stop,
-        rollup,
     )
 
+    return {
+        project.id: clean_calendar_data(
+            project,
+            series[project.id],
+            start,
+            stop,
+            rollup,
+        ) for project in projects
+    }
+
 
 def build(name, fields):
     names, prepare_fields, merge_fields = zip(*fields)
 
     cls = namedtuple(name, names)
 
-    def prepare(*args):
-        return cls(* [f(*args) for f in prepare_fields])
+    def prepare(interval, projects):
+        # Each field is prepared for all of the projects at once, so that the
+        # number of queries does not depend on the number of projects.
+        values = [f(interval, projects) for f in prepare_fields]
+        return {project.id: cls(* [value[project.id] for value in values]) for project in projects}
 
     def merge(target, other):
         return cls(* [f(target[i], other[i]) for i, f in enumerate(merge_fields)])
@@ -386,7 +416,7 @@ def build(name, fields):
     return cls, prepare, merge
 
 
-Report, prepare_project_report, merge_reports = build(
+Report, prepare_project_reports, merge_reports = build(
     'Report',
     [
         (
@@ -414,10 +444,14 @@ Report, prepare_project_report, merge_reports = build(
 
 
 class ReportBackend(object):
-    def build(self, timestamp, duration, project):
-        return prepare_project_report(
+    def build(self, timestamp, duration, projects):
+        """
+        Build reports for a set of projects, returning a mapping of project
+        ID to report.
+        """
+        return prepare_project_reports(
             _to_interval(timestamp, duration),
-            project,
+            projects,
         )
 
     def prepare(self, timestamp, duration, organization):
@@ -440,23 +474,18 @@ class DummyReportBackend(ReportBackend):
 
     def fetch(self, timestamp, duration, organization, projects):
         assert all(project.organization_id == organization.id for project in projects)
-        return map(
-            functools.partial(
-                self.build,
-                timestamp,
-                duration,
-            ),
-            projects,
-        )
+        reports = self.build(timestamp, duration, projects)
+        return [reports[project.id] for project in projects]
 
 
 class RedisReportBackend(ReportBackend):
     version = 1
 
-    def __init__(self, cluster, ttl, namespace='r'):
+    def __init__(self, cluster, ttl, namespace='r', batch_size=100):
         self.cluster = cluster
         self.ttl = ttl
         self.namespace = namespace
+        self.batch_size = batch_size
 
     def __make_key(self, timestamp, duration, organization):
         return u'{}:{}:{}:{}:{}'.format(
@@ -477,22 +506,44 @@ class RedisReportBackend(ReportBackend):
         return Report(*json.loads(zlib.decompress(value)))
 
     def prepare(self, timestamp, duration, organization):
-        reports = {}
-        for project in organization.project_set.all():
-            reports[project.id] = self.__encode(
-                self.build(timestamp, duration, project),
-            )
-
-        if not reports:
-            # XXX: HMSET requires at least one key/value pair, so we need to
-            # protect ourselves here against organizations that were created
-            # but haven't set up any projects yet.
-            return
+        key = self.__make_key(timestamp, duration, organization)
 
+        # Reports are stored as soon as each batch of projects has been
+        # prepared, so if a previous attempt was interrupted (for example, by
+        # a worker being shut down) we only need to prepare the remaining
+        # projects.
         with self.cluster.map() as client:
-            key = self.__make_key(timestamp, duration, organization)
-            client.hmset(key, reports)
-            client.expire(key, self.ttl)
+            result = client.hkeys(key)
+
+        prepared = set(map(int, result.value))
+        if prepared:
+            logger.info(
+                'reports.organization.resumed',
+                extra={
+                    'organization_id': organization.id,
+                    'prepared': len(prepared),
+                }
+            )
+
+        projects = [
+            project for project in organization.project_set.order_by('id')
+            if project.id not in prepared
+        ]
+
+        # XXX: HMSET requires at least one key/value pair, so organizations
+        # that were created but haven't set up any projects yet never write a
+        # key here.
+        for batch in chunked(projects, self.batch_size):
+            reports = self.build(timestamp, duration, batch)
+            with self.cluster.map() as client:
+                client.hmset(
+                    key,
+                    {
+                        project_id: self.__encode(report)
+                        for project_id, report in reports.items()
+                    },
+                )
+                client.expire(key, self.ttl)
 
     def fetch(self, timestamp, duration, organization, projects):
         with self.cluster.map() as client:
@@ -10,14 +10,14 @@ from __future__ import absolute_import
 
 import logging
 from datetime import datetime
-import six
 
 from time import time
 from django.utils import timezone
 
-from sentry import features, reprocessing
+from sentry import features, options, reprocessing
 from sentry.attachments import attachment_cache
 from sentry.cache import default_cache
+from sentry.cache.codecs import event_payload_codec
 from sentry.tasks.base import instrumented_task
 from sentry.utils import metrics
 from sentry.utils.safe import safe_execute
@@ -42,13 +42,35 @@ class RetryProcessing(Exception):
     pass
 
 
+def get_event_payload(cache_key):
+    """
+    Reads the payload of an event in the processing pipeline from the cache.
+    """
+    return event_payload_codec.decode(default_cache.get(cache_key, raw=True))
+
+
+def set_event_payload(cache_key, data, timeout=3600):
+    """
+    Stores the payload of an event in the processing pipeline in the cache.
+    """
+    if options.get('store.event-payload-codec'):
+        default_cache.set(cache_key, event_payload_codec.encode(data), timeout, raw=True)
+        return
+
+    # We cannot persist canonical types in the cache, so we need to
+    # downgrade this.
+    if isinstance(data, CANONICAL_TYPES):
+        data = dict(data.items())
+    default_cache.set(cache_key, data, timeout)
+
+
 def should_process(data):
     """Quick check if processing is needed at all."""
     from sentry.plugins import plugins
 
-    for plugin in plugins.all(version=2):
-        processors = safe_execute(
-            plugin.get_event_preprocessors, data=data, _with_transaction=False
+    for plugin in plugins.all(version=2, hook='get_event_preprocessors'):
+        processors = plugins.call_hook(
+            plugin, 'get_event_preprocessors', data=data, _with_transaction=False
         )
         if processors:
             return True
@@ -61,7 +83,7 @@ def should_process(data):
 
 def _do_preprocess_event(cache_key, data, start_time, event_id, process_event):
     if cache_key:
-        data = default_cache.get(cache_key)
+        data = get_event_payload(cache_key)
 
     if data is None:
         metrics.incr('events.failed', tags={'reason': 'cache', 'stage': 'pre'})
@@ -78,6 +100,12 @@ def _do_preprocess_event(cache_key, data, start_time, event_id, process_event):
         process_event.delay(cache_key=cache_key, start_time=start_time, event_id=event_id)
         return
 
+    if options.get('store.fused-pipeline'):
+        # The event does not need to go through the processing queue, so it
+        # is saved right away without another round trip through the cache.
+        metrics.incr('events.fused', tags={'stage': 'pre'})
+        return _do_save_event(cache_key, data, start_time, event_id, project)
+
     # If we get here, that means the event had no preprocessing needed to be done
     # so we can jump directly to save_event
     if cache_key:
@@ -115,7 +143,7 @@ def preprocess_event_from_reprocessing(
 def _do_process_event(cache_key, start_time, event_id, process_task):
     from sentry.plugins import plugins
 
-    data = default_cache.get(cache_key)
+    data = get_event_payload(cache_key)
 
     if data is None:
         metrics.incr('events.failed', tags={'reason': 'cache', 'stage': 'process'})
@@ -134,8 +162,8 @@ def _do_process_event(cache_key, start_time, event_id, process_task):
     reprocessing_rev = reprocessing.get_reprocessing_revision(project)
 
     # Event enhancers.  These run before anything else.
-    for plugin in plugins.all(version=2):
-        enhancers = safe_execute(plugin.get_event_enhancers, data=data)
+    for plugin in plugins.all(version=2, hook='get_event_enhancers'):
+        enhancers = plugins.call_hook(plugin, 'get_event_enhancers', data=data)
         for enhancer in (enhancers or ()):
             enhanced = safe_execute(enhancer, data)
             if enhanced:
@@ -150,9 +178,9 @@ def _do_process_event(cache_key, start_time, event_id, process_task):
 
     # TODO(dcramer): ideally we would know if data changed by default
     # Default event processors.
-    for plugin in plugins.all(version=2):
-        processors = safe_execute(
-            plugin.get_event_preprocessors, data=data, _with_transaction=False
+    for plugin in plugins.all(version=2, hook='get_event_preprocessors'):
+        processors = plugins.call_hook(
+            plugin, 'get_event_preprocessors', data=data, _with_transaction=False
         )
         for processor in (processors or ()):
             result = safe_execute(processor, data)
@@ -162,6 +190,8 @@ def _do_process_event(cache_key, start_time, event_id, process_task):
 
     assert data['project'] == project, 'Project cannot be mutated by preprocessor'
 
+    fused = options.get('store.fused-pipeline')
+
     if has_changed:
         issues = data.get('processing_issues')
         try:
@@ -179,11 +209,14 @@ def _do_process_event(cache_key, start_time, event_id, process_task):
                                event_id=event_id)
             return
 
-        # We cannot persist canonical types in the cache, so we need to
-        # downgrade this.
-        if isinstance(data, CANONICAL_TYPES):
-            data = dict(data.items())
-        default_cache.set(cache_key, data, 3600)
+        if not fused:
+            set_event_payload(cache_key, data)
+
+    if fused:
+        # Save the processed event directly, which saves writing it back to
+        # the cache only to read it again in ``save_event``.
+        metrics.incr('events.fused', tags={'stage': 'process'})
+        return _do_save_event(cache_key, data, start_time, event_id, project)
 
     save_event.delay(
         cache_key=cache_key, data=None, start_time=start_time, event_id=event_id,
@@ -280,7 +313,7 @@ def create_failed_event(cache_key, project_id, issues, event_id, start_time=None
     # from the last processing step because we do not want any
     # modifications to take place.
     delete_raw_event(project_id, event_id)
-    data = default_cache.get(cache_key)
+    data = get_event_payload(cache_key)
     if data is None:
         metrics.incr('events.failed', tags={'reason': 'cache', 'stage': 'raw'})
         error_logger.error('process.failed_raw.empty', extra={'cache_key': cache_key})
@@ -327,7 +360,7 @@ def save_attachment(event, attachment):
         type=attachment.type,
         headers={'Content-Type': attachment.content_type},
     )
-    file.putfile(six.BytesIO(attachment.data))
+    file.putfile(attachment.open())
 
     EventAttachment.objects.create(
         event_id=event.event_id,
@@ -338,18 +371,18 @@ def save_attachment(event, attachment):
     )
 
 
-@instrumented_task(name='sentry.tasks.store.save_event', queue='events.save_event')
-def save_event(cache_key=None, data=None, start_time=None, event_id=None,
-               project_id=None, **kwargs):
+def _do_save_event(cache_key=None, data=None, start_time=None, event_id=None,
+                   project_id=None):
     """
-    Saves an event to the database.
+    Saves an event to the database. The event is read from the cache if its
+    data is not given.
     """
     from sentry.event_manager import HashDiscarded, EventManager
     from sentry import quotas, tsdb
     from sentry.models import ProjectKey
 
-    if cache_key:
-        data = default_cache.get(cache_key)
+    if cache_key and data is None:
+        data = get_event_payload(cache_key)
 
     if data is not None:
         data = CanonicalKeyDict(data)
@@ -443,3 +476,14 @@ def save_event(cache_key=None, data=None, start_time=None, event_id=None,
                 'events.time-to-process',
                 time() - start_time,
                 instance=data['platform'])
+
+
+@instrumented_task(name='sentry.tasks.store.save_event', queue='events.save_event')
+def save_event(cache_key=None, data=None, start_time=None, event_id=None,
+               project_id=None, **kwargs):
+    """
+    Saves an event to the database.
+    """
+    if cache_key:
+        data = None
+    return _do_save_event(cache_key, data, start_time, event_id, project_id)
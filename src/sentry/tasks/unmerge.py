@@ -15,6 +15,7 @@ from sentry.models import (
 )
 from sentry.similarity import features
 from sentry.tasks.base import instrumented_task
+from sentry.utils.dates import to_datetime, to_timestamp
 from six.moves import reduce
 
 
@@ -38,6 +39,10 @@ def cache(function):
         else:
             raise result
 
+    def prime(key, value):
+        results[key] = (True, value)
+
+    fetch.prime = prime
     return fetch
 
 
@@ -404,22 +409,43 @@ def collect_release_data(caches, project, events):
 
 
 def repair_group_release_data(caches, project, events):
-    attributes = collect_release_data(caches, project, events).items()
-    for (group_id, environment, release_id), (first_seen, last_seen) in attributes:
-        instance, created = GroupRelease.objects.get_or_create(
+    attributes = collect_release_data(caches, project, events)
+    if not attributes:
+        return
+
+    # Fetch all existing instances upfront rather than one at a time.
+    existing = {
+        (instance.group_id, instance.environment, instance.release_id): instance
+        for instance in GroupRelease.objects.filter(
             project_id=project.id,
-            group_id=group_id,
-            environment=environment,
-            release_id=release_id,
-            defaults={
-                'first_seen': first_seen,
-                'last_seen': last_seen,
-            },
+            group_id__in=set(group_id for group_id, _, _ in attributes),
+            release_id__in=set(release_id for _, _, release_id in attributes),
         )
+    }
+
+    for key, (first_seen, last_seen) in attributes.items():
+        group_id, environment, release_id = key
+        instance = existing.get(key)
+        if instance is None:
+            instance, created = GroupRelease.objects.get_or_create(
+                project_id=project.id,
+                group_id=group_id,
+                environment=environment,
+                release_id=release_id,
+                defaults={
+                    'first_seen': first_seen,
+                    'last_seen': last_seen,
+                },
+            )
+        else:
+            created = False
 
         if not created:
             instance.update(first_seen=first_seen)
 
+        # The instances are needed again when recording the TSDB data.
+        caches['GroupRelease'].prime(key, instance)
+
 
 def get_event_user_from_interface(value):
     return EventUser(
@@ -430,6 +456,25 @@ def get_event_user_from_interface(value):
     )
 
 
+def get_tsdb_timestamp_function():
+    """\
+    Returns a function that rounds timestamps down to the start of the
+    finest TSDB rollup interval, so that events recorded within the same
+    interval can be written together. Timestamps are left unchanged if the
+    coarser rollup intervals are not aligned with the finest interval.
+    """
+    rollups = list(tsdb.get_rollups())
+    resolution = min(rollups) if rollups else None
+    if resolution is None or any(rollup % resolution for rollup in rollups):
+        return lambda timestamp: timestamp
+
+    def get_timestamp(timestamp):
+        epoch = int(to_timestamp(timestamp))
+        return to_datetime(epoch - (epoch % resolution))
+
+    return get_timestamp
+
+
 def collect_tsdb_data(caches, project, events):
     counters = defaultdict(
         lambda: defaultdict(
@@ -451,22 +496,26 @@ def collect_tsdb_data(caches, project, events):
         ),
     )
 
+    get_timestamp = get_tsdb_timestamp_function()
+
     for event in events:
         environment = caches['Environment'](
             project.organization_id,
             get_environment_name(event),
         )
 
-        counters[event.datetime][tsdb.models.group][(event.group_id, environment.id)] += 1
+        timestamp = get_timestamp(event.datetime)
+
+        counters[timestamp][tsdb.models.group][(event.group_id, environment.id)] += 1
 
         user = event.data.get('user')
         if user:
-            sets[event.datetime][tsdb.models.users_affected_by_group][(event.group_id, environment.id)].add(
+            sets[timestamp][tsdb.models.users_affected_by_group][(event.group_id, environment.id)].add(
                 get_event_user_from_interface(user).tag_value,
             )
 
-        frequencies[event.datetime][tsdb.models.frequent_environments_by_group
-                                    ][event.group_id][environment.id] += 1
+        frequencies[timestamp][tsdb.models.frequent_environments_by_group
+                               ][event.group_id][environment.id] += 1
 
         release = event.get_tag('sentry:release')
         if release:
@@ -481,8 +530,8 @@ def collect_tsdb_data(caches, project, events):
                 ).id,
             )
 
-            frequencies[event.datetime][tsdb.models.frequent_releases_by_group
-                                        ][event.group_id][grouprelease.id] += 1
+            frequencies[timestamp][tsdb.models.frequent_releases_by_group
+                                   ][event.group_id][grouprelease.id] += 1
 
     return counters, sets, frequencies
 
@@ -491,15 +540,23 @@ def repair_tsdb_data(caches, project, events):
     counters, sets, frequencies = collect_tsdb_data(caches, project, events)
 
     for timestamp, data in counters.items():
+        # Items with the same environment and count are incremented together.
+        items = defaultdict(list)
         for model, keys in data.items():
             for (key, environment_id), value in keys.items():
-                tsdb.incr(model, key, timestamp, value, environment_id=environment_id)
+                items[(environment_id, value)].append((model, key))
+
+        for (environment_id, value), models_and_keys in items.items():
+            tsdb.incr_multi(models_and_keys, timestamp, value, environment_id=environment_id)
 
     for timestamp, data in sets.items():
+        items = defaultdict(list)
         for model, keys in data.items():
             for (key, environment_id), values in keys.items():
-                # TODO: This should use `record_multi` rather than `record`.
-                tsdb.record(model, key, values, timestamp, environment_id=environment_id)
+                items[environment_id].append((model, key, values))
+
+        for environment_id, models_keys_and_values in items.items():
+            tsdb.record_multi(models_keys_and_values, timestamp, environment_id=environment_id)
 
     for timestamp, data in frequencies.items():
         tsdb.record_frequency_multi(data.items(), timestamp)
@@ -511,8 +568,14 @@ def repair_denormalizations(caches, project, events):
     repair_group_release_data(caches, project, events)
     repair_tsdb_data(caches, project, events)
 
+    # Features can be recorded for many events at once as long as they are
+    # all associated with the same group.
+    events_by_group = OrderedDict()
     for event in events:
-        features.record([event])
+        events_by_group.setdefault(event.group_id, []).append(event)
+
+    for group_events in events_by_group.values():
+        features.record(group_events)
 
 
 def lock_hashes(project_id, source_id, fingerprints):
@@ -36,8 +36,16 @@ def Feature(names):
     elif not isinstance(names, collections.Mapping):
         names = {k: True for k in names}
 
-    with patch('sentry.features.has') as features_has:
+    def has_batch(feature_names, objects, actor=None):
+        return {
+            obj: {name: names.get(name, False) for name in feature_names}
+            for obj in objects
+        }
+
+    with patch('sentry.features.has') as features_has, \
+            patch('sentry.features.has_batch') as features_has_batch:
         features_has.side_effect = lambda x, *a, **k: names.get(x, False)
+        features_has_batch.side_effect = has_batch
         yield
 
 
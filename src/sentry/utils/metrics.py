@@ -3,13 +3,15 @@ from __future__ import absolute_import
 __all__ = ['timing', 'incr']
 
 import logging
+import six
 
+from collections import defaultdict
 from contextlib import contextmanager
 from django.conf import settings
 from random import random
 from time import time
 from threading import Thread
-from six.moves.queue import Queue
+from six.moves.queue import Empty, Queue
 
 
 def get_default_backend():
@@ -44,6 +46,9 @@ def _sampled_value(value):
 
 
 class InternalMetrics(object):
+    # The maximum number of queued increments that are written at once.
+    max_batch_size = 1000
+
     def __init__(self):
         self._started = False
 
@@ -54,19 +59,38 @@ class InternalMetrics(object):
             from sentry import tsdb
 
             while True:
-                key, instance, tags, amount = q.get()
-                amount = _sampled_value(amount)
-                if instance:
-                    full_key = u'{}.{}'.format(key, instance)
-                else:
-                    full_key = key
+                # Wait for an increment, and then take all of the increments
+                # that are queued up already so they can be written together.
+                items = [q.get()]
+                while len(items) < self.max_batch_size:
+                    try:
+                        items.append(q.get_nowait())
+                    except Empty:
+                        break
+
+                counts = defaultdict(int)
+                for key, instance, tags, amount in items:
+                    if instance:
+                        full_key = u'{}.{}'.format(key, instance)
+                    else:
+                        full_key = key
+                    counts[full_key] += _sampled_value(amount)
+
+                # ``incr_multi`` increments all keys by the same amount, so
+                # keys are grouped by their count.
+                keys_by_count = defaultdict(list)
+                for full_key, count in six.iteritems(counts):
+                    keys_by_count[count].append((tsdb.models.internal, full_key))
+
                 try:
-                    tsdb.incr(tsdb.models.internal, full_key, count=amount)
+                    for count, keys in six.iteritems(keys_by_count):
+                        tsdb.incr_multi(keys, count=count)
                 except Exception:
                     logger = logging.getLogger('sentry.errors')
                     logger.exception('Unable to incr internal metric')
                 finally:
-                    q.task_done()
+                    for _ in items:
+                        q.task_done()
 
         t = Thread(target=worker)
         t.setDaemon(True)
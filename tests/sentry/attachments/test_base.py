@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import absolute_import
+
+import mock
+import os
+import zlib
+
+from sentry.attachments.base import BaseAttachmentCache, CachedAttachment
+from sentry.cache.base import BaseCache
+from sentry.testutils import TestCase
+
+
+class InMemoryCache(BaseCache):
+    def __init__(self):
+        self.data = {}
+        BaseCache.__init__(self, version=1)
+
+    def set(self, key, value, timeout, version=None, raw=False):
+        self.data[key] = value
+
+    def delete(self, key, version=None):
+        self.data.pop(key, None)
+
+    def get(self, key, version=None, raw=False):
+        return self.data.get(key)
+
+
+class BaseAttachmentCacheTest(TestCase):
+    def setUp(self):
+        self.inner = InMemoryCache()
+        self.cache = BaseAttachmentCache(self.inner)
+
+    @mock.patch('sentry.attachments.base.CHUNK_SIZE', 64)
+    def test_chunked_roundtrip(self):
+        data = os.urandom(1000)
+        self.cache.set('foo', [
+            CachedAttachment(name='foo.dmp', type='event.minidump', data=data),
+            CachedAttachment(name='bar.txt', content_type='text/plain', data=b'Hello World!'),
+        ])
+
+        # Random data does not compress, so it is spread over many chunks.
+        assert self.inner.get('foo:a:0:15') is not None
+        assert self.inner.get('foo:a:0') is None
+
+        rv = self.cache.get('foo')
+        assert len(rv) == 2
+        assert rv[0].meta() == {
+            'type': 'event.minidump',
+            'name': 'foo.dmp',
+            'content_type': None,
+        }
+        assert b''.join(rv[0].iter_chunks()) == data
+        assert rv[0].open().read(10) == data[:10]
+        assert rv[0].data == data
+        assert rv[1].data == b'Hello World!'
+
+        self.cache.delete('foo')
+        assert self.inner.data == {}
+
+    def test_legacy_attachment(self):
+        self.inner.set('foo:a', [{'name': 'foo.txt', 'content_type': 'text/plain'}], None)
+        self.inner.set('foo:a:0', zlib.compress(b'Hello World!'), None, raw=True)
+
+        rv = self.cache.get('foo')
+        assert len(rv) == 1
+        assert rv[0].data == b'Hello World!'
+
+        self.cache.delete('foo')
+        assert self.inner.data == {}
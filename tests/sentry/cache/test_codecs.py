@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import absolute_import
+
+from mock import patch
+
+from sentry.cache.codecs import EventPayloadCodec, VERSION_ZLIB_JSON
+from sentry.cache.redis import RedisCache
+from sentry.testutils import TestCase
+from sentry.utils import json
+from sentry.utils.canonical import CanonicalKeyDict
+from sentry.utils.compat import pickle
+
+
+class EventPayloadCodecTest(TestCase):
+    def setUp(self):
+        self.codec = EventPayloadCodec()
+        self.data = {
+            'event_id': 'a' * 32,
+            'message': u'Hello ☃',
+            'extra': {'foo': ['bar'] * 100},
+        }
+
+    def test_roundtrip(self):
+        value = self.codec.encode(self.data)
+        assert value.startswith(VERSION_ZLIB_JSON)
+        assert len(value) < len(json.dumps(self.data))
+        assert self.codec.decode(value) == self.data
+
+    def test_canonical_types(self):
+        value = self.codec.encode(CanonicalKeyDict(self.data))
+        assert self.codec.decode(value) == self.data
+
+    def test_legacy_values(self):
+        assert self.codec.decode(None) is None
+        assert self.codec.decode(self.data) == self.data
+        assert self.codec.decode(json.dumps(self.data).encode('utf-8')) == self.data
+        assert self.codec.decode(pickle.dumps(self.data, protocol=2)) == self.data
+
+    @patch('sentry.cache.codecs.metrics.incr')
+    def test_legacy_metric(self, incr):
+        value = json.dumps(self.data).encode('utf-8')
+
+        # every payload is written in the legacy format while the codec is off
+        self.codec.decode(value)
+        assert incr.call_count == 0
+
+        with self.options({'store.event-payload-codec': True}):
+            self.codec.decode(value)
+            self.codec.decode(self.codec.encode(self.data))
+        incr.assert_called_once_with('events.payload-decode.legacy')
+
+    def test_redis_cache(self):
+        cache = RedisCache()
+
+        cache.set('foo', self.codec.encode(self.data), 50, raw=True)
+        assert self.codec.decode(cache.get('foo', raw=True)) == self.data
+
+        # values that were stored before the codec was used
+        cache.set('foo', self.data, 50)
+        assert self.codec.decode(cache.get('foo', raw=True)) == self.data
@@ -23,3 +23,14 @@ class RedisCacheTest(TestCase):
 
         with self.assertRaises(ValueTooLarge):
             self.backend.set('foo', 'x' * (RedisCache.max_size + 1), 0)
+
+    def test_many(self):
+        self.backend.set_many({'foo': {'foo': 'bar'}, 'bar': 'baz'}, 50)
+
+        result = self.backend.get_many(['foo', 'bar', 'baz'])
+        assert result == {'foo': {'foo': 'bar'}, 'bar': 'baz', 'baz': None}
+
+        self.backend.delete_many(['foo', 'bar'])
+
+        result = self.backend.get_many(['foo', 'bar'])
+        assert result == {'foo': None, 'bar': None}
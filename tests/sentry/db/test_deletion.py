@@ -1,9 +1,12 @@
 from __future__ import absolute_import
 
 from datetime import timedelta
+from django.db import DatabaseError, connections
 from django.utils import timezone
+from mock import Mock, call, patch
 
-from sentry.db.deletion import BulkDeleteQuery
+from sentry.db import deletion
+from sentry.db.deletion import BulkDeleteQuery, get_replication_lag
 from sentry.models import Group, Project
 from sentry.testutils import TestCase, TransactionTestCase
 
@@ -42,6 +45,80 @@ class BulkDeleteQueryTest(TestCase):
         assert not Group.objects.filter(id=group1_2.id).exists()
         assert Group.objects.filter(id=group1_3.id).exists()
 
+    def test_deleted_count(self):
+        project1 = self.create_project()
+        self.create_group(project1)
+        self.create_group(project1)
+        project2 = self.create_project()
+        self.create_group(project2)
+
+        assert BulkDeleteQuery(
+            model=Group,
+            project_id=project1.id,
+        ).execute(chunk_size=1) == 2
+        assert BulkDeleteQuery(
+            model=Group,
+            project_id=project1.id,
+        ).execute() == 0
+
+    @patch('sentry.db.deletion.time.sleep')
+    @patch('sentry.db.deletion.get_replication_lag')
+    def test_throttle(self, get_replication_lag, sleep):
+        get_replication_lag.side_effect = [30, 5]
+        BulkDeleteQuery(model=Group, max_replication_lag=10).throttle()
+        assert get_replication_lag.call_count == 2
+        assert sleep.mock_calls == [call(10)]
+
+        # replicas that don't report their lag are not waited for
+        get_replication_lag.reset_mock()
+        get_replication_lag.side_effect = [None]
+        BulkDeleteQuery(model=Group, max_replication_lag=10).throttle()
+        assert get_replication_lag.call_count == 1
+
+        get_replication_lag.reset_mock()
+        BulkDeleteQuery(model=Group).throttle()
+        assert get_replication_lag.call_count == 0
+
+    @patch('sentry.db.deletion.time.sleep')
+    @patch('sentry.db.deletion.get_replication_lag', return_value=0)
+    def test_throttle_chunks(self, get_replication_lag, sleep):
+        project = self.create_project()
+        self.create_group(project)
+        self.create_group(project)
+
+        assert BulkDeleteQuery(
+            model=Group,
+            project_id=project.id,
+            max_replication_lag=10,
+        ).execute(chunk_size=1) == 2
+        # checked before every chunk, including the last empty one
+        assert get_replication_lag.call_count >= 2
+        assert sleep.call_count == 0
+
+
+class GetReplicationLagTest(TestCase):
+    @patch.object(deletion, '_replication_lag_unsupported', set())
+    @patch('sentry.db.deletion.db.is_postgres', return_value=True)
+    def test_unsupported(self, is_postgres):
+        cursor = Mock()
+        cursor.execute.side_effect = DatabaseError('column "replay_lag" does not exist')
+
+        with patch.object(connections['default'], 'cursor', return_value=cursor):
+            assert get_replication_lag('default') is None
+            assert get_replication_lag('default') is None
+
+        # the query is not attempted again once it failed
+        assert cursor.execute.call_count == 1
+
+    @patch.object(deletion, '_replication_lag_unsupported', set())
+    @patch('sentry.db.deletion.db.is_postgres', return_value=True)
+    def test_lag(self, is_postgres):
+        cursor = Mock()
+        cursor.fetchone.return_value = (12.5, )
+
+        with patch.object(connections['default'], 'cursor', return_value=cursor):
+            assert get_replication_lag('default') == 12.5
+
 
 class BulkDeleteQueryIteratorTestCase(TransactionTestCase):
     def test_iteration(self):
@@ -0,0 +1,129 @@
+from __future__ import absolute_import
+
+from datetime import datetime, timedelta
+
+from django.db import connections
+from django.utils import timezone
+from mock import Mock, patch
+
+from sentry.db.deletion import BulkDeleteQuery
+from sentry.db.partitions import PartitionManager
+from sentry.models import Group
+from sentry.testutils import TestCase
+
+
+class PartitionManagerTest(TestCase):
+    def setUp(self):
+        self.manager = PartitionManager(Group, 'last_seen')
+        self.cursor = Mock()
+        patcher = patch.object(
+            connections[self.manager.using], 'cursor', return_value=self.cursor,
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def get_statements(self):
+        return [
+            (' '.join(c[0][0].split()), ) + tuple(c[0][1:])
+            for c in self.cursor.execute.call_args_list
+        ]
+
+    def test_get_partition_name(self):
+        assert self.manager.get_partition_name(
+            datetime(2018, 6, 1, 12, tzinfo=timezone.utc),
+        ) == 'sentry_groupedmessage_p20180601'
+
+    def test_is_partitioned(self):
+        with patch('sentry.db.partitions.db.is_postgres', return_value=False):
+            assert not self.manager.is_partitioned()
+        assert self.cursor.execute.call_count == 0
+
+        with patch('sentry.db.partitions.db.is_postgres', return_value=True):
+            # partitioning requires Postgres 10
+            self.cursor.fetchone.side_effect = [(90600, )]
+            assert not self.manager.is_partitioned()
+
+            self.cursor.fetchone.side_effect = [(100004, ), ('last_seen', )]
+            assert self.manager.is_partitioned()
+
+            # partitioned on another column
+            self.cursor.fetchone.side_effect = [(100004, ), ('first_seen', )]
+            assert not self.manager.is_partitioned()
+
+    def test_get_partitions(self):
+        self.cursor.fetchall.return_value = [
+            ('sentry_groupedmessage_p20180602', ),
+            ('sentry_groupedmessage_p20180601', ),
+            ('sentry_groupedmessage_default', ),
+            ('sentry_groupedmessage_old_p20180601', ),
+        ]
+        assert self.manager.get_partitions() == [
+            (datetime(2018, 6, 1, tzinfo=timezone.utc), 'sentry_groupedmessage_p20180601'),
+            (datetime(2018, 6, 2, tzinfo=timezone.utc), 'sentry_groupedmessage_p20180602'),
+        ]
+
+    def test_create_partitions(self):
+        now = datetime(2018, 6, 1, 12, tzinfo=timezone.utc)
+        today = datetime(2018, 6, 1, tzinfo=timezone.utc)
+        partitions = [(today, 'sentry_groupedmessage_p20180601')]
+
+        with patch.object(self.manager, 'get_partitions', return_value=partitions):
+            assert self.manager.create_partitions(days=2, now=now) == [
+                'sentry_groupedmessage_p20180602',
+                'sentry_groupedmessage_p20180603',
+            ]
+
+        sql = (
+            'create table "{}" partition of "sentry_groupedmessage" '
+            'for values from (%s) to (%s)'
+        )
+        assert self.get_statements() == [
+            (
+                sql.format('sentry_groupedmessage_p20180602'),
+                [today + timedelta(days=1), today + timedelta(days=2)],
+            ),
+            (
+                sql.format('sentry_groupedmessage_p20180603'),
+                [today + timedelta(days=2), today + timedelta(days=3)],
+            ),
+        ]
+
+    def test_drop_partitions(self):
+        partitions = [
+            (datetime(2018, 5, day, tzinfo=timezone.utc), 'sentry_groupedmessage_p201805%s' % day)
+            for day in range(28, 32)
+        ]
+
+        # only the partitions that end before the cutoff are dropped
+        with patch.object(self.manager, 'get_partitions', return_value=partitions):
+            assert self.manager.drop_partitions(
+                datetime(2018, 5, 30, 12, tzinfo=timezone.utc),
+            ) == [
+                'sentry_groupedmessage_p20180528',
+                'sentry_groupedmessage_p20180529',
+            ]
+
+        assert self.get_statements() == [
+            ('drop table "sentry_groupedmessage_p20180528"', ),
+            ('drop table "sentry_groupedmessage_p20180529"', ),
+        ]
+
+
+class MaintainPartitionsTest(TestCase):
+    @patch.object(PartitionManager, 'create_partitions')
+    @patch.object(PartitionManager, 'drop_partitions')
+    @patch.object(PartitionManager, 'is_partitioned', return_value=True)
+    def test_partitioned(self, is_partitioned, drop_partitions, create_partitions):
+        cutoff = timezone.now() - timedelta(days=30)
+        BulkDeleteQuery(model=Group, dtfield='last_seen', days=30).maintain_partitions(cutoff)
+        drop_partitions.assert_called_once_with(cutoff)
+        create_partitions.assert_called_once_with(days=7)
+
+    @patch.object(PartitionManager, 'create_partitions')
+    @patch.object(PartitionManager, 'drop_partitions')
+    @patch.object(PartitionManager, 'is_partitioned', return_value=False)
+    def test_not_partitioned(self, is_partitioned, drop_partitions, create_partitions):
+        cutoff = timezone.now() - timedelta(days=30)
+        BulkDeleteQuery(model=Group, dtfield='last_seen', days=30).maintain_partitions(cutoff)
+        assert drop_partitions.call_count == 0
+        assert create_partitions.call_count == 0
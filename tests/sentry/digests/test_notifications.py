@@ -11,6 +11,7 @@ from sentry.digests import Record
 from sentry.digests.notifications import (
     Notification,
     event_to_record,
+    fetch_states,
     rewrite_record,
     group_records,
     sort_group_contents,
@@ -141,3 +142,24 @@ class SortRecordsTestCase(TestCase):
                 (rules[0], OrderedDict(((groups[0], []), ))),
             )
         )
+
+
+class FetchStatesTestCase(TestCase):
+    def test_success(self):
+        rule = self.event.project.rule_set.all()[0]
+        record = event_to_record(self.event, (rule, ))
+
+        states = fetch_states([
+            (self.event.project, [record]),
+            (self.event.project, [record]),
+        ])
+
+        assert len(states) == 2
+        for state in states:
+            assert state['project'] == self.event.project
+            assert state['groups'] == {self.event.group.id: self.event.group}
+            assert state['rules'] == {rule.id: rule}
+
+        # Every digest gets its own instances, since state is attached to them.
+        assert states[0]['groups'][self.event.group.id] is not \
+            states[1]['groups'][self.event.group.id]
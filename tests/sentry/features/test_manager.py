@@ -0,0 +1,61 @@
+from __future__ import absolute_import
+
+from django.http import HttpRequest
+
+from sentry.app import env
+from sentry.features import FeatureManager, OrganizationFeature, ProjectFeature
+from sentry.testutils import TestCase
+
+
+class FeatureManagerTest(TestCase):
+    def setUp(self):
+        self.manager = FeatureManager()
+        self.manager.add('organizations:foo', OrganizationFeature)
+        self.manager.add('projects:foo', ProjectFeature)
+        self.manager.add('projects:bar', ProjectFeature)
+
+    def tearDown(self):
+        env.request = None
+
+    def test_has_batch(self):
+        projects = [self.create_project(), self.create_project()]
+
+        with self.settings(SENTRY_FEATURES={'projects:foo': True}):
+            result = self.manager.has_batch(
+                ['projects:foo', 'projects:bar'], projects, actor=self.user)
+
+        assert result == {
+            project: {
+                'projects:foo': True,
+                'projects:bar': False,
+            } for project in projects
+        }
+
+    def test_request_cache(self):
+        organization = self.create_organization()
+        env.request = HttpRequest()
+
+        with self.settings(SENTRY_FEATURES={'organizations:foo': True}):
+            assert self.manager.has('organizations:foo', organization, actor=self.user)
+
+        # the result is reused for the rest of the request
+        with self.settings(SENTRY_FEATURES={'organizations:foo': False}):
+            assert self.manager.has('organizations:foo', organization, actor=self.user)
+            assert not self.manager.has(
+                'organizations:foo', self.create_organization(), actor=self.user)
+
+            env.request = HttpRequest()
+            assert not self.manager.has('organizations:foo', organization, actor=self.user)
+
+    def test_process_cache(self):
+        organization = self.create_organization()
+
+        with self.options({'features.cache-ttl': 60}):
+            with self.settings(SENTRY_FEATURES={'organizations:foo': True}):
+                assert self.manager.has('organizations:foo', organization)
+
+            with self.settings(SENTRY_FEATURES={'organizations:foo': False}):
+                assert self.manager.has('organizations:foo', organization)
+
+        with self.settings(SENTRY_FEATURES={'organizations:foo': False}):
+            assert not self.manager.has('organizations:foo', organization)
@@ -9,7 +9,9 @@ from django.conf import settings
 from django.template.loader import render_to_string
 from exam import fixture
 
-from sentry.interfaces.stacktrace import (Frame, Stacktrace, get_context, is_url, slim_frame_data)
+from sentry.interfaces.stacktrace import (
+    Frame, Stacktrace, get_context, get_frame_hash_components, is_url, slim_frame_data
+)
 from sentry.models import Event
 from sentry.testutils import TestCase
 
@@ -419,6 +421,28 @@ class StacktraceTest(TestCase):
             '_foo_html_erb__<anon>_<anon>',
         ])
 
+    def test_get_hash_is_memoized(self):
+        get_frame_hash_components.cache_clear()
+        data = {
+            'filename': 'foo.py',
+            'function': 'block in foo',
+            'lineno': 1,
+        }
+        result = Frame.to_python(data).get_hash()
+        assert result == ['foo.py', 'block']
+        assert get_frame_hash_components.cache_info().misses == 1
+
+        with mock.patch.object(Frame, 'compute_hash') as compute_hash:
+            result = Frame.to_python(data).get_hash()
+            assert not compute_hash.called
+        assert result == ['foo.py', 'block']
+        assert get_frame_hash_components.cache_info().hits == 1
+
+        # the frame platform takes priority over the given platform
+        result = Frame.to_python(dict(data, platform='cocoa')).get_hash(platform='python')
+        assert result == Frame.to_python(data).get_hash(platform='cocoa')
+        assert get_frame_hash_components.cache_info().misses == 2
+
     def test_get_hash_ignores_filename_if_blob(self):
         interface = Frame.to_python(
             {
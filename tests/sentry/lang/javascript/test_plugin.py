@@ -188,6 +188,7 @@ class JavascriptIntegrationTest(TestCase):
             release=None,
             dist=None,
             allow_scraping=True,
+            manifest=None,
         )
 
         event = Event.objects.get()
@@ -247,6 +248,7 @@ class JavascriptIntegrationTest(TestCase):
             release=None,
             dist=None,
             allow_scraping=True,
+            manifest=None,
         )
 
         event = Event.objects.get()
@@ -27,6 +27,7 @@ from sentry.lang.javascript.processor import (
 from sentry.lang.javascript.errormapping import (rewrite_exception, REACT_MAPPING_URL)
 from sentry.models import File, Release, ReleaseFile, EventError
 from sentry.testutils import TestCase
+from sentry.utils.cache import cache
 from sentry.utils.strings import truncatechars
 
 base64_sourcemap = 'data:application/json;base64,eyJ2ZXJzaW9uIjozLCJmaWxlIjoiZ2VuZXJhdGVkLmpzIiwic291cmNlcyI6WyIvdGVzdC5qcyJdLCJuYW1lcyI6W10sIm1hcHBpbmdzIjoiO0FBQUEiLCJzb3VyY2VzQ29udGVudCI6WyJjb25zb2xlLmxvZyhcImhlbGxvLCBXb3JsZCFcIikiXX0='
@@ -55,8 +56,140 @@ class JavaScriptStacktraceProcessorTest(TestCase):
         r = JavaScriptStacktraceProcessor({}, None, project)
         assert not r.allow_scraping
 
+    @responses.activate
+    def test_populate_source_cache_concurrently(self):
+        body = u'console.log("hello, World!")\n//# sourceMappingURL=%s' % base64_sourcemap
+        responses.add(responses.GET, 'http://example.com/a.js', body=body)
+        responses.add(responses.GET, 'http://example.com/b.js', body=body)
+        responses.add(responses.GET, 'http://example.com/c.js', status=404)
+
+        project = self.create_project()
+        processor = JavaScriptStacktraceProcessor({}, None, project)
+        frames = [
+            {'abs_path': 'http://example.com/%s.js' % name, 'lineno': 1}
+            for name in ('a', 'b', 'c')
+        ]
+
+        with self.options({'sourcemaps.fetch-concurrency': 4}):
+            processor.populate_source_cache(frames)
+
+        assert processor.fetch_count == 3
+        for name in ('a', 'b'):
+            url = 'http://example.com/%s.js' % name
+            assert processor.cache.get(url) is not None
+            sourcemap_url, sourcemap = processor.sourcemaps.get_link(url)
+            assert sourcemap_url == base64_sourcemap
+            assert sourcemap is not None
+
+        errors = processor.cache.get_errors('http://example.com/c.js')
+        assert [e['type'] for e in errors] == [EventError.FETCH_INVALID_HTTP_CODE]
+
 
 class FetchReleaseFileTest(TestCase):
+    def test_manifest(self):
+        project = self.project
+        release = Release.objects.create(
+            organization_id=project.organization_id,
+            version='abc',
+        )
+        release.add_project(project)
+
+        file = File.objects.create(
+            name='file.min.js',
+            type='release.file',
+            headers={'Content-Type': 'application/json; charset=utf-8'},
+        )
+        file.putfile(six.BytesIO(b'foo'))
+
+        releasefile = ReleaseFile.objects.create(
+            name='file.min.js',
+            release=release,
+            organization_id=project.organization_id,
+            file=file,
+        )
+
+        manifest = ReleaseFile.get_manifest(release)
+        assert manifest == {
+            releasefile.ident: (
+                file.id, file.checksum, {'Content-Type': 'application/json; charset=utf-8'},
+            ),
+        }
+
+        # Misses are resolved from the manifest without querying
+        with self.assertNumQueries(0):
+            assert fetch_release_file('other.min.js', release, manifest=manifest) is None
+
+        result = fetch_release_file('file.min.js', release, manifest=manifest)
+        assert result.body == b'foo'
+
+        # Changing an artifact invalidates the manifest
+        releasefile.update(name='~/file.min.js')
+        assert ReleaseFile.get_manifest(release) == {
+            ReleaseFile.get_ident('~/file.min.js'): (
+                file.id, file.checksum, {'Content-Type': 'application/json; charset=utf-8'},
+            ),
+        }
+
+        releasefile.delete()
+        assert ReleaseFile.get_manifest(release) == {}
+
+    def test_manifest_stale_write(self):
+        project = self.project
+        release = Release.objects.create(
+            organization_id=project.organization_id,
+            version='abc',
+        )
+        release.add_project(project)
+
+        file = File.objects.create(name='file.min.js', type='release.file')
+        file.putfile(six.BytesIO(b'foo'))
+
+        cache_set = cache.set
+
+        def set_manifest(key, value, timeout):
+            # An artifact is added after the manifest was queried but before
+            # it is written to the cache.
+            if key.startswith('releasefile:manifest:'):
+                ReleaseFile.objects.create(
+                    name='file.min.js',
+                    release=release,
+                    organization_id=project.organization_id,
+                    file=file,
+                )
+            cache_set(key, value, timeout)
+
+        with patch.object(cache, 'set', side_effect=set_manifest):
+            assert ReleaseFile.get_manifest(release) == {}
+
+        # The manifest built before the change is not used
+        assert list(ReleaseFile.get_manifest(release)) == [ReleaseFile.get_ident('file.min.js')]
+
+    @patch('sentry.models.releasefile.MANIFEST_MAX_ARTIFACTS', 1)
+    def test_manifest_too_large(self):
+        project = self.project
+        release = Release.objects.create(
+            organization_id=project.organization_id,
+            version='abc',
+        )
+        release.add_project(project)
+
+        for name in ('file.min.js', 'other.min.js'):
+            file = File.objects.create(name=name, type='release.file')
+            file.putfile(six.BytesIO(name.encode('utf-8')))
+            ReleaseFile.objects.create(
+                name=name,
+                release=release,
+                organization_id=project.organization_id,
+                file=file,
+            )
+
+        assert ReleaseFile.get_manifest(release) is None
+
+        # Artifacts are looked up one by one instead
+        result = fetch_release_file('other.min.js', release)
+        assert result.body == b'other.min.js'
+        assert fetch_release_file('missing.min.js', release) is None
+
     def test_unicode(self):
         project = self.project
         release = Release.objects.create(
@@ -0,0 +1,99 @@
+from __future__ import absolute_import
+
+import json
+import mock
+import responses
+
+from sentry.lang.native import systemsymbols
+from sentry.lang.native.systemsymbols import SystemSymbolClient
+from sentry.testutils import TestCase
+
+SDK_INFO = {
+    'sdk_name': 'iOS',
+    'version_major': 9,
+    'version_minor': 3,
+    'version_patchlevel': 0,
+}
+
+
+def make_symbol(index):
+    return {
+        'object_uuid': '67e9247c-814e-392b-a027-dbde6748fcbf',
+        'object_name': 'CoreFoundation',
+        'addr': '0x%x' % index,
+    }
+
+
+def lookup_callback(request):
+    symbols = json.loads(request.body)['symbols']
+    matches = [
+        {'symbol': 'sym_%s' % s['addr']} if int(s['addr'], 16) % 2 == 0 else None
+        for s in symbols
+    ]
+    return (200, {}, json.dumps({'symbols': matches}))
+
+
+class SystemSymbolClientTest(TestCase):
+    def setUp(self):
+        self.client = SystemSymbolClient()
+        self.url = 'http://symbolserver.invalid/lookup'
+        self.options_patch = self.options({
+            'symbolserver.enabled': True,
+            'symbolserver.options': {'url': 'http://symbolserver.invalid/'},
+        })
+        self.options_patch.__enter__()
+
+    def tearDown(self):
+        self.options_patch.__exit__(None, None, None)
+
+    @responses.activate
+    def test_lookup_cached(self):
+        responses.add_callback(responses.POST, self.url, callback=lookup_callback)
+        symbols = [make_symbol(i) for i in range(4)]
+
+        rv = self.client.lookup(symbols, SDK_INFO, 'arm64')
+        assert rv == [{'symbol': 'sym_0x0'}, None, {'symbol': 'sym_0x2'}, None]
+        assert len(responses.calls) == 1
+
+        # Matches and misses are both served from the cache
+        assert self.client.lookup(symbols, SDK_INFO, 'arm64') == rv
+        assert len(responses.calls) == 1
+
+        # Other CPUs are looked up separately
+        self.client.lookup(symbols, SDK_INFO, 'armv7')
+        assert len(responses.calls) == 2
+
+    @responses.activate
+    @mock.patch('sentry.lang.native.systemsymbols.LOOKUP_CHUNK_SIZE', 3)
+    def test_lookup_chunked(self):
+        responses.add_callback(responses.POST, self.url, callback=lookup_callback)
+        symbols = [make_symbol(i) for i in range(8)]
+
+        rv = self.client.lookup(symbols, SDK_INFO, 'arm64')
+        assert rv == [
+            {'symbol': 'sym_0x%x' % i} if i % 2 == 0 else None
+            for i in range(8)
+        ]
+        assert len(responses.calls) == 3
+
+    @responses.activate
+    def test_circuit_breaker(self):
+        responses.add(responses.POST, self.url, status=500)
+        symbols = [make_symbol(0)]
+
+        assert self.client.lookup(symbols, SDK_INFO, 'arm64') == [None]
+        assert len(responses.calls) == 1
+
+        # The symbol server is skipped until the backoff has passed
+        assert self.client.lookup(symbols, SDK_INFO, 'arm64') == [None]
+        assert len(responses.calls) == 1
+
+        responses.reset()
+        responses.add_callback(responses.POST, self.url, callback=lookup_callback)
+        self.client.retry_at = 0
+        assert self.client.lookup(symbols, SDK_INFO, 'arm64') == [{'symbol': 'sym_0x0'}]
+        assert self.client.failures == 0
+
+    def test_disabled(self):
+        with self.options({'symbolserver.enabled': False}):
+            assert systemsymbols.lookup_system_symbols([make_symbol(0)], SDK_INFO) is None
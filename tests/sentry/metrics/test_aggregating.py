@@ -0,0 +1,85 @@
+from __future__ import absolute_import
+
+from mock import call, patch
+from threading import Thread
+
+from sentry.metrics.aggregating import AggregatingMetricsBackend
+from sentry.testutils import TestCase
+
+
+class AggregatingMetricsBackendTest(TestCase):
+    def setUp(self):
+        self.backend = AggregatingMetricsBackend(
+            backend='sentry.metrics.dummy.DummyMetricsBackend',
+            flush_interval=60 * 1000,
+        )
+
+    def test_incr(self):
+        with patch.object(self.backend.backend, 'incr') as mock_incr:
+            for i in range(3):
+                self.backend.incr('foo')
+            self.backend.incr('foo', amount=2)
+            self.backend.incr('foo', tags={'bar': 'baz'})
+            assert mock_incr.call_count == 0
+
+            self.backend.flush()
+            assert sorted(mock_incr.mock_calls) == sorted([
+                call('foo', None, None, 5),
+                call('foo', None, {'bar': 'baz'}, 1),
+            ])
+
+    def test_timing(self):
+        with patch.object(self.backend.backend, 'timing') as mock_timing:
+            self.backend.timing('foo', 30, tags={'bar': 'baz'})
+            self.backend.timing('foo', 40, tags={'bar': 'baz'}, sample_rate=0.5)
+            assert mock_timing.call_count == 0
+
+            self.backend.flush()
+            assert mock_timing.mock_calls == [
+                call('foo', 30, None, {'bar': 'baz'}, 1),
+                call('foo', 40, None, {'bar': 'baz'}, 0.5),
+            ]
+
+    def test_flush(self):
+        with patch.object(self.backend, 'flush') as flush:
+            self.backend.incr('foo')
+            self.backend.timing('foo', 30)
+            assert flush.call_count == 0
+
+            # flushed once the buffer is full
+            self.backend.max_buffer_size = 3
+            self.backend.timing('foo', 30)
+            assert flush.call_count == 1
+
+    def test_shared_between_threads(self):
+        thread = Thread(target=self.backend.incr, args=('foo', ))
+        thread.start()
+        thread.join()
+
+        with patch.object(self.backend.backend, 'incr') as mock_incr:
+            self.backend.incr('foo')
+            self.backend.flush()
+            assert mock_incr.mock_calls == [call('foo', None, None, 2)]
+
+    def test_close(self):
+        with patch.object(self.backend.backend, 'incr') as mock_incr:
+            self.backend.incr('foo')
+            self.backend.close()
+            assert mock_incr.mock_calls == [call('foo', None, None, 1)]
+            assert self.backend.buffer.closed.is_set()
+
+    def test_fork(self):
+        parent_buffer = self.backend.buffer
+        self.backend.incr('foo')
+
+        # A forked process starts its own buffer and flusher with the first
+        # metric it records.
+        with patch('sentry.metrics.aggregating.os.getpid', return_value=parent_buffer.pid + 1), \
+                patch.object(self.backend, '_start') as start:
+            self.backend.incr('bar')
+            assert start.call_count == 1
+            assert self.backend.buffer is not parent_buffer
+
+            with patch.object(self.backend.backend, 'incr') as mock_incr:
+                self.backend.flush()
+                assert mock_incr.mock_calls == [call('bar', None, None, 1)]
@@ -7,6 +7,7 @@ from six import BytesIO, text_type
 
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.core.urlresolvers import reverse
+from mock import patch
 
 from symbolic import SYMCACHE_LATEST_VERSION
 
@@ -352,6 +353,26 @@ class SymCacheTest(TestCase):
         assert debug_id in symcaches
         assert symcaches[debug_id].id == debug_id
 
+    def test_reuse_open_symcache(self):
+        debug_id = '67e9247c-814e-392b-a027-dbde6748fcbf'
+        self.create_dif_from_path(
+            path=os.path.join(os.path.dirname(__file__), 'fixtures', 'crash.dsym'),
+            debug_id=debug_id,
+            features=['debug'],
+        )
+
+        # The first call converts the debug file and returns the new cache
+        ProjectDebugFile.difcache.get_symcaches(self.project, [debug_id])
+
+        with self.options({'dsym.cache-pool-size': 0}):
+            symcaches = ProjectDebugFile.difcache.get_symcaches(self.project, [debug_id])
+            assert ProjectDebugFile.difcache.get_symcaches(
+                self.project, [debug_id])[debug_id] is not symcaches[debug_id]
+
+        symcaches = ProjectDebugFile.difcache.get_symcaches(self.project, [debug_id])
+        assert ProjectDebugFile.difcache.get_symcaches(
+            self.project, [debug_id])[debug_id] is symcaches[debug_id]
+
     def test_miss_symcache_without_feature(self):
         debug_id = '67e9247c-814e-392b-a027-dbde6748fcbf'
         self.create_dif_from_path(
@@ -646,3 +667,50 @@ class CfiCacheTest(TestCase):
         cficache.delete()
         assert not File.objects.filter(id=cache_file.id).exists()
         assert not ProjectCfiCacheFile.objects.filter(id=cficache.id).exists()
+
+
+class ProguardMappingViewTest(TestCase):
+    def create_mapping(self, source):
+        return debugfile.create_dif_from_id(
+            self.project, 'proguard', 'any', PROGUARD_UUID, {'features': ['mapping']},
+            'proguard-mapping', fileobj=BytesIO(source))[0]
+
+    def test_get_mapping_view(self):
+        self.create_mapping(PROGUARD_SOURCE)
+
+        views = ProjectDebugFile.difcache.get_proguard_mapping_views(
+            self.project, [PROGUARD_UUID])
+        assert views[PROGUARD_UUID].has_line_info
+
+    def test_reuse_open_mapping_view(self):
+        self.create_mapping(PROGUARD_SOURCE)
+
+        with self.options({'dsym.cache-pool-size': 0}):
+            views = ProjectDebugFile.difcache.get_proguard_mapping_views(
+                self.project, [PROGUARD_UUID])
+            assert ProjectDebugFile.difcache.get_proguard_mapping_views(
+                self.project, [PROGUARD_UUID])[PROGUARD_UUID] is not views[PROGUARD_UUID]
+
+        views = ProjectDebugFile.difcache.get_proguard_mapping_views(
+            self.project, [PROGUARD_UUID])
+        assert ProjectDebugFile.difcache.get_proguard_mapping_views(
+            self.project, [PROGUARD_UUID])[PROGUARD_UUID] is views[PROGUARD_UUID]
+
+        # A new upload of the mapping is not served from the open view
+        self.create_mapping(PROGUARD_SOURCE + b'\n')
+        assert ProjectDebugFile.difcache.get_proguard_mapping_views(
+            self.project, [PROGUARD_UUID])[PROGUARD_UUID] is not views[PROGUARD_UUID]
+
+    def test_warmup(self):
+        dif = self.create_mapping(PROGUARD_SOURCE)
+
+        with self.options({'dsym.proguard-warmup': True}):
+            with patch.object(ProjectDebugFile.difcache, '_open_cachefile') as open_cachefile:
+                ProjectDebugFile.difcache.update_caches(self.project, [PROGUARD_UUID])
+
+        # The mapping is only downloaded, not opened
+        assert open_cachefile.call_count == 0
+        assert os.path.isfile(os.path.join(
+            ProjectDebugFile.difcache.get_project_path(self.project),
+            '%s_%s' % (PROGUARD_UUID, dif.file.checksum),
+        ))
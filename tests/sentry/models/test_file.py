@@ -1,10 +1,13 @@
 from __future__ import absolute_import
 
 import os
+import shutil
+import tempfile
 
 from django.core.files.base import ContentFile
 
 from sentry.models import File, FileBlob
+from sentry.models.file import get_storage
 from sentry.testutils import TestCase
 
 
@@ -36,6 +39,24 @@ class FileBlobTest(TestCase):
         path2 = FileBlob.generate_unique_path()
         assert path != path2
 
+    def test_getfile_with_cache(self):
+        cache_path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_path)
+
+        blob = FileBlob.from_file(ContentFile('foo bar'.encode('utf-8')))
+
+        with self.options({'filestore.cache-path': cache_path}):
+            with blob.getfile() as f:
+                assert f.read() == b'foo bar'
+
+            cached_path = os.path.join(cache_path, blob.checksum[:2], blob.checksum)
+            assert os.path.isfile(cached_path)
+
+            # Blobs are served from the cache once they are cached
+            get_storage().delete(blob.path)
+            with blob.getfile() as f:
+                assert f.read() == b'foo bar'
+
 
 class FileTest(TestCase):
     def test_file_handling(self):
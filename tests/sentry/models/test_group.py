@@ -9,6 +9,7 @@ from django.db.models import ProtectedError
 from django.utils import timezone
 
 from sentry import tagstore
+from sentry.event_manager import ScoreClause
 from sentry.models import (
     Group, GroupRedirect, GroupSnooze, GroupStatus, Release, get_group_with_redirect
 )
@@ -16,6 +17,21 @@ from sentry.testutils import TestCase
 
 
 class GroupTest(TestCase):
+    def test_calculate_score(self):
+        last_seen = datetime(2018, 1, 1, 12, 30, 0, 500000, tzinfo=timezone.utc)
+        assert Group.calculate_score(1, last_seen) == 1514809800
+        assert Group.calculate_score(0, last_seen) == 1514809800
+        assert Group.calculate_score(100, last_seen) == 1514809800 + 1200
+
+    def test_score_matches_database(self):
+        group = self.create_group(
+            times_seen=10,
+            last_seen=datetime(2018, 1, 1, 12, 30, 0, tzinfo=timezone.utc),
+        )
+        group.update(score=ScoreClause(group=None))
+        group = Group.objects.get(id=group.id)
+        assert group.score == Group.calculate_score(10, group.last_seen) == 1514809800 + 600
+
     def test_is_resolved(self):
         group = self.create_group(status=GroupStatus.RESOLVED)
         assert group.is_resolved()
@@ -5,8 +5,9 @@ from mock import patch
 
 from sentry.models import (
     Commit, CommitAuthor, Environment, Group, GroupRelease, GroupResolution, GroupLink, GroupStatus,
-    ExternalIssue, Integration, OrganizationIntegration, Release, ReleaseCommit, ReleaseEnvironment,
-    ReleaseHeadCommit, ReleaseProject, ReleaseProjectEnvironment, Repository
+    ExternalIssue, File, Integration, OrganizationIntegration, Release, ReleaseCommit,
+    ReleaseEnvironment, ReleaseFile, ReleaseHeadCommit, ReleaseProject, ReleaseProjectEnvironment,
+    Repository
 )
 
 from sentry.testutils import TestCase
@@ -131,6 +132,28 @@ class MergeReleasesTest(TestCase):
         assert not Release.objects.filter(id=release2.id).exists()
         assert not Release.objects.filter(id=release3.id).exists()
 
+    def test_release_files(self):
+        project = self.project
+        release = Release.objects.create(version='abcdabc', organization=project.organization)
+        release.add_project(project)
+        release2 = Release.objects.create(version='bbbbbbb', organization=project.organization)
+        release2.add_project(project)
+
+        file = File.objects.create(name='file.min.js', type='release.file')
+        releasefile = ReleaseFile.objects.create(
+            name='file.min.js',
+            release=release2,
+            organization_id=project.organization_id,
+            file=file,
+        )
+
+        assert ReleaseFile.get_manifest(release) == {}
+
+        Release.merge(release, [release2])
+
+        # The cached manifest includes the merged artifacts
+        assert list(ReleaseFile.get_manifest(release)) == [releasefile.ident]
+
     def test_short_version_dotted_prefix(self):
         org = self.create_organization()
 
@@ -3,11 +3,26 @@ from __future__ import absolute_import
 from django.conf.urls import url
 
 from sentry.plugins import Plugin2
+from sentry.plugins.base.manager import PluginManager
 from sentry.plugins.base.project_api_urls import load_plugin_urls
 from sentry.plugins.base.response import JSONResponse
 from sentry.testutils import TestCase
 
 
+class PreprocessingPlugin(Plugin2):
+    title = 'A'
+
+    def get_event_preprocessors(self, data, **kwargs):
+        return [lambda data: data]
+
+
+class TaggingPlugin(Plugin2):
+    title = 'B'
+
+    def get_tags(self, event, **kwargs):
+        return [('foo', 'bar')]
+
+
 def test_json_response():
     resp = JSONResponse({}).respond(None)
     assert resp.status_code == 200
@@ -59,3 +74,22 @@ class Plugin2TestCase(TestCase):
         assert a_plugin.get_option('key', project=project) == 'value'
         a_plugin.reset_options(project=project)
         assert a_plugin.get_option('key', project=project) is None
+
+
+def test_plugin_manager_hooks():
+    manager = PluginManager()
+    manager.register(TaggingPlugin)
+
+    assert list(manager.all(version=2, hook='get_event_preprocessors')) == []
+    assert [type(p) for p in manager.all(version=2, hook='get_tags')] == [TaggingPlugin]
+
+    # registering a plugin rebuilds the hook registry
+    manager.register(PreprocessingPlugin)
+    assert [type(p) for p in manager.all(version=2, hook='get_event_preprocessors')] == \
+        [PreprocessingPlugin]
+
+    plugin, = manager.all(version=2, hook='get_tags')
+    assert manager.call_hook(plugin, 'get_tags', None) == [('foo', 'bar')]
+
+    manager.unregister(TaggingPlugin)
+    assert list(manager.all(version=2, hook='get_tags')) == []
@@ -68,6 +68,27 @@ def test_is_rate_limited_script():
     ))) == [False, ]
 
 
+def test_is_rate_limited_script_with_accepted_items():
+    now = int(time.time())
+
+    cluster = clusters.get('default')
+    client = cluster.get_local_client(six.next(iter(cluster.hosts)))
+
+    # Items accepted without checking are counted, and the usage is returned
+    # after the rejections.
+    assert is_rate_limited(
+        client, ('quux', 'r:quux'), (5, now + 60, 3)
+    ) == [None, 4]
+    assert client.get('quux') == '4'
+
+    # Accepted items are counted even if the item itself is rejected.
+    assert list(map(bool, is_rate_limited(
+        client, ('quux', 'r:quux'), (5, now + 60, 1)
+    )[:1])) == [True]
+    assert client.get('quux') == '5'
+    assert 59 <= client.ttl('quux') <= 60
+
+
 class RedisQuotaTest(TestCase):
     quota = fixture(RedisQuota)
 
@@ -251,3 +272,38 @@ class RedisQuotaTest(TestCase):
             timestamp=timestamp,
             # the - 1 is because we refunded once
         ) == [n - 1 for _ in quotas] + [None, 0]
+
+    def test_local_headroom(self):
+        timestamp = time.time()
+
+        self.get_project_quota.return_value = (200, 60)
+        self.get_organization_quota.return_value = (300, 60)
+
+        quota = RedisQuota(local_headroom=0.1)
+
+        n = 10
+        with mock.patch('sentry.quotas.redis.is_rate_limited',
+                        side_effect=is_rate_limited) as mock_is_rate_limited:
+            for _ in xrange(n):
+                assert not quota.is_rate_limited(self.project, timestamp=timestamp).is_limited
+
+            # The first check leases 10% of the remaining project quota.
+            assert mock_is_rate_limited.call_count == 1
+
+        # Items accepted locally are only counted with the next check.
+        quotas = quota.get_quotas(self.project)
+        assert quota.get_usage(
+            self.project.organization_id, quotas, timestamp=timestamp,
+        ) == [1 for _ in quotas]
+
+        with mock.patch('sentry.quotas.redis.is_rate_limited',
+                        side_effect=is_rate_limited) as mock_is_rate_limited:
+            for _ in xrange(n * 2):
+                assert not quota.is_rate_limited(self.project, timestamp=timestamp).is_limited
+
+            # The lease ran out after 19 items, the next check counts them.
+            assert mock_is_rate_limited.call_count == 1
+
+        assert quota.get_usage(
+            self.project.organization_id, quotas, timestamp=timestamp,
+        ) == [21 for _ in quotas]
@@ -15,5 +15,21 @@ class RedisRateLimiterTest(TestCase):
         assert self.backend.is_limited('foo', 1, self.project)
 
     def test_simple_key(self):
-        assert not self.backend.is_limited('foo', 1)
+        assert not self.backend.is_limited('foo', 21)
         assert self.backend.is_limited('foo', 1)
+
+    def test_local_headroom(self):
+        backend = RedisRateLimiter(local_headroom=0.5)
+
+        # The first check leases half of the remaining limit.
+        assert not backend.is_limited('foo', 21)
+        for _ in range(10):
+            assert not backend.is_limited('foo', 21)
+
+        # Requests accepted locally are only counted with the next check
+        # that runs out of the lease.
+        assert not self.backend.is_limited('foo', 21)
+        assert not backend.is_limited('foo', 21)
+        for _ in range(8):
+            assert not self.backend.is_limited('foo', 21)
+        assert self.backend.is_limited('foo', 21)
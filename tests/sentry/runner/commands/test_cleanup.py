@@ -0,0 +1,63 @@
+from __future__ import absolute_import
+
+from datetime import timedelta
+from multiprocessing import Value
+
+from django.utils import timezone
+from mock import patch
+from six.moves.queue import Queue
+
+from sentry.models import Group
+from sentry.runner.commands.cleanup import (
+    _BULK_DELETE, _NODESTORE_CLEANUP, _STOP_WORKER, multiprocess_worker
+)
+from sentry.testutils import TestCase
+
+
+@patch('sentry.runner.configure')
+class MultiprocessWorkerTest(TestCase):
+    def run_worker(self, *tasks):
+        task_queue = Queue()
+        for task in tasks:
+            task_queue.put(task)
+        task_queue.put(_STOP_WORKER)
+
+        errors = Value('i', 0)
+        multiprocess_worker(task_queue, errors)
+        assert task_queue.unfinished_tasks == 0
+        return errors.value
+
+    def test_bulk_delete(self, configure):
+        now = timezone.now()
+        old_group = self.create_group(self.project, last_seen=now - timedelta(days=2))
+        new_group = self.create_group(self.project, last_seen=now)
+
+        assert self.run_worker((_BULK_DELETE, {
+            'model': 'sentry.models.Group',
+            'dtfield': 'last_seen',
+            'days': 1,
+            'project_id': None,
+            'order_by': None,
+            'chunk_size': 100,
+            'max_replication_lag': None,
+            'silent': True,
+        })) == 0
+
+        assert not Group.objects.filter(id=old_group.id).exists()
+        assert Group.objects.filter(id=new_group.id).exists()
+
+    @patch('sentry.runner.commands.cleanup.nodestore_cleanup')
+    def test_nodestore_cleanup(self, nodestore_cleanup, configure):
+        cutoff = timezone.now()
+        assert self.run_worker((_NODESTORE_CLEANUP, cutoff)) == 0
+        nodestore_cleanup.assert_called_once_with(cutoff)
+
+    @patch('sentry.runner.commands.cleanup.bulk_delete', side_effect=Exception('boom'))
+    @patch('sentry.runner.commands.cleanup.nodestore_cleanup')
+    def test_failed_task(self, nodestore_cleanup, bulk_delete, configure):
+        # failures are counted and the worker continues with the next task
+        assert self.run_worker(
+            (_BULK_DELETE, {'model': 'sentry.models.Group'}),
+            (_NODESTORE_CLEANUP, timezone.now()),
+        ) == 1
+        assert nodestore_cleanup.call_count == 1
@@ -7,14 +7,16 @@ from datetime import datetime, timedelta
 import pytest
 import pytz
 from django.conf import settings
+from django.db.models.signals import post_save
 
 from sentry import tagstore
 from sentry.models import (
-    Environment, Event, GroupAssignee, GroupBookmark, GroupEnvironment, GroupStatus,
+    Environment, Event, Group, GroupAssignee, GroupBookmark, GroupEnvironment, GroupStatus,
     GroupSubscription, Release, ReleaseEnvironment, ReleaseProjectEnvironment
 )
 from sentry.search.base import ANY
 from sentry.search.django.backend import DjangoSearchBackend, get_latest_release
+from sentry.signals import buffer_incr_complete
 from sentry.tagstore.v2.backend import AGGREGATE_ENVIRONMENT_ID
 from sentry.testutils import TestCase
 
@@ -767,3 +769,115 @@ class DjangoSearchBackendTest(TestCase):
             environment = self.create_environment()
             result = get_latest_release([self.project], [environment])
             assert result == new.version
+
+
+class StreamResultCacheTest(DjangoSearchBackendTest):
+    def create_backend(self):
+        return DjangoSearchBackend(stream_cache={'ttl': 60})
+
+    def setUp(self):
+        super(StreamResultCacheTest, self).setUp()
+        self.backend.setup()
+        self.addCleanup(
+            post_save.disconnect,
+            sender=Group,
+            dispatch_uid='sentry.search.django.record_group_change',
+        )
+        self.addCleanup(
+            buffer_incr_complete.disconnect,
+            sender=Group,
+            dispatch_uid='sentry.search.django.record_buffered_group_change',
+        )
+
+    def test_stream_cache_invalidation(self):
+        environments = [self.environments['production']]
+        results = self.backend.query(
+            [self.project],
+            environments=environments,
+            status=GroupStatus.UNRESOLVED,
+        )
+        assert list(results) == [self.group1]
+
+        # saving the group invalidates it
+        self.group1.status = GroupStatus.RESOLVED
+        self.group1.save()
+        results = self.backend.query(
+            [self.project],
+            environments=environments,
+            status=GroupStatus.UNRESOLVED,
+        )
+        assert list(results) == []
+
+        # changes that don't send a signal are not picked up
+        Group.objects.filter(id=self.group1.id).update(status=GroupStatus.UNRESOLVED)
+        results = self.backend.query(
+            [self.project],
+            environments=environments,
+            status=GroupStatus.UNRESOLVED,
+        )
+        assert list(results) == []
+
+        # until a buffered update of the group completes
+        buffer_incr_complete.send_robust(
+            model=Group,
+            columns={'times_seen': 1},
+            filters={'id': self.group1.id, 'project_id': self.project.id},
+            extra={},
+            created=False,
+            sender=Group,
+        )
+        results = self.backend.query(
+            [self.project],
+            environments=environments,
+            status=GroupStatus.UNRESOLVED,
+        )
+        assert list(results) == [self.group1]
+
+    def test_stream_cache_max_candidates(self):
+        stream_cache = self.backend.stream_cache
+
+        def evaluate(group_ids):
+            if group_ids is None:
+                return [(3, 1), (2, 2)]
+            return [(4, group_id) for group_id in group_ids]
+
+        assert stream_cache.get_candidates('foo', [self.project.id], evaluate, 2) == [
+            (3, 1), (2, 2),
+        ]
+
+        # merged changes don't exceed the maximum number of candidates
+        stream_cache.record_changes(self.project.id, [3])
+        assert stream_cache.get_candidates('foo', [self.project.id], evaluate, 2) == [
+            (4, 3), (3, 1),
+        ]
+
+    def test_stream_cache_incremental_update(self):
+        environments = [self.environments['production']]
+        results = self.backend.query(
+            [self.project],
+            environments=environments,
+            status=GroupStatus.UNRESOLVED,
+        )
+        assert list(results) == [self.group1]
+
+        self.group1.update(status=GroupStatus.RESOLVED)
+        self.backend.stream_cache.record_changes(self.project.id, [self.group1.id])
+        results = self.backend.query(
+            [self.project],
+            environments=environments,
+            status=GroupStatus.UNRESOLVED,
+        )
+        assert list(results) == []
+
+        self.group1.update(status=GroupStatus.UNRESOLVED)
+        self.backend.stream_cache.record_changes(self.project.id, [self.group1.id])
+        results = self.backend.query(
+            [self.project],
+            environments=environments,
+            status=GroupStatus.UNRESOLVED,
+        )
+        assert list(results) == [self.group1]
+
+    def test_stream_cache_skips_uncacheable_parameters(self):
+        assert not self.backend.stream_cache.is_cacheable({'bookmarked_by': self.user})
+        assert self.backend.stream_cache.is_cacheable({'status': GroupStatus.UNRESOLVED})
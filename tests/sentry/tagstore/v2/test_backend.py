@@ -5,6 +5,8 @@ import pytest
 
 from collections import OrderedDict
 from datetime import datetime
+from django.db import connections
+from mock import Mock, patch
 
 from sentry.search.base import ANY
 from sentry.testutils import TestCase
@@ -363,6 +365,54 @@ class TagStorage(TestCase):
                 ).values_list('group_id', flat=True)
             ) == set([self.proj1group1.id])
 
+    def test_create_event_tags_bulk(self):
+        v1, _ = self.ts.get_or_create_tag_value(self.proj1.id, self.proj1env1.id, 'k1', 'v1')
+
+        events = [
+            {
+                'project_id': self.proj1.id,
+                'group_id': self.proj1group1.id,
+                'environment_id': self.proj1env1.id,
+                'event_id': event.id,
+                'tags': [('k1', 'v1'), ('k2', value)],
+            } for event, value in (
+                (self.proj1group1event1, 'v2'),
+                (self.proj1group1event2, 'v3'),
+            )
+        ]
+        self.ts.create_event_tags_bulk(events)
+
+        assert models.EventTag.objects.count() == 4
+        assert set(
+            models.EventTag.objects.filter(key_id=v1._key_id).values_list('event_id', flat=True)
+        ) == set([self.proj1group1event1.id, self.proj1group1event2.id])
+        for event, value in ((self.proj1group1event1, 'v2'), (self.proj1group1event2, 'v3')):
+            assert set(
+                self.ts.get_event_tag_qs(
+                    self.proj1.id,
+                    self.proj1env1.id,
+                    'k2',
+                    value,
+                ).values_list('event_id', flat=True)
+            ) == set([event.id])
+
+        # existing rows are skipped
+        self.ts.create_event_tags_bulk(events)
+        assert models.EventTag.objects.count() == 4
+
+    @patch.dict('sentry.tagstore.v2.backend._supports_copy', clear=True)
+    @patch('sentry.tagstore.v2.backend.db.is_postgres', return_value=True)
+    def test_supports_copy_cached(self, is_postgres):
+        cursor = Mock()
+        cursor.fetchone.return_value = ('100004', )
+
+        with patch.object(connections['default'], 'cursor', return_value=cursor):
+            assert self.ts._V2TagStorage__supports_copy('default')
+            assert self.ts._V2TagStorage__supports_copy('default')
+
+        # the server version is only queried once per connection alias
+        assert cursor.execute.call_count == 1
+
     def test_delete_tag_key(self):
         tk1 = self.ts.create_tag_key(
             project_id=self.proj1.id,
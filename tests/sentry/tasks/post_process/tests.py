@@ -10,7 +10,7 @@ from sentry import tagstore
 from sentry.models import Group, GroupSnooze, GroupStatus, ServiceHook
 from sentry.testutils import TestCase
 from sentry.tasks.merge import merge_groups
-from sentry.tasks.post_process import index_event_tags, post_process_group
+from sentry.tasks.post_process import flush_event_tags, index_event_tags, post_process_group
 
 
 class PostProcessGroupTest(TestCase):
@@ -265,3 +265,75 @@ class IndexEventTagsTest(TestCase):
             self.environment.id,
             {'foo': 'bar', 'biz': 'baz'},
         ) == {'id__in': set([event.id])}
+
+    def test_batched(self):
+        group = self.create_group(project=self.project)
+        events = [self.create_event(group=group) for i in range(3)]
+
+        with self.options({'tagstore.index-batch-size': 2}), self.tasks():
+            for event in events:
+                index_event_tags.delay(
+                    event_id=event.id,
+                    group_id=group.id,
+                    project_id=self.project.id,
+                    environment_id=self.environment.id,
+                    organization_id=self.project.organization_id,
+                    tags=[('foo', 'bar'), ('biz', 'baz')],
+                    date_added=event.datetime,
+                )
+
+            # the first two events are written as soon as the batch is full
+            assert tagstore.get_group_event_filter(
+                self.project.id,
+                group.id,
+                self.environment.id,
+                {'foo': 'bar', 'biz': 'baz'},
+            ) == {'id__in': set([events[0].id, events[1].id])}
+
+            flush_event_tags()
+
+        assert tagstore.get_group_event_filter(
+            self.project.id,
+            group.id,
+            self.environment.id,
+            {'foo': 'bar', 'biz': 'baz'},
+        ) == {'id__in': set(event.id for event in events)}
+
+    @patch('sentry.tasks.post_process.clusters')
+    def test_flush_unbatched(self, clusters):
+        with self.options({'tagstore.index-batch-size': 1}):
+            flush_event_tags()
+        assert clusters.get.call_count == 0
+
+    def test_batched_bad_event(self):
+        group = self.create_group(project=self.project)
+        events = [self.create_event(group=group) for i in range(3)]
+        create_event_tags_bulk = tagstore.create_event_tags_bulk
+
+        def create_event_tags(batch):
+            if any(e['event_id'] == events[1].id for e in batch):
+                raise ValueError('bad event')
+            return create_event_tags_bulk(batch)
+
+        with self.options({'tagstore.index-batch-size': 3}), self.tasks(), \
+                patch.object(tagstore, 'create_event_tags_bulk', side_effect=create_event_tags):
+            for event in events:
+                index_event_tags.delay(
+                    event_id=event.id,
+                    group_id=group.id,
+                    project_id=self.project.id,
+                    environment_id=self.environment.id,
+                    organization_id=self.project.organization_id,
+                    tags=[('foo', 'bar')],
+                    date_added=event.datetime,
+                )
+
+            flush_event_tags()
+
+        # the bad event is dropped without affecting the rest of the batch
+        assert tagstore.get_group_event_filter(
+            self.project.id,
+            group.id,
+            self.environment.id,
+            {'foo': 'bar'},
+        ) == {'id__in': set([events[0].id, events[2].id])}
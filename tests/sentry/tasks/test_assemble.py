@@ -10,7 +10,7 @@ from six.moves import xrange
 
 from sentry.testutils import TestCase
 from sentry.tasks.assemble import assemble_dif, assemble_file
-from sentry.models import FileBlob, FileBlobOwner
+from sentry.models import File, FileBlob, FileBlobOwner
 from sentry.models.file import ChunkFileState
 from sentry.models.debugfile import get_assemble_status, ProjectDebugFile
 
@@ -115,3 +115,34 @@ class AssembleTest(TestCase):
             self.project, 'testfile', file_checksum.hexdigest(),
             [x[1] for x in files], 'dummy.type')[0]
         assert f.checksum == file_checksum.hexdigest()
+
+    def test_from_files_checksum_mismatch(self):
+        files = [
+            (io.BytesIO(b'foo'), sha1(b'foo').hexdigest()),
+            (io.BytesIO(b'bar'), sha1(b'baz').hexdigest()),
+        ]
+
+        with self.assertRaises(IOError):
+            FileBlob.from_files(files, organization=self.organization)
+
+        # The checksums are verified before anything is uploaded
+        assert not FileBlob.objects.filter(checksum=sha1(b'foo').hexdigest()).exists()
+
+    def test_assemble_without_tempfile(self):
+        files = []
+        file_checksum = sha1()
+        for _ in xrange(4):
+            blob = os.urandom(1024 * 64)
+            file_checksum.update(blob)
+            files.append((io.BytesIO(blob), sha1(blob).hexdigest()))
+
+        FileBlob.from_files(files, organization=self.organization)
+
+        blob_ids = [FileBlob.objects.get(checksum=checksum).id for _, checksum in files]
+        f = File.objects.create(name='testfile', type='dummy.type')
+
+        assert f.assemble_from_file_blob_ids(
+            blob_ids, file_checksum.hexdigest(), as_tempfile=False) is None
+        assert f.checksum == file_checksum.hexdigest()
+        assert f.size == 1024 * 64 * 4
+        assert f.getfile().read() == b''.join(x[0].getvalue() for x in files)
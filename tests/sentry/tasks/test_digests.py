@@ -0,0 +1,72 @@
+from __future__ import absolute_import
+
+from contextlib import contextmanager
+
+import mock
+import pytest
+
+from sentry.digests import Record
+from sentry.digests.notifications import event_to_record
+from sentry.plugins.sentry_mail.models import MailPlugin
+from sentry.tasks.digests import deliver_digests
+from sentry.testutils import TestCase
+
+
+class DeliverDigestsTest(TestCase):
+    def setUp(self):
+        self.closed = {}
+        self.records = {}
+
+        @contextmanager
+        def digest(key, minimum_delay=None):
+            try:
+                yield self.records.get(key, [Record('record', object(), 0)])
+            except Exception:
+                self.closed[key] = False
+                raise
+            self.closed[key] = True
+
+        self.digest = digest
+
+    def test_rollback_on_failed_state(self):
+        key = 'mail:p:%s' % self.project.id
+        with mock.patch('sentry.digests.digest', self.digest), \
+                mock.patch('sentry.tasks.digests.fetch_states', side_effect=ValueError):
+            with pytest.raises(ValueError):
+                deliver_digests([key])
+
+        assert self.closed == {key: False}
+
+    def test_rollback_on_failed_build(self):
+        project = self.create_project()
+        keys = ['mail:p:%s' % self.project.id, 'mail:p:%s' % project.id]
+
+        def build_digest(project, records, state=None):
+            if project.id == self.project.id:
+                raise ValueError
+            return {}
+
+        with mock.patch('sentry.digests.digest', self.digest), \
+                mock.patch('sentry.tasks.digests.fetch_states', return_value=[{}, {}]), \
+                mock.patch('sentry.tasks.digests.build_digest', side_effect=build_digest):
+            deliver_digests(keys)
+
+        assert self.closed == {keys[0]: False, keys[1]: True}
+
+    def test_empty_timeline(self):
+        project = self.create_project()
+        keys = ['mail:p:%s' % project.id, 'mail:p:%s' % self.event.project.id]
+        rule = self.event.project.rule_set.all()[0]
+        self.records = {
+            keys[0]: [],
+            keys[1]: [event_to_record(self.event, (rule, ))],
+        }
+
+        with mock.patch('sentry.digests.digest', self.digest), \
+                mock.patch.object(MailPlugin, 'notify_digest') as notify_digest:
+            deliver_digests(keys)
+
+        # The empty timeline is closed without building a digest for it
+        assert self.closed == {keys[0]: True, keys[1]: True}
+        assert notify_digest.call_count == 1
+        assert notify_digest.call_args[0][0] == self.event.project
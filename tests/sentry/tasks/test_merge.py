@@ -5,7 +5,7 @@ from mock import patch
 
 from sentry import tagstore
 from sentry.tagstore.models import GroupTagValue
-from sentry.tasks.merge import merge_groups
+from sentry.tasks.merge import merge_groups, merge_objects
 from sentry.models import Event, Group, GroupEnvironment, GroupMeta, GroupRedirect, UserReport
 from sentry.similarity import _make_index_backend
 from sentry.testutils import TestCase
@@ -59,6 +59,43 @@ class MergeGroupTest(TestCase):
             flat=True,
         )) == [1, 2]
 
+    def test_merge_objects_in_batches(self):
+        group1 = self.create_group(self.project)
+        group2 = self.create_group(self.project)
+
+        for environment_id in range(1, 6):
+            GroupEnvironment.objects.create(
+                group_id=group1.id,
+                environment_id=environment_id,
+            )
+
+        GroupEnvironment.objects.create(
+            group_id=group2.id,
+            environment_id=2,
+        )
+
+        assert merge_objects([GroupEnvironment], group1, group2, limit=3)
+        assert GroupEnvironment.objects.filter(group_id=group1.id).count() == 2
+
+        assert merge_objects([GroupEnvironment], group1, group2, limit=3)
+        assert not merge_objects([GroupEnvironment], group1, group2, limit=3)
+
+        assert not GroupEnvironment.objects.filter(group_id=group1.id).exists()
+        assert list(GroupEnvironment.objects.filter(
+            group_id=group2.id,
+        ).order_by('environment_id').values_list(
+            'environment_id',
+            flat=True,
+        )) == [1, 2, 3, 4, 5]
+
+    def test_merge_objects_skips_events_of_other_projects(self):
+        group1 = self.create_group(self.project)
+        group2 = self.create_group(self.project)
+        event = self.create_event('a' * 32, group=group1, project=self.create_project())
+
+        assert not merge_objects([Event], group1, group2)
+        assert Event.objects.get(id=event.id).group_id == group1.id
+
     def test_merge_with_event_integrity(self):
         project1 = self.create_project()
         group1 = self.create_group(project1)
@@ -11,12 +11,14 @@ from django.core import mail
 from sentry.app import tsdb
 from sentry.models import Project, UserOption
 from sentry.tasks.reports import (
-    DISABLED_ORGANIZATIONS_USER_OPTION_KEY, Report, Skipped, change, clean_series, colorize,
-    deliver_organization_user_report, get_calendar_range, get_percentile, has_valid_aggregates,
-    index_to_month, merge_mappings, merge_sequences, merge_series, month_to_index, prepare_reports,
-    safe_add, user_subscribed_to_organization_reports
+    DISABLED_ORGANIZATIONS_USER_OPTION_KEY, RedisReportBackend, Report, Skipped, change,
+    clean_series, colorize, deliver_organization_user_report, get_calendar_range, get_percentile,
+    has_valid_aggregates, index_to_month, merge_mappings, merge_sequences, merge_series,
+    month_to_index, prepare_project_reports, prepare_reports, safe_add,
+    user_subscribed_to_organization_reports
 )
 from sentry.testutils.cases import TestCase
+from sentry.utils import redis
 from sentry.utils.dates import to_datetime, to_timestamp
 from six.moves import xrange
 
@@ -340,3 +342,62 @@ class ReportTestCase(TestCase):
 
         set_option_value([organization.id])
         assert user_subscribed_to_organization_reports(user, organization) is False
+
+    def test_prepare_project_reports(self):
+        now = datetime(2016, 9, 12, tzinfo=pytz.utc)
+        interval = (now - timedelta(days=7), now)
+
+        projects = [
+            self.create_project(
+                organization=self.organization,
+                teams=[self.team],
+                date_added=now - timedelta(days=90),
+            ) for i in xrange(3)
+        ]
+
+        for i, project in enumerate(projects):
+            tsdb.incr(
+                tsdb.models.project,
+                project.id,
+                now - timedelta(days=1),
+                count=i + 1,
+            )
+
+        reports = prepare_project_reports(interval, projects)
+        assert set(reports) == set(project.id for project in projects)
+        for i, project in enumerate(projects):
+            assert reports[project.id] == prepare_project_reports(interval, [project])[project.id]
+            assert reports[project.id].issue_summaries == [0, 0, i + 1]
+
+    def test_redis_backend_resumes_prepare(self):
+        Project.objects.all().delete()
+
+        timestamp = to_timestamp(datetime(2016, 9, 12, tzinfo=pytz.utc))
+        duration = 60 * 60 * 24 * 7
+
+        projects = [
+            self.create_project(
+                organization=self.organization,
+                teams=[self.team],
+            ) for i in xrange(3)
+        ]
+
+        backend = RedisReportBackend(redis.clusters.get('default'), 60, batch_size=2)
+        with mock.patch.object(backend, 'build', wraps=backend.build) as build:
+            backend.prepare(timestamp, duration, self.organization)
+            assert build.call_count == 2
+
+        reports = backend.fetch(timestamp, duration, self.organization, projects)
+        assert all(report is not None for report in reports)
+
+        # Simulate an interrupted attempt that did not store the last report.
+        key = u'r:1:{}:{}:{}'.format(self.organization.id, int(timestamp), int(duration))
+        with backend.cluster.map() as client:
+            client.hdel(key, projects[-1].id)
+
+        with mock.patch.object(backend, 'build', wraps=backend.build) as build:
+            backend.prepare(timestamp, duration, self.organization)
+            assert build.call_count == 1
+            assert build.call_args[0][2] == [projects[-1]]
+
+        assert backend.fetch(timestamp, duration, self.organization, projects) == reports
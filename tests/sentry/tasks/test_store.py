@@ -173,6 +173,64 @@ class StoreTasksTest(PluginTestCase):
             project_id=project.id
         )
 
+    @mock.patch('sentry.tasks.store._do_save_event')
+    @mock.patch('sentry.tasks.store.save_event')
+    @mock.patch('sentry.tasks.store.process_event')
+    def test_fused_preprocess_saves_event(self, mock_process_event, mock_save_event,
+                                          mock_do_save_event):
+        project = self.create_project()
+
+        data = {
+            'project': project.id,
+            'platform': 'NOTMATTLANG',
+            'message': 'test',
+        }
+
+        with self.options({'store.fused-pipeline': True}):
+            preprocess_event(data=data, start_time=1)
+
+        assert mock_process_event.delay.call_count == 0
+        assert mock_save_event.delay.call_count == 0
+        assert mock_do_save_event.call_count == 1
+        cache_key, saved_data, start_time, event_id, project_id = \
+            mock_do_save_event.call_args[0]
+        assert (cache_key, start_time, project_id) == (None, 1, project.id)
+        assert dict(saved_data) == data
+
+    @mock.patch('sentry.tasks.store._do_save_event')
+    @mock.patch('sentry.tasks.store.save_event')
+    @mock.patch('sentry.tasks.store.default_cache')
+    def test_fused_process_event_saves_event(self, mock_default_cache, mock_save_event,
+                                             mock_do_save_event):
+        project = self.create_project()
+
+        data = {
+            'project': project.id,
+            'platform': 'mattlang',
+            'message': 'test',
+            'extra': {
+                'foo': 'bar'
+            },
+        }
+
+        mock_default_cache.get.return_value = data
+
+        with self.options({'store.fused-pipeline': True}):
+            process_event(cache_key='e:1', start_time=1)
+
+        # The mutated event is saved directly instead of going through the cache
+        assert mock_default_cache.set.call_count == 0
+        assert mock_save_event.delay.call_count == 0
+        assert mock_do_save_event.call_count == 1
+        cache_key, saved_data, start_time, event_id, project_id = \
+            mock_do_save_event.call_args[0]
+        assert (cache_key, start_time, project_id) == ('e:1', 1, project.id)
+        assert dict(saved_data) == {
+            'project': project.id,
+            'platform': 'mattlang',
+            'message': 'test',
+        }
+
     @mock.patch.object(tsdb, 'incr_multi')
     @mock.patch.object(quotas, 'refund')
     def test_hash_discarded_raised(self, mock_refund, mock_incr):
@@ -23,7 +23,7 @@ from sentry.models import (
 from sentry.similarity import features, _make_index_backend
 from sentry.tasks.unmerge import (
     get_caches, get_event_user_from_interface, get_fingerprint, get_group_backfill_attributes,
-    get_group_creation_attributes, unmerge
+    get_group_creation_attributes, get_tsdb_timestamp_function, unmerge
 )
 from sentry.testutils import TestCase
 from sentry.utils.dates import to_timestamp
@@ -783,3 +783,14 @@ class UnmergeTestCase(TestCase):
         )
         assert destination_similar_items[1][0] == source.id
         assert destination_similar_items[1][1]['message:message:character-shingles'] < 1.0
+
+
+def test_get_tsdb_timestamp_function():
+    timestamp = datetime(2018, 6, 1, 12, 30, 45, 500, tzinfo=pytz.utc)
+
+    with patch.object(tsdb, 'get_rollups', return_value=OrderedDict([(10, 360), (3600, 24)])):
+        assert get_tsdb_timestamp_function()(timestamp) == datetime(
+            2018, 6, 1, 12, 30, 40, tzinfo=pytz.utc)
+
+    with patch.object(tsdb, 'get_rollups', return_value=OrderedDict([(60, 360), (90, 24)])):
+        assert get_tsdb_timestamp_function()(timestamp) == timestamp
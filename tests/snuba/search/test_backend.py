@@ -14,7 +14,9 @@ from sentry.models import (
 )
 from sentry.search.base import ANY
 from sentry.search.django.backend import get_latest_release
-from sentry.search.snuba.backend import SnubaSearchBackend
+from sentry.search.snuba.backend import (
+    SnubaSearchBackend, estimate_project_candidates, get_project_group_stats
+)
 from sentry.testutils import SnubaTestCase
 
 
@@ -990,6 +992,62 @@ class SnubaSearchTest(SnubaTestCase):
         finally:
             options.set('snuba.search.pre-snuba-candidates-optimizer', prev_optimizer_enabled)
 
+    def test_planner_enabled(self):
+        prev_planner_enabled = options.get('snuba.search.pre-snuba-candidates-planner')
+        prev_min_pre = options.get('snuba.search.min-pre-snuba-candidates')
+        options.set('snuba.search.pre-snuba-candidates-planner', True)
+        options.set('snuba.search.min-pre-snuba-candidates', 1)
+
+        try:
+            assert get_project_group_stats([self.project.id]) == {
+                self.project.id: {
+                    'status': {
+                        GroupStatus.UNRESOLVED: 1,
+                        GroupStatus.RESOLVED: 1,
+                    },
+                    'assigned': 1,
+                },
+            }
+
+            # too many candidates are estimated, so Postgres is skipped
+            assert not self.backend._should_prefilter([self.project], None, 1)
+            results = self.backend.query([self.project])
+            assert set(results) == set([self.group1, self.group2])
+
+            assert self.backend._should_prefilter(
+                [self.project], None, 1, status=GroupStatus.UNRESOLVED)
+            results = self.backend.query([self.project], status=GroupStatus.UNRESOLVED)
+            assert set(results) == set([self.group1])
+
+            # filters of unknown selectivity always use Postgres
+            assert self.backend._should_prefilter([self.project], None, 1, query='foo')
+            assert self.backend._should_prefilter(
+                [self.project], None, 1, assigned_to=self.user)
+            assert self.backend._should_prefilter(
+                [self.project], None, 1, bookmarked_by=self.user)
+        finally:
+            options.set('snuba.search.pre-snuba-candidates-planner', prev_planner_enabled)
+            options.set('snuba.search.min-pre-snuba-candidates', prev_min_pre)
+
+    def test_estimate_project_candidates(self):
+        stats = {
+            'status': {
+                GroupStatus.UNRESOLVED: 800,
+                GroupStatus.RESOLVED: 200,
+            },
+            'assigned': 100,
+        }
+        assert estimate_project_candidates(stats, {}) == 1000
+        assert estimate_project_candidates(stats, {'status': GroupStatus.RESOLVED}) == 200
+        assert estimate_project_candidates(stats, {'status': GroupStatus.IGNORED}) == 0
+        assert estimate_project_candidates(stats, {'unassigned': True}) == 900
+        assert estimate_project_candidates(stats, {'unassigned': False}) == 100
+        assert estimate_project_candidates(
+            stats, {'status': GroupStatus.RESOLVED, 'unassigned': True}) == 100
+        # every resolved group may be unassigned
+        assert estimate_project_candidates(
+            stats, {'status': GroupStatus.RESOLVED, 'unassigned': False}) == 0
+
     def test_search_out_of_range(self):
         results = self.backend.query(
             [self.project],